@@ -0,0 +1,96 @@
+"""Typed movie columns: DATE release_date, generated release_year, JSONB attributes
+
+Revision ID: a3c5e7f90b12
+Revises:
+Create Date: 2026-10-17 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from db.movie_search import MOVIE_SEARCH_VIEW, ensure_search_vector, refresh_movie_search
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a3c5e7f90b12'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+JSON_COLUMNS = ["genres_data", "keywords", "production_companies", "cast", "crew"]
+# crew gets no GIN index: it is the largest column and only its director is queried, via director_id
+GIN_COLUMNS = ["genres_data", "keywords", "production_companies", "cast"]
+
+
+def _column_types(bind) -> dict:
+    rows = bind.execute(sa.text("""
+        SELECT column_name, data_type FROM information_schema.columns
+        WHERE table_schema = current_schema() AND table_name = 'movies'
+    """))
+    return {row.column_name: row.data_type for row in rows}
+
+
+def _has_search_vector_trigger(bind) -> bool:
+    return bool(bind.execute(sa.text("""
+        SELECT 1 FROM pg_trigger
+        WHERE tgname = 'movies_search_vector_trigger' AND tgrelid = to_regclass('movies')
+    """)).scalar())
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    types = _column_types(bind)
+    if not types:
+        return  # No catalog yet; create_all builds the typed table
+    had_view = bind.execute(sa.text("SELECT to_regclass(:name)"), {"name": MOVIE_SEARCH_VIEW}).scalar()
+
+    # Postgres won't retype columns a view or a trigger's UPDATE OF list reads;
+    # both are rebuilt at the end
+    op.execute(f"DROP MATERIALIZED VIEW IF EXISTS {MOVIE_SEARCH_VIEW}")
+    op.execute("DROP TRIGGER IF EXISTS movies_search_vector_trigger ON movies")
+
+    # One ALTER TABLE, so the table is rewritten once
+    changes = []
+    if types.get("release_date") != "date":
+        changes.append(r"""ALTER COLUMN release_date TYPE date USING
+            CASE WHEN release_date ~ '^\d{4}-\d{2}-\d{2}$' THEN release_date::date END""")
+    for column in JSON_COLUMNS:
+        if types.get(column) != "jsonb":
+            changes.append(f'ALTER COLUMN "{column}" TYPE jsonb USING NULLIF("{column}", \'\')::jsonb')
+    if changes:
+        op.execute("ALTER TABLE movies " + ", ".join(changes))
+
+    op.execute("""
+        ALTER TABLE movies ADD COLUMN IF NOT EXISTS release_year integer
+        GENERATED ALWAYS AS (EXTRACT(YEAR FROM release_date)::integer) STORED
+    """)
+    op.execute("CREATE INDEX IF NOT EXISTS ix_movies_release_year ON movies (release_year)")
+    for column in GIN_COLUMNS:
+        op.execute(f'CREATE INDEX IF NOT EXISTS ix_movies_{column} ON movies USING GIN ("{column}" jsonb_path_ops)')
+
+    # The trigger function reads keywords as text or jsonb, so it needs no change
+    ensure_search_vector(bind, backfill=False)
+    if had_view:
+        refresh_movie_search(bind, concurrently=False)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if not _column_types(bind):
+        return
+    # The current movie_search definition needs the typed columns, so it stays dropped
+    op.execute(f"DROP MATERIALIZED VIEW IF EXISTS {MOVIE_SEARCH_VIEW}")
+    # Put back only if it was there: c4e8a2d61f37's downgrade may already have removed it
+    had_trigger = _has_search_vector_trigger(bind)
+    op.execute("DROP TRIGGER IF EXISTS movies_search_vector_trigger ON movies")
+    for column in GIN_COLUMNS:
+        op.execute(f"DROP INDEX IF EXISTS ix_movies_{column}")
+    op.execute("DROP INDEX IF EXISTS ix_movies_release_year")
+    op.execute("ALTER TABLE movies DROP COLUMN IF EXISTS release_year")
+    changes = ["ALTER COLUMN release_date TYPE varchar USING release_date::text"]
+    changes += [f'ALTER COLUMN "{column}" TYPE text USING "{column}"::text' for column in JSON_COLUMNS]
+    op.execute("ALTER TABLE movies " + ", ".join(changes))
+    if had_trigger:
+        ensure_search_vector(bind, backfill=False)
@@ -0,0 +1,37 @@
+"""catalog_meta: catalog_version and the stamps of the artifacts built from it
+
+Revision ID: a8e4f2b6c173
+Revises: f3a7c1d9e482
+Create Date: 2026-10-17 20:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'a8e4f2b6c173'
+down_revision: Union[str, None] = 'f3a7c1d9e482'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if sa.inspect(bind).has_table("catalog_meta"):
+        return  # Created by migrate_data, or by db/catalog.py's inline DDL before this revision
+    # Matches CatalogMeta in models/models.py
+    op.create_table(
+        "catalog_meta",
+        sa.Column("key", sa.String(64), primary_key=True),
+        sa.Column("value", sa.Integer(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if sa.inspect(bind).has_table("catalog_meta"):
+        op.drop_table("catalog_meta")
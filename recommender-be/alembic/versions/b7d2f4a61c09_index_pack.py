@@ -0,0 +1,85 @@
+"""Index pack: catalog sort columns, association table primary keys, chat lookups
+
+Revision ID: b7d2f4a61c09
+Revises: a3c5e7f90b12
+Create Date: 2026-10-17 14:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b7d2f4a61c09'
+down_revision: Union[str, None] = 'a3c5e7f90b12'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (table, index name, definition); matches the Index() declarations in models/models.py
+INDEXES = [
+    ("movies", "ix_movies_popularity", "(popularity DESC)"),
+    ("movies", "ix_movies_vote", "(vote_average DESC, vote_count DESC)"),
+    ("movies", "ix_movies_revenue", "(revenue DESC)"),
+    ("movies", "ix_movies_budget", "(budget)"),
+    ("movies", "ix_movies_runtime", "(runtime)"),
+    ("movies", "ix_movies_director_id", "(director_id)"),
+    ("actors", "ix_actors_name", "(name)"),
+    ("directors", "ix_directors_name", "(name)"),
+    ("movie_genre", "ix_movie_genre_genre_id", "(genre_id)"),
+    ("movie_actor", "ix_movie_actor_actor_id", "(actor_id)"),
+    ("sessions", "ix_sessions_user_id", "(user_id)"),
+    ("model_configs", "ix_model_configs_user_id_created_at", "(user_id, created_at)"),
+    ("conversations", "ix_conversations_user_id_end_time", "(user_id, end_time)"),
+    ("messages", "ix_messages_conversation_id_timestamp", "(conversation_id, timestamp)"),
+    ("model_evaluations", "ix_model_evaluations_conversation_id", "(conversation_id)"),
+    ("user_viewing_history", "ix_user_viewing_history_user_id_timestamp", "(user_id, timestamp)"),
+]
+
+# table -> the other key column next to movie_id
+ASSOCIATION_TABLES = {"movie_genre": "genre_id", "movie_actor": "actor_id"}
+
+
+def _existing_tables(bind) -> set:
+    return set(sa.inspect(bind).get_table_names())
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    tables = _existing_tables(bind)
+
+    for table, column in ASSOCIATION_TABLES.items():
+        if table not in tables or sa.inspect(bind).get_pk_constraint(table)["constrained_columns"]:
+            continue
+        # The ORM loader could append the same pair twice; keep one of each
+        op.execute(f"DELETE FROM {table} WHERE movie_id IS NULL OR {column} IS NULL")
+        op.execute(f"""
+            DELETE FROM {table} a USING {table} b
+            WHERE a.ctid < b.ctid AND a.movie_id = b.movie_id AND a.{column} = b.{column}
+        """)
+        op.execute(f"ALTER TABLE {table} ADD CONSTRAINT {table}_pkey PRIMARY KEY (movie_id, {column})")
+
+    # Duplicates the primary key index
+    if "movies" in tables:
+        op.execute("DROP INDEX IF EXISTS ix_movies_id")
+
+    for table, name, definition in INDEXES:
+        if table in tables:
+            op.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} {definition}")
+
+    for table in tables & {table for table, _, _ in INDEXES}:
+        op.execute(f"ANALYZE {table}")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    tables = _existing_tables(bind)
+    for table, name, _ in INDEXES:
+        if table in tables:
+            op.execute(f"DROP INDEX IF EXISTS {name}")
+    for table in ASSOCIATION_TABLES:
+        if table in tables:
+            op.execute(f"ALTER TABLE {table} DROP CONSTRAINT IF EXISTS {table}_pkey")
+    if "movies" in tables:
+        op.execute("CREATE INDEX IF NOT EXISTS ix_movies_id ON movies (id)")
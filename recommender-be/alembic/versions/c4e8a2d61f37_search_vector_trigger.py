@@ -0,0 +1,37 @@
+"""search_vector trigger: full-text column, GIN index and the function/trigger that fill it
+
+Revision ID: c4e8a2d61f37
+Revises: b7d2f4a61c09
+Create Date: 2026-10-17 16:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from db.movie_search import ensure_search_vector
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c4e8a2d61f37'
+down_revision: Union[str, None] = 'b7d2f4a61c09'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("movies"):
+        return  # No catalog yet; migrate_data installs the trigger with the tables
+    # Also computes the vector for movies loaded before the trigger existed
+    ensure_search_vector(bind, backfill=True)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("movies"):
+        return
+    # The column stays: movies.search_vector is part of the model and movie_search reads it
+    op.execute("DROP TRIGGER IF EXISTS movies_search_vector_trigger ON movies")
+    op.execute("DROP FUNCTION IF EXISTS movies_search_vector_update()")
@@ -0,0 +1,49 @@
+"""evaluation_jobs: persistent queue of background answer evaluations
+
+Revision ID: d9f1b3c7e245
+Revises: c4e8a2d61f37
+Create Date: 2026-10-17 18:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects.postgresql import UUID
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd9f1b3c7e245'
+down_revision: Union[str, None] = 'c4e8a2d61f37'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if sa.inspect(bind).has_table("evaluation_jobs"):
+        return  # Created by migrate_data, or by the worker's startup create before this revision
+    # Matches EvaluationJob in models/models.py
+    op.create_table(
+        "evaluation_jobs",
+        sa.Column("id", UUID(as_uuid=True), primary_key=True),
+        sa.Column("user_id", UUID(as_uuid=True), sa.ForeignKey("users.id"), nullable=False),
+        sa.Column("conversation_id", UUID(as_uuid=True), sa.ForeignKey("conversations.id"), nullable=False),
+        sa.Column("model_config_id", UUID(as_uuid=True), sa.ForeignKey("model_configs.id"), nullable=False),
+        sa.Column("model_name", sa.String(100), nullable=True),
+        sa.Column("session_id", sa.String(64), nullable=True),
+        sa.Column("payload", sa.JSON(), nullable=False),
+        sa.Column("status", sa.String(20), nullable=False),
+        sa.Column("attempts", sa.Integer(), nullable=False),
+        sa.Column("result", sa.JSON(), nullable=True),
+        sa.Column("error", sa.Text(), nullable=True),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.func.now()),
+    )
+    op.create_index("ix_evaluation_jobs_status_created_at", "evaluation_jobs", ["status", "created_at"])
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if sa.inspect(bind).has_table("evaluation_jobs"):
+        op.drop_table("evaluation_jobs")
@@ -0,0 +1,49 @@
+"""movies.source_hash and movies.catalog_version for the delta catalog load
+
+Revision ID: e5b8d2f6a310
+Revises: d9f1b3c7e245
+Create Date: 2026-10-17 18:30:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e5b8d2f6a310'
+down_revision: Union[str, None] = 'd9f1b3c7e245'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Matches Movie.source_hash / Movie.catalog_version in models/models.py
+COLUMNS = [
+    sa.Column("source_hash", sa.String(32), nullable=True),
+    sa.Column("catalog_version", sa.Integer(), nullable=True),
+]
+
+
+def _movie_columns(bind) -> set:
+    return {column["name"] for column in sa.inspect(bind).get_columns("movies")}
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("movies"):
+        return  # No catalog yet; migrate_data creates movies with these columns
+    existing = _movie_columns(bind)
+    for column in COLUMNS:
+        if column.name not in existing:
+            # Nullable, no default: a catalog-only change, no table rewrite
+            op.add_column("movies", column.copy())
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("movies"):
+        return
+    existing = _movie_columns(bind)
+    for column in reversed(COLUMNS):
+        if column.name in existing:
+            op.drop_column("movies", column.name)
@@ -0,0 +1,42 @@
+"""movie_features.embedding: pgvector column and its HNSW index
+
+Revision ID: f3a7c1d9e482
+Revises: e5b8d2f6a310
+Create Date: 2026-10-17 20:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from models.models import EMBEDDING_DIM
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3a7c1d9e482'
+down_revision: Union[str, None] = 'e5b8d2f6a310'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.execute("CREATE EXTENSION IF NOT EXISTS vector")
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("movie_features"):
+        return  # No catalog yet; migrate_data creates movie_features with the column and index
+    # Matches MovieFeature.embedding and its Index() in models/models.py
+    op.execute(f"ALTER TABLE movie_features ADD COLUMN IF NOT EXISTS embedding vector({EMBEDDING_DIM})")
+    op.execute("""
+        CREATE INDEX IF NOT EXISTS ix_movie_features_embedding_hnsw ON movie_features
+        USING hnsw (embedding vector_cosine_ops) WITH (m = 16, ef_construction = 64)
+    """)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if not sa.inspect(bind).has_table("movie_features"):
+        return
+    # The extension stays: dropping it would take any other vector column along
+    op.execute("DROP INDEX IF EXISTS ix_movie_features_embedding_hnsw")
+    op.execute("ALTER TABLE movie_features DROP COLUMN IF EXISTS embedding")
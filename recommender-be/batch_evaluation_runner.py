@@ -0,0 +1,5 @@
+import sys
+from core.evaluation.batch_runner import main
+
+if __name__ == "__main__":
+    sys.exit(main())
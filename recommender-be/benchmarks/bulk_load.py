@@ -0,0 +1,207 @@
+"""
+Benchmark: catalog ingestion rows/sec, bulk and streaming COPY loaders vs the ORM load.
+
+Writes a synthetic catalog shaped like the TMDB 5000 CSVs (JSON list columns for
+genres, keywords, companies, cast and crew) to a temp directory and loads it into a
+scratch schema, so the real catalog is untouched. Modes:
+  bulk    reads and merges both CSVs in memory, then migrate/bulk_load.bulk_load
+  stream  migrate/bulk_load.stream_load, once per --workers count
+  orm     migrate_data.load_rows on the first --orm-sample movies (too slow for the full set)
+  delta   a stream load, then a timed --delta re-load of a dump where --changed of the
+          movies have new vote counts (the nightly refresh case)
+The movie_search refresh is left out. Peak RSS is the process high-water mark so far,
+so run `--modes stream` alone to see the streaming loader's footprint.
+
+Usage (from recommender-be/):
+    python -m benchmarks.bulk_load --movies 100000 --modes bulk,stream,orm --orm-sample 2000
+    python -m benchmarks.bulk_load --movies 1000000 --modes stream --workers 1,2,4,8
+    python -m benchmarks.bulk_load --movies 1000000 --modes delta --changed 0.01
+"""
+
+import argparse
+import json
+import os
+import random
+import resource
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from config.settings import settings
+from db.movie_search import ensure_search_vector
+from migrate.bulk_load import bulk_load, stream_load
+from migrate.migrate_data import load_rows
+from models.models import Actor, Base, CatalogMeta, Director, Genre, Movie, movie_actor, movie_genre
+
+SCHEMA = "bulk_load_bench"
+# catalog_meta too: the loaders bump catalog_version, which must not touch the real stamp
+CATALOG_TABLES = [Director.__table__, Genre.__table__, Actor.__table__, Movie.__table__, movie_genre, movie_actor,
+                  CatalogMeta.__table__]
+
+GENRES = ['Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary', 'Drama', 'Family',
+          'Fantasy', 'History', 'Horror', 'Music', 'Mystery', 'Romance', 'Science Fiction',
+          'TV Movie', 'Thriller', 'War', 'Western']
+WORDS = ["space", "love", "war", "heist", "robot", "family", "revenge", "island", "detective", "dragon",
+         "sequel", "award", "city", "night", "secret", "journey", "ghost", "team", "school", "ocean"]
+CREDIT_COLUMNS = ["movie_id", "title", "cast", "crew"]
+
+
+def synthetic_chunk(rng: random.Random, first_id: int, count: int, total: int) -> pd.DataFrame:
+    """TMDB-shaped rows: ~1 actor per 2 movies and 1 director per 10, so names repeat like the real data."""
+    actors = max(10, total // 2)
+    directors = max(5, total // 10)
+    rows = []
+    for movie_id in range(first_id, first_id + count):
+        cast = [{"cast_id": i, "character": f"Role {i}", "name": f"Actor {rng.randrange(actors)}", "order": i}
+                for i in range(rng.randint(3, 8))]
+        crew = [{"department": "Directing", "job": "Director", "name": f"Director {rng.randrange(directors)}"},
+                {"department": "Writing", "job": "Screenplay", "name": f"Writer {rng.randrange(actors)}"}]
+        rows.append({
+            "id": movie_id,
+            "movie_id": movie_id,
+            "title": f"Movie {movie_id}",
+            "budget": rng.randrange(0, 300_000_000),
+            "genres": json.dumps([{"id": i, "name": name} for i, name in enumerate(rng.sample(GENRES, rng.randint(1, 4)))]),
+            "homepage": "",
+            "keywords": json.dumps([{"id": i, "name": word} for i, word in enumerate(rng.sample(WORDS, 4))]),
+            "original_language": rng.choice(["en", "fr", "es", "ja", "de"]),
+            "original_title": f"Movie {movie_id}",
+            "overview": " ".join(rng.choices(WORDS, k=30)),
+            "popularity": rng.random() * 100,
+            "production_companies": json.dumps([{"id": 1, "name": "Studio " + str(rng.randrange(500))}]),
+            "release_date": f"{rng.randint(1950, 2024)}-{rng.randint(1, 12):02d}-{rng.randint(1, 28):02d}",
+            "revenue": rng.randrange(0, 2_000_000_000),
+            "runtime": rng.randint(70, 200),
+            "status": "Released",
+            "tagline": " ".join(rng.choices(WORDS, k=5)),
+            "vote_average": round(rng.random() * 10, 1),
+            "vote_count": rng.randrange(0, 20_000),
+            "cast": json.dumps(cast),
+            "crew": json.dumps(crew),
+        })
+    return pd.DataFrame(rows)
+
+
+def write_synthetic_csvs(directory: str, movies: int, seed: int, chunk: int = 50_000):
+    """Write movies.csv and credits.csv chunk by chunk, like tmdb_5000_movies/credits.csv."""
+    rng = random.Random(seed)
+    movies_csv = os.path.join(directory, "movies.csv")
+    credits_csv = os.path.join(directory, "credits.csv")
+    for first_id in range(1, movies + 1, chunk):
+        frame = synthetic_chunk(rng, first_id, min(chunk, movies + 1 - first_id), movies)
+        header = first_id == 1
+        frame.drop(columns=["movie_id", "cast", "crew"]).to_csv(movies_csv, mode="a", header=header, index=False)
+        frame[CREDIT_COLUMNS].to_csv(credits_csv, mode="a", header=header, index=False)
+    return movies_csv, credits_csv
+
+
+def write_changed_csv(movies_csv: str, path: str, fraction: float, seed: int, chunk: int = 50_000) -> int:
+    """Copy movies.csv with `fraction` of the rows' vote_count bumped; returns how many changed."""
+    rng = np.random.default_rng(seed)
+    changed = 0
+    # round_trip keeps the untouched floats byte-identical, so only the bumped rows hash differently
+    for index, frame in enumerate(pd.read_csv(movies_csv, chunksize=chunk, float_precision="round_trip")):
+        mask = rng.random(len(frame)) < fraction
+        frame.loc[mask, "vote_count"] += 1
+        changed += int(mask.sum())
+        frame.to_csv(path, mode="a", header=index == 0, index=False)
+    return changed
+
+
+def read_merged(movies_csv: str, credits_csv: str) -> pd.DataFrame:
+    # Same merge as migrate_data.read_catalog
+    df = pd.merge(pd.read_csv(movies_csv), pd.read_csv(credits_csv), left_on="id", right_on="movie_id")
+    return df.rename(columns={"title_x": "title"})
+
+
+def reset_schema(admin_engine, engine) -> None:
+    with admin_engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        Base.metadata.create_all(
+            conn.execution_options(schema_translate_map={None: SCHEMA}), tables=CATALOG_TABLES
+        )
+    # Every mode loads with the search_vector trigger in place, like the real catalog
+    with engine.begin() as conn:
+        ensure_search_vector(conn, backfill=False)
+
+
+def run_orm(engine, df: pd.DataFrame) -> dict:
+    with Session(engine, autoflush=False) as session:
+        load_rows(session, df)
+    return {"movies": len(df)}
+
+
+def peak_rss_mib() -> float:
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movies", type=int, default=100_000, help="Synthetic catalog size (1000000 for the stress case)")
+    parser.add_argument("--modes", default="bulk,stream", help="Comma-separated: bulk, stream, orm, delta")
+    parser.add_argument("--workers", default=str(os.cpu_count() or 1), help="Comma-separated parser process counts for stream")
+    parser.add_argument("--chunksize", type=int, default=2000, help="CSV rows per chunk for stream")
+    parser.add_argument("--orm-sample", type=int, default=2000, help="Movies loaded by the orm mode")
+    parser.add_argument("--changed", type=float, default=0.01, help="Share of movies changed for the delta mode")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--keep", action="store_true", help=f"Keep the {SCHEMA} schema after the last run")
+    args = parser.parse_args()
+    modes = args.modes.split(",")
+
+    admin_engine = create_engine(settings.DATABASE_URL)
+    # Unqualified names in the loaders (movies, staging tables, the trigger function) resolve to the scratch schema
+    engine = create_engine(settings.DATABASE_URL, connect_args={"options": f"-csearch_path={SCHEMA},public"})
+
+    with tempfile.TemporaryDirectory() as directory:
+        start = time.perf_counter()
+        movies_csv, credits_csv = write_synthetic_csvs(directory, args.movies, args.seed)
+        size = (os.path.getsize(movies_csv) + os.path.getsize(credits_csv)) / 2**20
+        print(f"Wrote {args.movies} synthetic movies ({size:.0f} MiB of CSV) in {time.perf_counter() - start:.1f}s")
+
+        runs = []
+        for mode in modes:
+            if mode == "stream":
+                runs.extend((f"stream x{workers}", int(workers)) for workers in args.workers.split(","))
+            else:
+                runs.append((mode, None))
+
+        print(f"{'run':<12} {'movies':>9} {'seconds':>9} {'rows/s':>9} {'peak RSS MiB':>13}")
+        try:
+            for name, workers in runs:
+                reset_schema(admin_engine, engine)
+                start = time.perf_counter()
+                if name == "bulk":
+                    result = bulk_load(engine, read_merged(movies_csv, credits_csv), refresh=False)
+                elif name == "orm":
+                    result = run_orm(engine, read_merged(movies_csv, credits_csv).head(args.orm_sample))
+                elif name == "delta":
+                    stream_load(engine, movies_csv, credits_csv, chunksize=args.chunksize, refresh=False)
+                    changed_csv = os.path.join(directory, "movies_changed.csv")
+                    if not os.path.exists(changed_csv):
+                        write_changed_csv(movies_csv, changed_csv, args.changed, args.seed)
+                    start = time.perf_counter()
+                    result = stream_load(
+                        engine, changed_csv, credits_csv, chunksize=args.chunksize, upsert=True, refresh=False
+                    )
+                    print(f"delta: {result['updated']} updated, {result['inserted']} inserted, "
+                          f"{result['unchanged']} unchanged")
+                else:
+                    result = stream_load(
+                        engine, movies_csv, credits_csv, chunksize=args.chunksize, workers=workers, refresh=False
+                    )
+                elapsed = time.perf_counter() - start
+                print(f"{name:<12} {result['movies']:>9} {elapsed:>9.2f} {result['movies'] / elapsed:>9.0f} "
+                      f"{peak_rss_mib():>13.0f}")
+        finally:
+            if not args.keep:
+                with admin_engine.begin() as conn:
+                    conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    main()
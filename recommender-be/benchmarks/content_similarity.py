@@ -0,0 +1,91 @@
+"""
+Benchmark: content-similarity build time and "movies like X" lookup latency.
+
+Builds the neighbour table for --movies synthetic movies (Zipf-distributed
+genres, keywords, cast and crew names), round-trips it through the .npz
+artifact and times title -> top-k lookups. Pass --from-db to use the real
+catalogue instead.
+
+Usage (from recommender-be/):
+    python -m benchmarks.content_similarity --movies 50000
+    python -m benchmarks.content_similarity --from-db
+"""
+
+import argparse
+import json
+import os
+import statistics
+import tempfile
+import time
+
+import numpy as np
+
+from core.retrieval.content_similarity import ContentSimilarity
+
+
+def synthetic_movies(count: int, seed: int = 42):
+    rng = np.random.default_rng(seed)
+
+    def names(prefix, vocabulary, size, exponent=1.1):
+        weights = 1.0 / np.arange(1, vocabulary + 1) ** exponent
+        picks = rng.choice(vocabulary, size=size, replace=False, p=weights / weights.sum())
+        return [{"name": f"{prefix}{pick}"} for pick in picks]
+
+    movies = []
+    for movie_id in range(1, count + 1):
+        movies.append({
+            "id": movie_id,
+            "title": f"Movie {movie_id}",
+            "genres_data": json.dumps(names("genre", 20, 3)),
+            "keywords": json.dumps(names("keyword", 10000, 8)),
+            "cast": json.dumps([{**member, "order": order} for order, member in enumerate(names("actor", 50000, 8))]),
+            "crew": json.dumps([{**member, "job": "Director"} for member in names("director", 5000, 1)]),
+        })
+    return movies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movies", type=int, default=5000)
+    parser.add_argument("--from-db", action="store_true")
+    parser.add_argument("--top-k", type=int, default=50)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--samples", type=int, default=5000)
+    args = parser.parse_args()
+
+    if args.from_db:
+        from migrate.build_content_similarity import load_movies
+        movies = load_movies()
+    else:
+        movies = synthetic_movies(args.movies)
+    print(f"{len(movies)} movies")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "content_similarity.npz")
+        start = time.perf_counter()
+        ContentSimilarity(path).build(movies, k=args.top_k).save()
+        print(f"build: {time.perf_counter() - start:.2f}s, artifact {os.path.getsize(path) / 1024 / 1024:.1f} MiB")
+
+        model = ContentSimilarity(path)
+        start = time.perf_counter()
+        model.load_if_changed()
+        print(f"load: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    rng = np.random.default_rng(7)
+    titles = [movies[i]["title"] for i in rng.integers(0, len(movies), size=args.samples)]
+    latencies = []
+    for title in titles:
+        start = time.perf_counter()
+        movie_id = model.find_movie_id(title)
+        if movie_id is not None:
+            model.similar(movie_id, args.k)
+        latencies.append(time.perf_counter() - start)
+    latencies.sort()
+    print(
+        f"lookup top-{args.k}: p50 {statistics.median(latencies) * 1000:.3f} ms, "
+        f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:.3f} ms"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Benchmark: single-core FAISS k-NN throughput for Flat, IVF and HNSW indexes.
+
+Vectors are random unit vectors by default, or the real catalog embeddings when
+--from-db is given. Recall@k is measured against the exact Flat index.
+
+Usage (from recommender-be/):
+    python -m benchmarks.faiss_qps --vectors 5000 100000 --k 10
+"""
+
+import argparse
+import statistics
+import time
+
+import faiss
+import numpy as np
+
+from core.retrieval.faiss_index import build_index
+from models.models import EMBEDDING_DIM
+
+
+def random_unit_vectors(count: int, dim: int, seed: int = 42) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    vectors = rng.standard_normal((count, dim)).astype(np.float32)
+    faiss.normalize_L2(vectors)
+    return vectors
+
+
+def measure(index, queries: np.ndarray, k: int):
+    latencies = []
+    found = []
+    for query in queries:
+        start = time.perf_counter()
+        _, ids = index.search(query.reshape(1, -1), k)
+        latencies.append(time.perf_counter() - start)
+        found.append(ids[0])
+    return latencies, found
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vectors", type=int, nargs="+", default=[5000, 100000])
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--from-db", action="store_true", help="Use movie_features embeddings instead of random vectors")
+    args = parser.parse_args()
+
+    # QPS per core: keep FAISS from spreading a single query over OpenMP threads
+    faiss.omp_set_num_threads(1)
+
+    datasets = []
+    if args.from_db:
+        from migrate.build_faiss_index import load_embeddings
+        ids, vectors = load_embeddings()
+        datasets.append((ids, vectors))
+    else:
+        for count in args.vectors:
+            datasets.append((np.arange(count, dtype=np.int64), random_unit_vectors(count, EMBEDDING_DIM)))
+
+    for ids, vectors in datasets:
+        queries = vectors[np.random.default_rng(7).choice(len(vectors), size=min(args.queries, len(vectors)), replace=False)]
+        print(f"\n{len(vectors)} vectors, dimension {vectors.shape[1]}, {len(queries)} queries, k={args.k}")
+
+        exact = None
+        for index_type in ("flat", "ivf", "hnsw"):
+            start = time.perf_counter()
+            index = build_index(ids, vectors, index_type)
+            build_seconds = time.perf_counter() - start
+
+            latencies, found = measure(index, queries, args.k)
+            if exact is None:
+                exact = found
+            recall = statistics.mean(
+                len(set(a.tolist()) & set(b.tolist())) / args.k for a, b in zip(found, exact)
+            )
+            latencies.sort()
+            print(
+                f"{index_type:>5}: build {build_seconds:.2f}s, "
+                f"p50 {statistics.median(latencies) * 1e6:.0f} us, "
+                f"p99 {latencies[int(len(latencies) * 0.99) - 1] * 1e6:.0f} us, "
+                f"{len(latencies) / sum(latencies):.0f} QPS/core, recall@{args.k} {recall:.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,147 @@
+"""
+Benchmark: two-pass vs single-pass chat pipeline.
+
+For each question, retrieval runs once and both modes generate from the same rows:
+  two_pass    - agent chain-of-thought stream, then the user-facing answer built from it
+  single_pass - one generation straight from the retrieved rows
+Reports time to first user-visible token, total latency, prompt/completion tokens
+(tiktoken cl100k_base estimate) and, unless --no-eval, the evaluator's scores.
+
+Requires the catalog to be loaded and a real model (defaults to OpenAI with
+settings.OPENAI_API_KEY).
+
+Usage (from recommender-be/):
+    python -m benchmarks.pipeline_modes --provider openai --model gpt-4o-mini
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Dict, List
+
+import tiktoken
+
+from config.settings import settings
+from core.agent.agent import MovieRecommendationAgent
+from core.evaluation.evaluator import MovieRecommendationEvaluator
+from core.model_interface import ModelFactory
+from core.pipeline import build_single_pass_messages, build_two_pass_messages
+from core.utils.prompts import get_chain_of_thought_system_message
+from core.utils.serializer import serialize_rows
+from db.database import AsyncSessionLocal, async_engine
+
+QUESTIONS = [
+    "Recommend some science fiction movies",
+    "What are the top 5 popular action movies?",
+    "Movies like Inception",
+    "Which comedy movies have the best rating?",
+    "Movies with high revenue starring Tom Hanks",
+    "Recommend short animation movies for family",
+]
+
+ENCODING = tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(messages) -> int:
+    return sum(len(ENCODING.encode(message.content)) for message in messages)
+
+
+async def stream(model, messages, started: float, result: Dict) -> str:
+    text = ""
+    async for token in await model.generate_stream(messages):
+        result.setdefault("ttft", time.perf_counter() - started)
+        text += token
+    return text
+
+
+async def run_two_pass(agent, model, question, retrieved_data) -> Dict:
+    result = {}
+    started = time.perf_counter()
+    recommendation = ""
+    async for token in agent.chain_of_thought(question, retrieved_data):
+        result.setdefault("ttft", time.perf_counter() - started)
+        recommendation += token
+    messages = build_two_pass_messages([], recommendation, question)
+    response = await stream(model, messages, started, {})
+    result.update(
+        total=time.perf_counter() - started,
+        # First pass: chain-of-thought system prompt plus the serialized rows the agent sends
+        prompt_tokens=count_tokens(messages) + count_tokens([get_chain_of_thought_system_message()])
+        + len(ENCODING.encode(serialize_rows(retrieved_data["results"], retrieved_data["query_types"]))),
+        completion_tokens=len(ENCODING.encode(recommendation)) + len(ENCODING.encode(response)),
+        response=response,
+    )
+    return result
+
+
+async def run_single_pass(model, question, retrieved_data) -> Dict:
+    result = {}
+    started = time.perf_counter()
+    messages = build_single_pass_messages([], retrieved_data, question)
+    response = await stream(model, messages, started, result)
+    result.update(
+        total=time.perf_counter() - started,
+        prompt_tokens=count_tokens(messages),
+        completion_tokens=len(ENCODING.encode(response)),
+        response=response,
+    )
+    return result
+
+
+def summarize(name: str, runs: List[Dict]) -> None:
+    def median(key):
+        return statistics.median(run[key] for run in runs if key in run)
+
+    line = (
+        f"{name:<12} ttft {median('ttft') * 1000:8.0f} ms   total {median('total') * 1000:8.0f} ms   "
+        f"prompt {median('prompt_tokens'):7.0f} tok   completion {median('completion_tokens'):6.0f} tok"
+    )
+    scores = [run["scores"].get("overall") for run in runs if run.get("scores")]
+    if scores:
+        line += f"   overall {statistics.mean(scores):.2f}"
+    print(line)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--provider", default="openai")
+    parser.add_argument("--model", default="gpt-4o-mini")
+    parser.add_argument("--api-key", default=settings.OPENAI_API_KEY)
+    parser.add_argument("--no-eval", action="store_true")
+    args = parser.parse_args()
+
+    model = ModelFactory.create_model(args.provider, args.model, args.api_key)
+    evaluator = None if args.no_eval else MovieRecommendationEvaluator()
+    runs = {"two_pass": [], "single_pass": []}
+
+    async with AsyncSessionLocal() as db:
+        agent = MovieRecommendationAgent(db, None)
+        agent.set_config(None, model)
+        for question in QUESTIONS:
+            retrieved_data = await agent.retrieve_data(question)
+            # Both modes are judged against the same evidence: the rows the model was given
+            rows = serialize_rows(retrieved_data["results"], retrieved_data["query_types"])
+            for mode, run in (
+                ("two_pass", run_two_pass(agent, model, question, retrieved_data)),
+                ("single_pass", run_single_pass(model, question, retrieved_data)),
+            ):
+                result = await run
+                if evaluator:
+                    evaluation = await evaluator.evaluate_run({
+                        "input": question,
+                        "recommendation_from_agent": rows,
+                        "conversation_response": result["response"],
+                    })
+                    result["scores"] = evaluation.metrics
+                runs[mode].append(result)
+            print(f"done: {question}")
+
+    await async_engine.dispose()
+    print(f"\n{len(QUESTIONS)} questions, {args.provider}/{args.model}")
+    for mode, results in runs.items():
+        summarize(mode, results)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,304 @@
+"""
+Check: the hot queries keep using indexes on a large catalog.
+
+Builds a synthetic catalog and chat history in a scratch schema (the real tables are
+untouched), refreshes movie_search over it, runs EXPLAIN on the queries
+_build_query produces for a set of questions and on the chat lookups in
+core/utils/helpers.py, and exits with status 1 if any plan has a Seq Scan on a table
+with at least --min-rows rows, or reads a table outside the scratch schema. Small
+tables such as genres are expected to be scanned. tests/test_query_plans.py runs the
+same check on a smaller catalog.
+
+Usage (from recommender-be/):
+    python -m benchmarks.query_plans
+    python -m benchmarks.query_plans --movies 1000000 --users 100000 --verbose
+"""
+
+import argparse
+import time
+from typing import Any, Dict, Iterator, List, Tuple
+
+from sqlalchemy import create_engine, text
+
+from config.settings import settings
+from core.agent.agent import MovieRecommendationAgent
+from db.movie_search import MOVIE_SEARCH_VIEW, ensure_search_vector, refresh_movie_search
+from models.models import Base
+
+SCHEMA = "query_plan_check"
+
+GENRES = ['Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary', 'Drama', 'Family',
+          'Fantasy', 'History', 'Horror', 'Music', 'Mystery', 'Romance', 'Science Fiction',
+          'TV Movie', 'Thriller', 'War', 'Western']
+
+# Questions covering each filter and sort of _build_query. They are explained without
+# their free-text terms, so every predicate has to be served on its own; profit ordering
+# is left out because it sorts on a computed expression no index can serve
+QUESTIONS = [
+    "what are the most popular movies?",
+    "which movies have the best rating?",
+    "show me high budget movies",
+    "movies with high revenue",
+    "comedy genre movies with a short runtime",
+    "action movies from the 90s",
+    "movies released in 2010",
+    "recent release thrillers",
+    "award winning dramas",
+    "movies in a franchise with sequels",
+    "movies with actor Tom Hanks",
+    "movies directed by Christopher Nolan",
+]
+
+# Free-text questions, explained as the agent builds them (search_vector match)
+TEXT_QUESTIONS = [
+    "heist movies about space",
+    "a robot family on an island",
+]
+
+# The SQL the helpers in core/utils/helpers.py and the ORM relationships emit
+CHAT_QUERIES = [
+    ("open conversation", """SELECT * FROM conversations WHERE user_id = :user_id AND end_time IS NULL LIMIT 1"""),
+    ("conversation messages", """SELECT * FROM messages WHERE conversation_id = :conversation_id ORDER BY "timestamp" """),
+    ("conversation evaluation", """SELECT * FROM model_evaluations WHERE conversation_id = :conversation_id"""),
+    ("user session", """SELECT * FROM sessions WHERE user_id = :user_id LIMIT 1"""),
+    ("latest model config", """SELECT * FROM model_configs WHERE user_id = :user_id ORDER BY created_at DESC LIMIT 1"""),
+    ("viewing history", """
+        SELECT m.id, m.title FROM movies m JOIN user_viewing_history h ON h.movie_id = m.id
+        WHERE h.user_id = :user_id ORDER BY h."timestamp" DESC LIMIT 10
+    """),
+    ("movie genres", """
+        SELECT g.name FROM movie_genre mg JOIN genres g ON g.id = mg.genre_id WHERE mg.movie_id = :movie_id
+    """),
+    ("actor movies", """
+        SELECT m.id, m.title FROM movie_actor ma JOIN movies m ON m.id = ma.movie_id WHERE ma.actor_id = :actor_id
+    """),
+    ("director movies", """SELECT id, title FROM movies WHERE director_id = :director_id"""),
+    ("actor by name", """SELECT id FROM actors WHERE name = :actor_name"""),
+    ("catalog by popularity", """SELECT id, title FROM movies ORDER BY popularity DESC LIMIT 10"""),
+    ("catalog by rating", """SELECT id, title FROM movies ORDER BY vote_average DESC, vote_count DESC LIMIT 10"""),
+    ("catalog by revenue", """SELECT id, title FROM movies ORDER BY revenue DESC LIMIT 10"""),
+]
+
+# Keyword names are mostly unique-ish topics; 'award' and 'sequel' are rare, as in TMDB
+SYNTHETIC_DATA = [
+    "INSERT INTO genres (id, name) SELECT i, name FROM unnest(CAST(:genres AS text[])) WITH ORDINALITY AS g(name, i)",
+    "INSERT INTO directors (id, name) SELECT i, 'Director ' || i FROM generate_series(1, :directors) i",
+    "INSERT INTO actors (id, name) SELECT i, 'Actor ' || i FROM generate_series(1, :actors) i",
+    """
+    INSERT INTO movies (id, title, overview, tagline, budget, revenue, popularity, vote_average, vote_count,
+                        runtime, original_language, release_date, keywords, director_id)
+    SELECT i, 'Movie ' || i,
+           'A story about ' || (ARRAY['space', 'love', 'war', 'heist', 'robot', 'family', 'revenge', 'island'])[1 + i % 8]
+               || ' and ' || (ARRAY['ghost', 'team', 'school', 'ocean', 'city', 'night', 'secret'])[1 + i % 7],
+           'Tagline ' || i,
+           (random() * 3e8)::int, (random() * 2e9)::int, random() * 100, round((random() * 10)::numeric, 1),
+           (random() * 20000)::int, 70 + (random() * 130)::int,
+           (ARRAY['en', 'fr', 'es', 'ja', 'de'])[1 + i % 5],
+           DATE '1920-01-01' + (random() * 38000)::int,
+           jsonb_build_array(
+               jsonb_build_object('id', i % 5000, 'name', 'keyword ' || i % 5000),
+               jsonb_build_object('id', 5000 + i % 997, 'name',
+                   CASE WHEN i % 500 = 0 THEN 'award' WHEN i % 400 = 0 THEN 'sequel' ELSE 'topic ' || i % 997 END)
+           ),
+           1 + i % :directors
+    FROM generate_series(1, :movies) i
+    """,
+    """
+    INSERT INTO movie_genre (movie_id, genre_id)
+    SELECT i, 1 + (i + k * 7) % 19 FROM generate_series(1, :movies) i, generate_series(0, 1 + i % 2) k
+    """,
+    """
+    INSERT INTO movie_actor (movie_id, actor_id)
+    SELECT i, 1 + (i::bigint * 7919 + k * 104729) % :actors FROM generate_series(1, :movies) i, generate_series(0, 2) k
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO users (id, google_id, email, name)
+    SELECT gen_random_uuid(), 'google-' || i, 'user' || i || '@example.com', 'User ' || i
+    FROM generate_series(1, :users) i
+    """,
+    """
+    INSERT INTO sessions (id, user_id, issued_at, expires_at)
+    SELECT gen_random_uuid(), id, now(), now() + interval '1 day' FROM users
+    """,
+    """
+    INSERT INTO model_configs (id, user_id, provider, model, api_key, created_at)
+    SELECT gen_random_uuid(), u.id, 'openai', 'gpt-4o', 'key', now() - k * interval '1 day'
+    FROM users u, generate_series(0, 1) k
+    """,
+    # Only the newest conversation of each user is still open
+    """
+    INSERT INTO conversations (id, user_id, model_config_id, start_time, end_time)
+    SELECT gen_random_uuid(), mc.user_id, mc.id, now() - k * interval '1 hour',
+           CASE WHEN k > 0 THEN now() - k * interval '1 hour' + interval '10 minutes' END
+    FROM (SELECT DISTINCT ON (user_id) id, user_id FROM model_configs) mc, generate_series(0, :conversations - 1) k
+    """,
+    """
+    INSERT INTO messages (id, conversation_id, role, content, "timestamp")
+    SELECT gen_random_uuid(), c.id, CASE WHEN k % 2 = 0 THEN 'user' ELSE 'assistant' END, 'Message ' || k,
+           c.start_time + k * interval '1 minute'
+    FROM conversations c, generate_series(0, :messages - 1) k
+    """,
+    """
+    INSERT INTO model_evaluations (id, model_config_id, model_name, conversation_id, metrics)
+    SELECT gen_random_uuid(), model_config_id, 'gpt-4o', id, '{}' FROM conversations
+    """,
+    """
+    INSERT INTO user_viewing_history (id, user_id, movie_id, "timestamp")
+    SELECT gen_random_uuid(), u.id, 1 + (random() * (:movies - 1))::int, now() - k * interval '1 day'
+    FROM users u, generate_series(1, :views) k
+    """,
+]
+
+
+def scratch_engine(url):
+    """Engine whose unqualified table names resolve to the scratch schema."""
+    return create_engine(url, connect_args={"options": f"-csearch_path={SCHEMA},public"})
+
+
+def dataset_params(movies: int, users: int, conversations: int = 10, messages: int = 6, views: int = 20) -> Dict[str, Any]:
+    return {
+        "genres": GENRES,
+        "movies": movies,
+        "actors": max(10, movies // 2),
+        "directors": max(5, movies // 10),
+        "users": users,
+        "conversations": conversations,
+        "messages": messages,
+        "views": views,
+    }
+
+
+def build_dataset(admin_engine, engine, params: Dict[str, Any]) -> None:
+    with admin_engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+        # Outside the scratch schema, so dropping it doesn't take the extension along
+        conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm SCHEMA public"))
+        Base.metadata.create_all(conn.execution_options(schema_translate_map={None: SCHEMA}))
+
+    with engine.begin() as conn:
+        # Computes search_vector as the movies go in
+        ensure_search_vector(conn, backfill=False)
+        for statement in SYNTHETIC_DATA:
+            conn.execute(text(statement), params)
+        refresh_movie_search(conn, concurrently=False)
+        tables = [table.name for table in Base.metadata.sorted_tables] + [MOVIE_SEARCH_VIEW]
+        conn.execute(text(f"ANALYZE {', '.join(tables)}"))
+
+
+def plan_nodes(plan: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def sample_params(conn) -> Dict[str, Any]:
+    """Ids that exist in the synthetic data, for the chat and association lookups."""
+    row = conn.execute(text("""
+        SELECT c.user_id, c.id AS conversation_id FROM conversations c
+        WHERE c.end_time IS NULL ORDER BY c.id LIMIT 1
+    """)).one()
+    return {
+        "user_id": str(row.user_id),
+        "conversation_id": str(row.conversation_id),
+        "movie_id": 42,
+        "actor_id": 42,
+        "director_id": 42,
+        "actor_name": "Actor 42",
+    }
+
+
+def catalog_queries() -> List[Tuple[str, Any, Dict[str, Any]]]:
+    agent = MovieRecommendationAgent(None, user=None)
+    queries = []
+    for question in TEXT_QUESTIONS:
+        query, params = agent._build_query(agent._classify_query(question), question)
+        queries.append((question, query, params))
+    agent._extract_search_terms = lambda question: []
+    for question in QUESTIONS:
+        query, params = agent._build_query(agent._classify_query(question), question)
+        queries.append((question, query, params))
+    return queries
+
+
+def drop_dataset(admin_engine) -> None:
+    with admin_engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+
+
+def check_plans(conn, min_rows: int) -> List[Dict[str, Any]]:
+    """EXPLAIN every query; each result lists the seq-scanned tables with at least min_rows rows."""
+    sizes = dict(conn.execute(text("""
+        SELECT c.relname, c.reltuples::bigint FROM pg_class c
+        JOIN pg_namespace n ON n.oid = c.relnamespace WHERE n.nspname = :schema
+    """), {"schema": SCHEMA}).all())
+    chat_params = sample_params(conn)
+    queries = catalog_queries() + [(name, text(sql), chat_params) for name, sql in CHAT_QUERIES]
+
+    results = []
+    for name, query, params in queries:
+        plan = conn.execute(text("EXPLAIN (FORMAT JSON, VERBOSE) " + query.text), params).scalar()[0]["Plan"]
+        nodes = list(plan_nodes(plan))
+        scans = sorted({node["Relation Name"] for node in nodes
+                        if node["Node Type"] == "Seq Scan" and sizes.get(node["Relation Name"], 0) >= min_rows})
+        results.append({
+            "name": name,
+            "query": query,
+            "params": params,
+            "scans": scans,
+            "indexes": sorted({node["Index Name"] for node in nodes if "Index Name" in node}),
+            # Relations outside the scratch schema: a name resolved to the real catalog
+            "outside": sorted({f"{node['Schema']}.{node['Relation Name']}" for node in nodes
+                               if "Relation Name" in node and node["Schema"] != SCHEMA}),
+        })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--movies", type=int, default=200_000)
+    parser.add_argument("--users", type=int, default=20_000)
+    parser.add_argument("--conversations", type=int, default=10, help="Conversations per user")
+    parser.add_argument("--messages", type=int, default=6, help="Messages per conversation")
+    parser.add_argument("--views", type=int, default=20, help="Viewing history rows per user")
+    parser.add_argument("--min-rows", type=int, default=10_000, help="Seq scans on smaller tables are allowed")
+    parser.add_argument("--verbose", action="store_true", help="Print every plan")
+    parser.add_argument("--keep", action="store_true", help=f"Keep the {SCHEMA} schema afterwards")
+    args = parser.parse_args()
+
+    admin_engine = create_engine(settings.DATABASE_URL)
+    engine = scratch_engine(settings.DATABASE_URL)
+
+    try:
+        start = time.perf_counter()
+        build_dataset(admin_engine, engine, dataset_params(
+            args.movies, args.users, args.conversations, args.messages, args.views
+        ))
+        print(f"Built synthetic data ({args.movies} movies, {args.users} users) in {time.perf_counter() - start:.1f}s")
+
+        with engine.connect() as conn:
+            results = check_plans(conn, args.min_rows)
+            for result in results:
+                status = "ok"
+                if result["outside"]:
+                    status = f"READS {', '.join(result['outside'])}"
+                elif result["scans"]:
+                    status = f"SEQ SCAN on {', '.join(result['scans'])}"
+                print(f"{result['name']:<40} {status:<30} {', '.join(result['indexes'])}")
+                if args.verbose or status != "ok":
+                    for line in conn.execute(text("EXPLAIN " + result["query"].text), result["params"]).scalars():
+                        print(f"    {line}")
+    finally:
+        if not args.keep:
+            drop_dataset(admin_engine)
+
+    failures = [result["name"] for result in results if result["scans"] or result["outside"]]
+    if failures:
+        print(f"{len(failures)} of {len(results)} queries fall back to a seq scan on a large table or read outside {SCHEMA}")
+        raise SystemExit(1)
+    print(f"All {len(results)} queries use indexes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+"""
+Benchmark: retrieve_data latency before and after the movie_search view.
+
+"before" runs the original join/GROUP BY query over movies, movie_genre, genres,
+movie_actor, actors and directors; "after" runs MovieRecommendationAgent.retrieve_data,
+which reads the movie_search materialized view. Requires the TMDB 5000 catalog to be
+loaded (python -m migrate.migrate_data).
+
+Usage (from recommender-be/):
+    python -m benchmarks.retrieval_latency --iterations 50
+"""
+
+import argparse
+import asyncio
+import re
+import statistics
+import time
+from typing import Any, Dict, List, Tuple
+
+from sqlalchemy import text
+
+from core.agent.agent import MovieRecommendationAgent
+from db.database import AsyncSessionLocal, async_engine
+
+QUESTIONS = [
+    "Recommend some science fiction movies",
+    "What are the top 10 popular action movies?",
+    "Show me high budget movies directed by Christopher Nolan",
+    "Which comedy movies have the best rating?",
+    "Movies with high revenue starring Tom Hanks",
+    "Give me some classic drama films",
+    "Recommend short animation movies for family",
+    "What are the most profitable thriller movies?",
+]
+
+
+def build_legacy_query(agent: MovieRecommendationAgent, query_types: List[str], question: str) -> Tuple[text, Dict[str, Any]]:
+    """The pre-movie_search query builder (six-way join + GROUP BY), kept as the baseline."""
+    limit = agent._extract_limit(question)
+
+    base_query = """
+    SELECT DISTINCT m.id, m.title, m.overview, m.budget, m.revenue, m.popularity, 
+           m.vote_average, m.vote_count, m.release_date, m.keywords,
+           string_agg(DISTINCT g.name, ', ') as genres,
+           (SELECT string_agg(name, ', ')
+            FROM (SELECT DISTINCT a.name 
+                  FROM movie_actor ma 
+                  JOIN actors a ON ma.actor_id = a.id 
+                  WHERE ma.movie_id = m.id 
+                  ORDER BY a.name 
+                  LIMIT :actor_limit) AS top_actors
+           ) as top_actors,
+           d.name as director
+    FROM movies m
+    LEFT JOIN movie_genre mg ON m.id = mg.movie_id
+    LEFT JOIN genres g ON mg.genre_id = g.id
+    LEFT JOIN movie_actor ma ON m.id = ma.movie_id
+    LEFT JOIN actors a ON ma.actor_id = a.id
+    LEFT JOIN directors d ON m.director_id = d.id
+    WHERE 1=1
+    """
+
+    conditions = []
+    order_by = []
+    params = {"actor_limit": limit}
+
+    if "financial" in query_types:
+        if 'high budget' in question:
+            conditions.append("m.budget > 0")
+            order_by.append("m.budget DESC")
+        elif 'low budget' in question:
+            conditions.append("m.budget > 0")
+            order_by.append("m.budget ASC")
+        elif 'high revenue' in question:
+            conditions.append("m.revenue > 0")
+            order_by.append("m.revenue DESC")
+        elif 'low revenue' in question:
+            conditions.append("m.revenue > 0")
+            order_by.append("m.revenue ASC")
+        elif 'profit' in question:
+            conditions.append("m.revenue > 0 AND m.budget > 0")
+            order_by.append("(m.revenue - m.budget) DESC")
+        else:
+            order_by.append("m.revenue DESC")
+
+    if "popularity" in query_types:
+        if 'rating' in question or 'vote' in question:
+            order_by.extend(["m.vote_average DESC", "m.vote_count DESC"])
+        elif 'trending' in question:
+            order_by.extend(["m.popularity DESC", "m.release_date DESC"])
+        else:
+            order_by.append("m.popularity DESC")
+
+    if "genre" in query_types:
+        genres = ['Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary', 'Drama', 'Family', 
+                  'Fantasy', 'History', 'Horror', 'Music', 'Mystery', 'Romance', 'Science Fiction', 
+                  'TV Movie', 'Thriller', 'War', 'Western']
+
+        genre_conditions = []
+        for i, genre in enumerate(genres):
+            if genre.lower() in question.lower():
+                genre_conditions.append(f"LOWER(g.name) = :genre_{i}")
+                params[f"genre_{i}"] = genre.lower()
+
+        if genre_conditions:
+            conditions.append("(" + " OR ".join(genre_conditions) + ")")
+
+    if "actor" in query_types:
+        actor_name = agent._extract_name(question)
+        if actor_name:
+            conditions.append("LOWER(a.name) LIKE LOWER(:actor_name)")
+            params["actor_name"] = f"%{actor_name}%"
+
+    if "director" in query_types:
+        director_name = agent._extract_name(question)
+        if director_name:
+            conditions.append("LOWER(d.name) LIKE LOWER(:director_name)")
+            params["director_name"] = f"%{director_name}%"
+
+    if "release_date" in query_types:
+        year_match = re.search(r'\b(19|20)\d{2}\b', question)
+        if year_match:
+            year = year_match.group()
+            conditions.append("EXTRACT(YEAR FROM m.release_date) = :year")
+            params["year"] = int(year)
+        elif 'recent' in question or 'latest' in question:
+            conditions.append("m.release_date >= (CURRENT_DATE - INTERVAL '2 years')")
+            order_by.append("m.release_date DESC")
+        elif 'old' in question or 'classic' in question:
+            conditions.append("EXTRACT(YEAR FROM m.release_date) < 1980")
+            order_by.append("m.release_date ASC")
+
+    if "awards" in query_types:
+        conditions.append("m.keywords::text LIKE '%award%' OR m.keywords::text LIKE '%nominated%'")
+
+    if "language" in query_types:
+        lang_match = re.search(r'in ([\w\s]+)', question)
+        if lang_match:
+            lang = lang_match.group(1).strip().lower()
+            conditions.append("LOWER(m.original_language) = :lang")
+            params["lang"] = lang
+
+    if "duration" in query_types:
+        if 'short' in question:
+            conditions.append("m.runtime <= 90")
+        elif 'long' in question:
+            conditions.append("m.runtime >= 150")
+
+    if "franchise" in query_types:
+        conditions.append("m.keywords::text LIKE '%sequel%' OR m.keywords::text LIKE '%series%'")
+
+    # Add conditions to base query
+    if conditions:
+        base_query += " AND " + " AND ".join(conditions)
+
+    # Add search terms for general queries
+    search_terms = [term.lower() for term in question.split() if len(term) > 2]
+    if search_terms:
+        search_condition = " OR ".join([
+            f"LOWER(m.title) LIKE :term_{i} OR LOWER(m.overview) LIKE :term_{i} OR LOWER(m.keywords::text) LIKE :term_{i}"
+            for i in range(len(search_terms))
+        ])
+        base_query += f" AND ({search_condition})"
+        for i, term in enumerate(search_terms):
+            params[f"term_{i}"] = f"%{term}%"
+
+    # Add GROUP BY clause
+    base_query += " GROUP BY m.id, d.name"
+
+    # Add ORDER BY clause
+    if order_by:
+        base_query += " ORDER BY " + ", ".join(order_by)
+    else:
+        base_query += " ORDER BY m.popularity DESC"
+
+    base_query += " LIMIT :result_limit"
+    params["result_limit"] = limit
+
+    return text(base_query), params
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return ordered[index]
+
+
+async def time_legacy(agent: MovieRecommendationAgent, question: str) -> float:
+    query_types = agent._classify_query(question)
+    query, params = build_legacy_query(agent, query_types, question)
+    start = time.perf_counter()
+    await agent._execute_query(query, params)
+    return time.perf_counter() - start
+
+
+async def time_movie_search(agent: MovieRecommendationAgent, question: str) -> float:
+    start = time.perf_counter()
+    await agent.retrieve_data(question)
+    return time.perf_counter() - start
+
+
+async def run(iterations: int):
+    async with AsyncSessionLocal() as db:
+        agent = MovieRecommendationAgent(db, user=None)
+        for label, timer in (("before (joins)", time_legacy), ("after (movie_search)", time_movie_search)):
+            # Warm up caches so both modes are measured hot
+            for question in QUESTIONS:
+                await timer(agent, question)
+            samples = []
+            for _ in range(iterations):
+                for question in QUESTIONS:
+                    samples.append(await timer(agent, question))
+            print(
+                f"{label:>22}: p50 {statistics.median(samples) * 1000:.2f} ms, "
+                f"p99 {percentile(samples, 99) * 1000:.2f} ms over {len(samples)} queries"
+            )
+    await async_engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=50)
+    args = parser.parse_args()
+    asyncio.run(run(args.iterations))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Benchmark: semantic cache hit rate, false-hit rate and latency saved.
+
+The corpus is groups of paraphrases of the same request plus near-miss questions
+that must NOT share an answer with any group ("top 5" vs "top 10", a different
+genre, a negation). The first question of each group is stored, the rest are looked
+up under the agent's retrieval_scope, and every threshold in --thresholds is scored:
+  hit rate       - paraphrases answered from the cache (a paraphrase that extracts
+                   other search terms runs another query and misses by design)
+  false-hit rate - near misses that were answered from the cache (wrong answer)
+
+With --with-db, retrieve_data is timed on the first question of each group to
+report the retrieval latency a hit saves.
+
+Usage (from recommender-be/):
+    python -m benchmarks.semantic_cache
+    python -m benchmarks.semantic_cache --thresholds 0.8 0.85 0.88 0.92 --with-db
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import List
+
+from core.cache.semantic_cache import SemanticCache
+
+PARAPHRASES = [
+    [
+        "Recommend some science fiction movies",
+        "suggest sci-fi films",
+        "Can you recommend some sci fi movies?",
+        "give me science fiction films please",
+    ],
+    [
+        "What are the top 5 popular action movies?",
+        "top 5 popular action films",
+        "Show me the 5 most popular action movies",
+    ],
+    [
+        "Which comedy movies have the best rating?",
+        "highest rated comedies",
+        "top-rated comedy films",
+        "best rating comedy movies",
+    ],
+    [
+        "Recommend animated movies for kids",
+        "cartoon movies for children",
+        "suggest animation films for family",
+    ],
+    [
+        "scary movies from the 80s",
+        "horror films from the 80s",
+        "recommend horror movies from the 80s",
+    ],
+    [
+        "Movies directed by Christopher Nolan",
+        "films directed by Christopher Nolan",
+        "list movies by director Christopher Nolan",
+    ],
+]
+
+# Each of these is close in wording to a group above but needs a different answer
+NEAR_MISSES = [
+    "What are the top 10 popular action movies?",
+    "Recommend some fantasy movies",
+    "Which drama movies have the best rating?",
+    "horror films from the 90s",
+    "Movies directed by Steven Spielberg",
+    "Recommend animated movies for adults",
+    "comedy movies without romance",
+    "Recommend some romantic comedy movies",
+]
+
+
+def evaluate(threshold: float):
+    from core.agent.agent import MovieRecommendationAgent
+
+    # Scoped as in the pipeline: only questions that would run the same query can match
+    scope = MovieRecommendationAgent(None, None).retrieval_scope
+    cache = SemanticCache("benchmark", threshold=threshold, max_entries=1000, ttl=3600)
+    for group_id, group in enumerate(PARAPHRASES):
+        cache.store(group[0], scope(group[0]), group_id)
+
+    hits = 0
+    paraphrase_count = 0
+    latencies: List[float] = []
+    for group_id, group in enumerate(PARAPHRASES):
+        for question in group[1:]:
+            paraphrase_count += 1
+            start = time.perf_counter()
+            hit = cache.lookup(question, scope(question))
+            latencies.append((time.perf_counter() - start) * 1000)
+            hits += bool(hit and hit[1] == group_id)
+
+    false_hits = 0
+    for question in NEAR_MISSES:
+        if not cache.is_cacheable(question):
+            continue
+        start = time.perf_counter()
+        hit = cache.lookup(question, scope(question))
+        latencies.append((time.perf_counter() - start) * 1000)
+        false_hits += bool(hit)
+
+    return hits / paraphrase_count, false_hits / len(NEAR_MISSES), latencies
+
+
+async def retrieval_latency() -> List[float]:
+    from core.agent.agent import MovieRecommendationAgent
+    from db.database import AsyncSessionLocal, async_engine
+
+    latencies = []
+    async with AsyncSessionLocal() as db:
+        agent = MovieRecommendationAgent(db, None)
+        for group in PARAPHRASES:
+            start = time.perf_counter()
+            await agent.retrieve_data(group[0])
+            latencies.append((time.perf_counter() - start) * 1000)
+    await async_engine.dispose()
+    return latencies
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--thresholds", type=float, nargs="+", default=[0.8, 0.85, 0.88, 0.92, 0.95])
+    parser.add_argument("--with-db", action="store_true")
+    args = parser.parse_args()
+
+    print(f"{len(PARAPHRASES)} paraphrase groups, {sum(len(group) - 1 for group in PARAPHRASES)} lookups, "
+          f"{len(NEAR_MISSES)} near misses")
+    print(f"{'threshold':>10} {'hit rate':>9} {'false hits':>11} {'lookup p50 ms':>14}")
+    for threshold in args.thresholds:
+        hit_rate, false_hit_rate, latencies = evaluate(threshold)
+        print(f"{threshold:>10.2f} {hit_rate:>9.0%} {false_hit_rate:>11.0%} {statistics.median(latencies):>14.3f}")
+
+    if args.with_db:
+        latencies = asyncio.run(retrieval_latency())
+        print(f"\nretrieve_data p50 {statistics.median(latencies):.1f} ms, max {max(latencies):.1f} ms "
+              f"(saved per retrieval-cache hit)")
+
+
+if __name__ == "__main__":
+    main()
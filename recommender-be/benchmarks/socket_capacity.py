@@ -0,0 +1,125 @@
+"""
+Benchmark: how many concurrent chat sockets one worker can hold.
+
+Each simulated socket sends a few messages separated by idle time. In "held" mode
+a socket keeps one AsyncSession for its whole lifetime (the old behaviour); in
+"scoped" mode it opens a unit of work per message via async_session_scope.
+
+Usage (from recommender-be/):
+    python -m benchmarks.socket_capacity --sockets 200 --messages 3 --idle 2
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from contextlib import asynccontextmanager
+
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+from config.settings import settings
+from db.database import get_async_database_url, get_pool_options
+
+
+def build_engine(pool_timeout: float):
+    options = get_pool_options()
+    options["pool_timeout"] = pool_timeout
+    return create_async_engine(get_async_database_url(), **options)
+
+
+async def simulate_message(db: AsyncSession, work: float):
+    # Stand-in for the pipeline's queries plus part of the LLM stream
+    await db.execute(text("SELECT pg_sleep(:work)"), {"work": work})
+
+
+async def held_socket(session_factory, messages: int, idle: float, work: float, waits: list):
+    start = time.perf_counter()
+    async with session_factory() as db:
+        await db.execute(text("SELECT 1"))
+        waits.append(time.perf_counter() - start)
+        for _ in range(messages):
+            await simulate_message(db, work)
+            await db.commit()  # commits, but the session keeps its connection checked out
+            await db.execute(text("SELECT 1"))
+            await asyncio.sleep(idle)
+
+
+async def scoped_socket(session_factory, messages: int, idle: float, work: float, waits: list):
+    @asynccontextmanager
+    async def scope():
+        db = session_factory()
+        try:
+            yield db
+            await db.commit()
+        finally:
+            await db.close()
+
+    for _ in range(messages):
+        start = time.perf_counter()
+        async with scope() as db:
+            await db.execute(text("SELECT 1"))
+            waits.append(time.perf_counter() - start)
+            await simulate_message(db, work)
+        await asyncio.sleep(idle)
+
+
+async def run(mode: str, sockets: int, messages: int, idle: float, work: float, pool_timeout: float):
+    engine = build_engine(pool_timeout)
+    session_factory = async_sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+    runner = held_socket if mode == "held" else scoped_socket
+    waits = []
+    peak = 0
+
+    async def sample_pool():
+        nonlocal peak
+        while True:
+            peak = max(peak, engine.pool.checkedout())
+            await asyncio.sleep(0.01)
+
+    sampler = asyncio.create_task(sample_pool())
+    started = time.perf_counter()
+    results = await asyncio.gather(
+        *(runner(session_factory, messages, idle, work, waits) for _ in range(sockets)),
+        return_exceptions=True,
+    )
+    elapsed = time.perf_counter() - started
+    sampler.cancel()
+    await engine.dispose()
+
+    failed = sum(1 for r in results if isinstance(r, Exception))
+    waits.sort()
+    return {
+        "mode": mode,
+        "sockets": sockets,
+        "served": sockets - failed,
+        "failed": failed,
+        "peak_connections": peak,
+        "acquire_p50_ms": statistics.median(waits) * 1000 if waits else None,
+        "acquire_p99_ms": waits[int(len(waits) * 0.99) - 1] * 1000 if waits else None,
+        "elapsed_s": elapsed,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sockets", type=int, default=200)
+    parser.add_argument("--messages", type=int, default=3)
+    parser.add_argument("--idle", type=float, default=2.0, help="Seconds between messages")
+    parser.add_argument("--work", type=float, default=0.02, help="Seconds of DB work per message")
+    parser.add_argument("--pool-timeout", type=float, default=5.0)
+    args = parser.parse_args()
+
+    print(f"Pool: size={settings.DB_POOL_SIZE} overflow={settings.DB_MAX_OVERFLOW}")
+    for mode in ("held", "scoped"):
+        result = asyncio.run(run(mode, args.sockets, args.messages, args.idle, args.work, args.pool_timeout))
+        print(
+            f"{result['mode']:>6}: served {result['served']}/{result['sockets']} sockets, "
+            f"peak connections {result['peak_connections']}, "
+            f"acquire p50 {result['acquire_p50_ms'] or 0:.1f} ms / p99 {result['acquire_p99_ms'] or 0:.1f} ms, "
+            f"{result['elapsed_s']:.1f} s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""
+Benchmark: pgvector HNSW search against exact brute-force search.
+
+Exact neighbours come from a numpy brute-force scan over all embeddings and from
+Postgres with index scans disabled. HNSW results are scored with recall@k against
+the numpy ground truth at several hnsw.ef_search values. Requires
+migrate/build_embeddings.py to have been run.
+
+Usage (from recommender-be/):
+    python -m benchmarks.vector_search --queries 200 --k 10
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+from sqlalchemy import create_engine, text
+
+from config.settings import settings
+from core.retrieval.embeddings import to_pgvector
+
+KNN_QUERY = text("""
+    SELECT movie_id FROM movie_features
+    WHERE embedding IS NOT NULL
+    ORDER BY embedding <=> CAST(CAST(:embedding AS text) AS vector)
+    LIMIT :k
+""")
+
+
+def load_embeddings(conn):
+    rows = conn.execute(text(
+        "SELECT movie_id, embedding::text FROM movie_features WHERE embedding IS NOT NULL ORDER BY movie_id"
+    )).all()
+    ids = np.array([row[0] for row in rows])
+    matrix = np.array([np.fromstring(row[1].strip("[]"), sep=",") for row in rows], dtype=np.float32)
+    return ids, matrix
+
+
+def summarize(label: str, latencies, recalls=None):
+    latencies = sorted(latencies)
+    p99 = latencies[max(0, int(len(latencies) * 0.99) - 1)]
+    line = f"{label:>28}: p50 {statistics.median(latencies) * 1000:.3f} ms, p99 {p99 * 1000:.3f} ms"
+    if recalls is not None:
+        line += f", recall@k {statistics.mean(recalls):.3f}"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--ef-search", type=int, nargs="+", default=[20, 40, 100, 200])
+    args = parser.parse_args()
+
+    engine = create_engine(settings.DATABASE_URL)
+    with engine.connect() as conn:
+        ids, matrix = load_embeddings(conn)
+        print(f"{len(ids)} embeddings of dimension {matrix.shape[1]}")
+
+        rng = np.random.default_rng(42)
+        query_rows = rng.choice(len(ids), size=min(args.queries, len(ids)), replace=False)
+        queries = matrix[query_rows]
+
+        # Ground truth: exact cosine similarity in numpy (vectors are L2-normalised)
+        truth, latencies = [], []
+        for query in queries:
+            start = time.perf_counter()
+            scores = matrix @ query
+            top = np.argpartition(-scores, args.k)[:args.k]
+            top = top[np.argsort(-scores[top])]
+            latencies.append(time.perf_counter() - start)
+            truth.append(set(ids[top].tolist()))
+        summarize("numpy brute force", latencies)
+
+        with conn.begin():
+            conn.execute(text("SET LOCAL enable_indexscan = off"))
+            latencies = []
+            for query in queries:
+                start = time.perf_counter()
+                conn.execute(KNN_QUERY, {"embedding": to_pgvector(query), "k": args.k}).all()
+                latencies.append(time.perf_counter() - start)
+        summarize("postgres exact (seq scan)", latencies)
+
+        for ef_search in args.ef_search:
+            with conn.begin():
+                conn.execute(text("SELECT set_config('hnsw.ef_search', :ef, true)"), {"ef": str(ef_search)})
+                latencies, recalls = [], []
+                for query, expected in zip(queries, truth):
+                    start = time.perf_counter()
+                    found = conn.execute(KNN_QUERY, {"embedding": to_pgvector(query), "k": args.k}).scalars().all()
+                    latencies.append(time.perf_counter() - start)
+                    recalls.append(len(expected & set(found)) / args.k)
+            summarize(f"postgres hnsw ef_search={ef_search}", latencies, recalls)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+"""
+Benchmark: WebSocket frames and CPU per streamed answer, per-token vs coalesced.
+
+A fake provider streams --tokens tokens per stream (agent_thought then
+final_response, like the two-pass pipeline) at --token-interval ms apart into a
+fake socket. "per_token" is the old path (one json.dumps + send per token),
+"coalesced" goes through core.streaming.FrameSender. --client-delay adds a per-frame
+send delay to show backpressure: the producer waits instead of queueing the answer.
+
+Usage (from recommender-be/):
+    python -m benchmarks.ws_frames --answers 20 --tokens 1000 --token-interval 1
+    python -m benchmarks.ws_frames --client-delay 5
+"""
+
+import argparse
+import asyncio
+import json
+import time
+import uuid
+from datetime import datetime
+
+from core.streaming import FrameSender
+
+
+class FakeSocket:
+    def __init__(self, delay: float):
+        self.delay = delay
+        self.frames = 0
+        self.bytes = 0
+        self.text = []
+
+    async def send_text(self, data: str):
+        self.frames += 1
+        self.bytes += len(data)
+        self.text.append(data)
+        if self.delay:
+            await asyncio.sleep(self.delay)
+
+    async def send_json(self, data: dict):
+        await self.send_text(json.dumps(data))
+
+
+def token_frames(tokens: int):
+    message_id = str(uuid.uuid4())
+    for response_type in ("agent_thought", "final_response"):
+        for index in range(tokens):
+            yield {
+                "message_id": message_id,
+                "content": f"tok{index} ",
+                "type": response_type,
+                "timestamp": datetime.utcnow().isoformat(),
+            }
+    yield {"message_id": message_id, "content": "", "type": "end", "timestamp": datetime.utcnow().isoformat()}
+
+
+async def stream_answer(mode: str, socket: FakeSocket, tokens: int, interval: float):
+    sender = FrameSender(socket.send_text).start() if mode == "coalesced" else None
+    max_blocked = 0.0
+    for frame in token_frames(tokens):
+        start = time.perf_counter()
+        if sender is not None:
+            await sender.send(frame)
+        else:
+            await socket.send_json(frame)
+        max_blocked = max(max_blocked, time.perf_counter() - start)
+        if interval:
+            await asyncio.sleep(interval)
+    if sender is not None:
+        await sender.aclose()
+    return max_blocked
+
+
+def reassemble(socket: FakeSocket) -> str:
+    return "".join(json.loads(text)["content"] for text in socket.text)
+
+
+async def run(mode: str, args) -> dict:
+    socket = FakeSocket(args.client_delay / 1000)
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    max_blocked = 0.0
+    for _ in range(args.answers):
+        max_blocked = max(max_blocked, await stream_answer(mode, socket, args.tokens, args.token_interval / 1000))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+    return {
+        "frames_per_answer": socket.frames / args.answers,
+        "frames_per_sec": socket.frames / wall,
+        "cpu_ms_per_answer": cpu * 1000 / args.answers,
+        "kib_per_answer": socket.bytes / 1024 / args.answers,
+        "max_producer_wait_ms": max_blocked * 1000,
+        "content": reassemble(socket),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--answers", type=int, default=20)
+    parser.add_argument("--tokens", type=int, default=1000, help="Tokens per stream (two streams per answer)")
+    parser.add_argument("--token-interval", type=float, default=0.0, help="ms between provider tokens")
+    parser.add_argument("--client-delay", type=float, default=0.0, help="ms the client takes per frame")
+    args = parser.parse_args()
+
+    results = {mode: asyncio.run(run(mode, args)) for mode in ("per_token", "coalesced")}
+    assert results["per_token"]["content"] == results["coalesced"]["content"], "coalescing changed the text"
+
+    print(f"{args.answers} answers x 2 streams x {args.tokens} tokens, token interval {args.token_interval} ms, "
+          f"client delay {args.client_delay} ms")
+    print(f"{'mode':<10} {'frames/answer':>14} {'frames/s':>10} {'CPU ms/answer':>14} {'KiB/answer':>11} {'max wait ms':>12}")
+    for mode, result in results.items():
+        print(f"{mode:<10} {result['frames_per_answer']:>14.0f} {result['frames_per_sec']:>10.0f} "
+              f"{result['cpu_ms_per_answer']:>14.2f} {result['kib_per_answer']:>11.1f} "
+              f"{result['max_producer_wait_ms']:>12.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,4 @@
+from typing import Optional
 from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
@@ -7,6 +8,7 @@ class Settings(BaseSettings):
     FRONTEND_URL: str
     SECRET_KEY: str
     DATABASE_URL: str
+    ASYNC_DATABASE_URL: Optional[str] = None  # Defaults to DATABASE_URL with the asyncpg driver
     OPENAI_API_KEY: str
     ALGORITHM: str
     ACCESS_TOKEN_EXPIRE_MINUTES: int
@@ -16,6 +18,17 @@ class Settings(BaseSettings):
     WEBSOCKET_KEEPALIVE_TIMEOUT: int = 60  # Default 60 seconds
     WEBSOCKET_PONG_TIMEOUT: int = 10  # Default 10 seconds
     WEBSOCKET_RECEIVE_TIMEOUT: int = 60  # Default 60 seconds
+    WEBSOCKET_COALESCE_WINDOW_MS: float = 20  # Merge streamed tokens for up to this long per frame (0 disables)
+    WEBSOCKET_COALESCE_MAX_BYTES: int = 256  # ...or until a frame holds this much content
+    WEBSOCKET_SEND_QUEUE_SIZE: int = 256  # Frames buffered per socket before the producer waits
+    WEBSOCKET_SEND_TIMEOUT: float = 10  # A send stalled this long drops the socket
+
+    # Database connection pool settings (applied to both sync and async engines)
+    DB_POOL_SIZE: int = 5
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: int = 30  # Seconds to wait for a free connection
+    DB_POOL_RECYCLE: int = 1800  # Recycle connections after 30 minutes
+    DB_POOL_PRE_PING: bool = True
     
     # Langfuse settings
     LANGFUSE_SECRET_KEY: str
@@ -24,6 +37,96 @@ class Settings(BaseSettings):
 
     EVALUATION_THRESHOLDS: float = 0.5
 
+    # Free-text matching in MovieRecommendationAgent._build_query:
+    # "fts" uses the search_vector GIN index with ts_rank, "like" is the legacy LIKE scan
+    TEXT_SEARCH_MODE: str = "fts"
+    TEXT_SEARCH_MAX_TERMS: int = 8
+
+    # Semantic retrieval over MovieFeature.embedding (pgvector)
+    SEMANTIC_SEARCH_ENABLED: bool = True
+    EMBEDDER: str = "hashing"  # "hashing" (stateless) or "tfidf_svd" (fitted by migrate/build_embeddings.py)
+    EMBEDDER_MODEL_PATH: str = "artifacts/tfidf_svd_embedder.joblib"
+    HNSW_EF_SEARCH: int = 40
+    SEMANTIC_FILTER_CANDIDATES: int = 200  # Neighbours fetched before a question's SQL filters are applied
+
+    # In-process FAISS index (built by migrate/build_faiss_index.py)
+    FAISS_ENABLED: bool = True
+    FAISS_INDEX_PATH: str = "artifacts/movies.faiss"
+    FAISS_INDEX_TYPE: str = "auto"  # "auto", "flat", "hnsw" or "ivf"
+    FAISS_FLAT_MAX_VECTORS: int = 50000  # "auto" uses an exact Flat index up to this size
+    FAISS_RELOAD_INTERVAL: int = 30  # Seconds between checks for a rebuilt index file
+
+    # Item-item collaborative filtering over user_viewing_history
+    CF_ENABLED: bool = True
+    CF_NEIGHBOURS: int = 50  # Neighbours kept per movie
+    CF_COMPACT_THRESHOLD: int = 50000  # Pending co-occurrence increments merged into the matrix inline
+
+    # Content-based neighbours (built by migrate/build_content_similarity.py)
+    CONTENT_SIMILARITY_ENABLED: bool = True
+    CONTENT_SIMILARITY_PATH: str = "artifacts/content_similarity.npz"
+    CONTENT_SIMILARITY_TOP_K: int = 50  # Neighbours kept per movie
+
+    # Chat pipeline
+    PIPELINE_MODE: str = "two_pass"  # "two_pass" (agent reasoning + answer) or "single_pass" (one generation)
+    PIPELINE_REASONING_TRACE: bool = False  # single_pass: send the retrieval trace as an agent_thought event
+    PROMPT_ROWS_MAX_TOKENS: int = 1500  # Hard ceiling for the retrieved-rows block of a prompt
+    PROMPT_OVERVIEW_CHARS: int = 160  # Overviews (and keyword lists) are cut to this length
+    PROMPT_TOKEN_ENCODING: str = "cl100k_base"
+
+    # Per-session conversation memory (core/memory.py)
+    MEMORY_MAX_TOKENS: int = 2000  # Token budget for the kept turns
+    MEMORY_MAX_MESSAGES: int = 10  # create_memory_prompt never uses more than this
+    MEMORY_MAX_MESSAGE_TOKENS: int = 400  # Each stored message is cut to this
+    MEMORY_SUMMARIZE: bool = False  # Fold evicted turns into a running summary in the background
+    MEMORY_SUMMARY_TOKENS: int = 200
+
+    # Exact-match response cache (core/cache/response_cache.py)
+    RESPONSE_CACHE_ENABLED: bool = True
+    RESPONSE_CACHE_BACKEND: str = "memory"  # "memory" (per process) or "redis" (shared, needs REDIS_URL)
+    RESPONSE_CACHE_TTL: int = 3600
+    RESPONSE_CACHE_MAX_ENTRIES: int = 1000
+    RESPONSE_CACHE_REPLAY_DELAY: float = 0.0  # Seconds to pause every 8 replayed chunks
+    REDIS_URL: Optional[str] = None
+    CATALOG_VERSION_TTL: int = 30  # Seconds a worker trusts its cached catalog_version
+
+    # Semantic cache for paraphrased questions (core/cache/semantic_cache.py)
+    SEMANTIC_CACHE_ENABLED: bool = True  # Reuse retrieval results of near-identical questions
+    SEMANTIC_CACHE_THRESHOLD: float = 0.85  # Cosine similarity; benchmarks.semantic_cache has 0 false hits here
+    SEMANTIC_CACHE_ANSWERS: bool = False  # Also replay full answers (stricter threshold below)
+    SEMANTIC_CACHE_ANSWER_THRESHOLD: float = 0.95
+    SEMANTIC_CACHE_MAX_ENTRIES: int = 2000
+    SEMANTIC_CACHE_TTL: int = 3600
+    SEMANTIC_CACHE_VERIFY_RATE: float = 0.05  # Share of hits re-retrieved to measure false hits
+    SEMANTIC_CACHE_MIN_OVERLAP: float = 0.5  # Below this id overlap a verified hit counts as false
+
+    # Catalog query result cache (core/cache/query_cache.py)
+    QUERY_CACHE_ENABLED: bool = True
+    QUERY_CACHE_MAX_BYTES: int = 64 * 1024 * 1024  # Estimated heap of all cached rows, LRU-evicted past this
+    QUERY_CACHE_MAX_ENTRY_BYTES: int = 4 * 1024 * 1024  # Larger results are not cached
+    QUERY_CACHE_TTL: int = 6 * 3600  # Safety net; catalog_version bumps invalidate immediately
+
+    # Background answer evaluation (core/evaluation/worker.py)
+    EVALUATION_ENABLED: bool = True
+    EVALUATION_SAMPLE_RATE: float = 1.0  # Share of answers sent to the judge (0.1 = 10%)
+    EVALUATION_WORKER_CONCURRENCY: int = 2  # Judge calls in flight per API worker
+    EVALUATION_PROCESS_POOL: int = 0  # >0 runs judge calls in this many child processes
+    EVALUATION_QUEUE_SIZE: int = 1000  # Jobs held in memory; the rest wait in evaluation_jobs
+    EVALUATION_MAX_ATTEMPTS: int = 3
+    EVALUATION_SWEEP_INTERVAL: int = 30  # Seconds between scans for pending and stuck jobs
+    EVALUATION_JOB_TIMEOUT: int = 300  # A job 'running' longer than this is assumed orphaned
+
+    # Offline batch evaluation (core/evaluation/batch_runner.py)
+    FAKE_PROVIDER_ENABLED: bool = False  # Allows provider "fake"; only the batch runner turns this on
+
+    # Shared LLM provider clients (core/client_registry.py)
+    LLM_CLIENT_CACHE_SIZE: int = 64  # Distinct (provider, api key, base_url) clients kept
+    LLM_MAX_CONCURRENCY_PER_KEY: int = 8  # In-flight requests per API key
+    LLM_HTTP2: bool = True
+    LLM_HTTP_MAX_CONNECTIONS: int = 100
+    LLM_HTTP_MAX_KEEPALIVE: int = 20
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = 60.0
+    LLM_REQUEST_TIMEOUT: float = 60.0
+
     class Config:
         env_file = ".env"
 
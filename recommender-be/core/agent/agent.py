@@ -1,25 +1,99 @@
 import logging
 import re
-from sqlalchemy.orm import Session
-from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import text, select
 from models.models import User, ModelConfig, Conversation, Message, ModelEvaluation
 from core.model_interface import ModelFactory
 from langchain.schema import HumanMessage, SystemMessage
 from langchain.memory import ConversationBufferWindowMemory
 from langfuse.decorators import observe, langfuse_context
 from config.langfuse_config import get_langfuse
-import json
-from typing import Dict, Any, List, AsyncGenerator, Tuple, Optional
+from config.settings import settings
+from typing import Dict, Any, List, AsyncGenerator, Tuple, Optional, Sequence
 
 from core.utils.prompts import get_chain_of_thought_system_message
+from core.utils.serializer import serialize_rows
+from core.retrieval.embeddings import get_embedder, to_pgvector, from_pgvector
+from core.retrieval.faiss_index import movie_index
+from core.retrieval.collaborative import collaborative_model
+from core.retrieval.content_similarity import content_similarity
+from core.retrieval.fusion import reciprocal_rank_fusion
+from core.cache.query_cache import query_cache
+from db.catalog import get_catalog_version
 
 logger = logging.getLogger(__name__)
 
 # Get the Langfuse instance from the centralized config
 langfuse = get_langfuse()
 
+# Words that carry no retrieval signal; without this every "the", "and" or "movies"
+# in a question would become another term in the free-text match
+SEARCH_STOPWORDS = frozenset([
+    'the', 'and', 'for', 'with', 'that', 'this', 'from', 'are', 'was', 'were', 'you', 'your',
+    'can', 'could', 'would', 'should', 'what', 'which', 'who', 'whom', 'when', 'where', 'why',
+    'how', 'some', 'any', 'all', 'more', 'most', 'than', 'then', 'them', 'they', 'have', 'has',
+    'had', 'about', 'into', 'like', 'just', 'also', 'very', 'much', 'many', 'but', 'not', 'out',
+    'movie', 'movies', 'film', 'films', 'recommend', 'recommendation', 'recommendations',
+    'suggest', 'show', 'give', 'list', 'find', 'tell', 'want', 'watch', 'please', 'good',
+    'best', 'top', 'great', 'similar', 'results', 'one', 'ones',
+    # Year range words, handled by _extract_year_range
+    'between', 'before', 'after', 'since', 'until', 'pre', 'post',
+])
+
+# Columns returned to the prompt by every retrieval strategy
+MOVIE_SEARCH_COLUMNS = """ms.id, ms.title, ms.overview, ms.budget, ms.revenue, ms.popularity,
+               ms.vote_average, ms.vote_count, ms.release_date, ms.keywords,
+               ms.genres, ms.top_actors, ms.director"""
+
+# "90s", "'90s", "1990s"; two-digit decades below 30 are read as 2000s, 2010s, 2020s
+DECADE_PATTERN = re.compile(r"(?:\b(1[89]|20)(\d)0|(?<!\d)'?\b(\d)0)'?s\b", re.IGNORECASE)
+YEAR_RANGE_PATTERN = re.compile(
+    r"\b(?:between|from)\s+((?:19|20)\d{2})\s+(?:and|to|until|-)\s+((?:19|20)\d{2})\b"
+    r"|\b((?:19|20)\d{2})\s*(?:-|–|to)\s*((?:19|20)\d{2})\b",
+    re.IGNORECASE,
+)
+YEAR_BOUND_PATTERN = re.compile(r"\b(before|pre|after|post|since)[\s-]+((?:19|20)\d{2})\b", re.IGNORECASE)
+
+# Only "<movies|films|something> like X" names a reference title; a bare "like" is
+# usually a preference ("I'd like comedies", "I like Tom Hanks movies")
+REFERENCE_TITLE_PATTERN = re.compile(
+    r'\b(?:similar to|(?:movies?|films?|something|anything|ones?) like|such as|comparable to|akin to)\s+'
+    r'["\']?([^?!.,"\'\s][^?!.,"\']*)',
+    re.IGNORECASE,
+)
+
+# Query types a question may carry and still be answered from embeddings alone
+PLOT_QUERY_TYPES = {"plot", "theme"}
+PLOT_ONLY_QUERY_TYPES = PLOT_QUERY_TYPES | {"recommendation"}
+
+# Nearest neighbours by cosine distance; ORDER BY on the distance to a constant
+# vector lets Postgres serve the candidates from the HNSW index on movie_features.embedding.
+# The question's SQL filters ({filters}) then narrow the candidates.
+SEMANTIC_SEARCH_QUERY = f"""
+        WITH candidates AS (
+            SELECT f.movie_id, f.embedding <=> CAST(CAST(:embedding AS text) AS vector) AS distance
+            FROM movie_features f
+            WHERE f.embedding IS NOT NULL AND f.movie_id <> ALL(CAST(:exclude_ids AS int[]))
+            ORDER BY f.embedding <=> CAST(CAST(:embedding AS text) AS vector)
+            LIMIT :candidate_limit
+        )
+        SELECT {MOVIE_SEARCH_COLUMNS},
+               1 - c.distance AS similarity
+        FROM candidates c
+        JOIN movie_search ms ON ms.id = c.movie_id
+        WHERE 1=1{{filters}}
+        ORDER BY c.distance
+        LIMIT :result_limit
+        """
+
+MOVIES_BY_ID_QUERY = f"""
+        SELECT {MOVIE_SEARCH_COLUMNS}
+        FROM movie_search ms
+        WHERE ms.id = ANY(CAST(:ids AS int[]))
+        """
+
 class MovieRecommendationAgent:
-    def __init__(self, db: Session, user: User):
+    def __init__(self, db: Optional[AsyncSession], user: User):
         logger.info("Initializing MovieRecommendationAgent with database session")
         self.db = db
         self.user = user
@@ -28,6 +102,15 @@ class MovieRecommendationAgent:
         self.memory = ConversationBufferWindowMemory(k=5)  # Retain only the last 5 interactions
         self.langfuse = langfuse
 
+    def bind(self, db: AsyncSession) -> "MovieRecommendationAgent":
+        # A session-scoped agent outlives the per-message database session
+        self.db = db
+        return self
+
+    def set_config(self, config: ModelConfig, model) -> None:
+        self.config = config
+        self.model = model
+
     def is_langfuse_available(self):
         try:
             return (self.langfuse is not None and 
@@ -38,17 +121,20 @@ class MovieRecommendationAgent:
             return False
 
     @observe()
-    def initialize(self):
+    async def initialize(self):
+        if self.model is not None:
+            return
         try:
-            self.config = self._get_user_config()
+            self.config = await self._get_user_config()
             self.model = self._initialize_model()
         except Exception as e:
             logger.error(f"Error initializing MovieRecommendationAgent: {str(e)}", exc_info=True)
             raise
 
     @observe()
-    def _get_user_config(self) -> ModelConfig:
-        config = self.db.query(ModelConfig).filter(ModelConfig.user_id == self.user.id).first()
+    async def _get_user_config(self) -> ModelConfig:
+        stmt = select(ModelConfig).filter(ModelConfig.user_id == self.user.id).limit(1)
+        config = (await self.db.execute(stmt)).scalars().first()
         if config:
             logger.info(f"User config found: provider={config.provider}, model={config.model}")
         else:
@@ -74,9 +160,9 @@ class MovieRecommendationAgent:
             raise ValueError("User has not configured a model")
 
     @observe()
-    def _execute_query(self, query: text, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+    async def _execute_query(self, query: text, params: Dict[str, Any]) -> List[Dict[str, Any]]:
         try:
-            result = self.db.execute(query, params)
+            result = await self.db.execute(query, params)
             result_list = []
             for row in result:
                 if hasattr(row, '_asdict'):
@@ -101,6 +187,18 @@ class MovieRecommendationAgent:
             logger.error(f"Error executing query: {str(e)}", exc_info=True)
             raise
 
+    async def _execute_cached_query(self, query: text, params: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """_execute_query for catalog-only queries, served from query_cache until the catalog changes."""
+        if not settings.QUERY_CACHE_ENABLED:
+            return await self._execute_query(query, params)
+        catalog_version = await get_catalog_version()
+        key = query_cache.make_key(query.text, params)
+        rows = query_cache.get(key, catalog_version)
+        if rows is None:
+            rows = await self._execute_query(query, params)
+            query_cache.put(key, catalog_version, rows)
+        return rows
+
     def _classify_query(self, question: str) -> List[str]:
         question = question.lower()
         query_types = []
@@ -112,7 +210,7 @@ class MovieRecommendationAgent:
             ('actor', ['actor', 'star', 'cast', 'performer', 'actress']),
             ('director', ['director', 'filmmaker', 'directed by', 'helmed by']),
             ('release_date', ['release', 'year', 'when', 'came out', 'debut', 'premiered']),
-            ('plot', ['plot', 'story', 'about', 'synopsis', 'narrative', 'storyline']),
+            ('plot', ['plot', 'story', 'synopsis', 'narrative', 'storyline']),
             ('recommendation', ['recommend', 'suggest', 'similar', 'like', 'comparable', 'akin to']),
             ('awards', ['award', 'oscar', 'golden globe', 'emmy', 'nominated', 'won']),
             ('language', ['language', 'spoken in', 'subtitle', 'dub']),
@@ -146,174 +244,411 @@ class MovieRecommendationAgent:
             return name_match.group(1)
         return None
 
-    @observe()
-    def _build_query(self, query_types: List[str], question: str) -> Tuple[text, Dict[str, Any]]:
-        limit = self._extract_limit(question)
-        
-        base_query = f"""
-        SELECT DISTINCT m.id, m.title, m.overview, m.budget, m.revenue, m.popularity, 
-               m.vote_average, m.vote_count, m.release_date, m.keywords,
-               string_agg(DISTINCT g.name, ', ') as genres,
-               (SELECT string_agg(name, ', ')
-                FROM (SELECT DISTINCT a.name 
-                      FROM movie_actor ma 
-                      JOIN actors a ON ma.actor_id = a.id 
-                      WHERE ma.movie_id = m.id 
-                      ORDER BY a.name 
-                      LIMIT :actor_limit) AS top_actors
-               ) as top_actors,
-               d.name as director
-        FROM movies m
-        LEFT JOIN movie_genre mg ON m.id = mg.movie_id
-        LEFT JOIN genres g ON mg.genre_id = g.id
-        LEFT JOIN movie_actor ma ON m.id = ma.movie_id
-        LEFT JOIN actors a ON ma.actor_id = a.id
-        LEFT JOIN directors d ON m.director_id = d.id
-        WHERE 1=1
-        """
+    def _extract_search_terms(self, question: str) -> List[str]:
+        terms = []
+        for term in re.findall(r"[a-z0-9']+", question.lower()):
+            term = term.strip("'")
+            if len(term) > 2 and term not in SEARCH_STOPWORDS and not term.isdigit() and term not in terms:
+                if DECADE_PATTERN.fullmatch(term):
+                    continue  # Applied as a release_year range instead
+                terms.append(term)
+        return terms[:settings.TEXT_SEARCH_MAX_TERMS]
+
+    def _extract_year_range(self, question: str) -> Optional[Tuple[Optional[int], Optional[int]]]:
+        """First and last release year asked for ("90s", "1990-1995", "before 1980"); either end may be None."""
+        match = YEAR_RANGE_PATTERN.search(question)
+        if match:
+            first, last = sorted(int(year) for year in match.groups() if year)
+            return first, last
+        match = YEAR_BOUND_PATTERN.search(question)
+        if match:
+            bound, year = match.group(1).lower(), int(match.group(2))
+            if bound in ('before', 'pre'):
+                return None, year - 1
+            return (year + 1 if bound in ('after', 'post') else year), None
+        match = DECADE_PATTERN.search(question)
+        if match:
+            century, decade, short = match.groups()
+            if century:
+                first = int(century) * 100 + int(decade) * 10
+            else:
+                first = (1900 if int(short) >= 3 else 2000) + int(short) * 10
+            return first, first + 9
+        return None
 
+    def _build_filters(self, query_types: List[str], question: str) -> Tuple[List[str], List[str], Dict[str, Any]]:
+        """WHERE conditions on movie_search, ORDER BY terms and their params for the question."""
         conditions = []
         order_by = []
-        params = {"actor_limit": limit}
+        params = {}
 
         if "financial" in query_types:
             if 'high budget' in question:
-                conditions.append("m.budget > 0")
-                order_by.append("m.budget DESC")
+                conditions.append("ms.budget > 0")
+                order_by.append("ms.budget DESC")
             elif 'low budget' in question:
-                conditions.append("m.budget > 0")
-                order_by.append("m.budget ASC")
+                conditions.append("ms.budget > 0")
+                order_by.append("ms.budget ASC")
             elif 'high revenue' in question:
-                conditions.append("m.revenue > 0")
-                order_by.append("m.revenue DESC")
+                conditions.append("ms.revenue > 0")
+                order_by.append("ms.revenue DESC")
             elif 'low revenue' in question:
-                conditions.append("m.revenue > 0")
-                order_by.append("m.revenue ASC")
+                conditions.append("ms.revenue > 0")
+                order_by.append("ms.revenue ASC")
             elif 'profit' in question:
-                conditions.append("m.revenue > 0 AND m.budget > 0")
-                order_by.append("(m.revenue - m.budget) DESC")
+                conditions.append("ms.revenue > 0 AND ms.budget > 0")
+                order_by.append("(ms.revenue - ms.budget) DESC")
             else:
-                order_by.append("m.revenue DESC")
+                order_by.append("ms.revenue DESC")
 
         if "popularity" in query_types:
             if 'rating' in question or 'vote' in question:
-                order_by.extend(["m.vote_average DESC", "m.vote_count DESC"])
+                order_by.extend(["ms.vote_average DESC", "ms.vote_count DESC"])
             elif 'trending' in question:
-                order_by.extend(["m.popularity DESC", "m.release_date DESC"])
+                order_by.extend(["ms.popularity DESC", "ms.release_date DESC"])
             else:
-                order_by.append("m.popularity DESC")
+                order_by.append("ms.popularity DESC")
 
         if "genre" in query_types:
             genres = ['Action', 'Adventure', 'Animation', 'Comedy', 'Crime', 'Documentary', 'Drama', 'Family', 
                       'Fantasy', 'History', 'Horror', 'Music', 'Mystery', 'Romance', 'Science Fiction', 
                       'TV Movie', 'Thriller', 'War', 'Western']
             
-            genre_conditions = []
+            genre_params = []
             for i, genre in enumerate(genres):
                 if genre.lower() in question.lower():
-                    genre_conditions.append(f"LOWER(g.name) = :genre_{i}")
+                    genre_params.append(f":genre_{i}")
                     params[f"genre_{i}"] = genre.lower()
             
-            if genre_conditions:
-                conditions.append("(" + " OR ".join(genre_conditions) + ")")
+            if genre_params:
+                # Array overlap matches any of the requested genres and can use the GIN index
+                conditions.append(f"ms.genre_names && ARRAY[{', '.join(genre_params)}]::text[]")
 
         if "actor" in query_types:
             actor_name = self._extract_name(question)
             if actor_name:
-                conditions.append("LOWER(a.name) LIKE LOWER(:actor_name)")
+                conditions.append("LOWER(ms.top_actors) LIKE LOWER(:actor_name)")
                 params["actor_name"] = f"%{actor_name}%"
 
         if "director" in query_types:
             director_name = self._extract_name(question)
             if director_name:
-                conditions.append("LOWER(d.name) LIKE LOWER(:director_name)")
+                conditions.append("LOWER(ms.director) LIKE LOWER(:director_name)")
                 params["director_name"] = f"%{director_name}%"
 
-        if "release_date" in query_types:
+        # Decades and year ranges are explicit enough to apply whatever the query type;
+        # both ends are plain comparisons on release_year, served by its index
+        year_range = self._extract_year_range(question)
+        if year_range:
+            year_from, year_to = year_range
+            if year_from is not None:
+                conditions.append("ms.release_year >= :year_from")
+                params["year_from"] = year_from
+            if year_to is not None:
+                conditions.append("ms.release_year <= :year_to")
+                params["year_to"] = year_to
+        elif "release_date" in query_types:
             year_match = re.search(r'\b(19|20)\d{2}\b', question)
             if year_match:
                 year = year_match.group()
-                conditions.append("EXTRACT(YEAR FROM m.release_date) = :year")
+                conditions.append("ms.release_year = :year")
                 params["year"] = int(year)
             elif 'recent' in question or 'latest' in question:
-                conditions.append("m.release_date >= (CURRENT_DATE - INTERVAL '2 years')")
-                order_by.append("m.release_date DESC")
+                conditions.append("ms.release_date >= (CURRENT_DATE - INTERVAL '2 years')")
+                order_by.append("ms.release_date DESC")
             elif 'old' in question or 'classic' in question:
-                conditions.append("EXTRACT(YEAR FROM m.release_date) < 1980")
-                order_by.append("m.release_date ASC")
+                conditions.append("ms.release_year < 1980")
+                order_by.append("ms.release_date ASC")
 
         if "awards" in query_types:
-            conditions.append("m.keywords::text LIKE '%award%' OR m.keywords::text LIKE '%nominated%'")
+            # keyword_text is the lowercased keyword names, trigram-indexed for substring matches
+            conditions.append("(ms.keyword_text LIKE '%award%' OR ms.keyword_text LIKE '%nominated%')")
 
         if "language" in query_types:
             lang_match = re.search(r'in ([\w\s]+)', question)
             if lang_match:
                 lang = lang_match.group(1).strip().lower()
-                conditions.append("LOWER(m.original_language) = :lang")
+                conditions.append("LOWER(ms.original_language) = :lang")
                 params["lang"] = lang
 
         if "duration" in query_types:
             if 'short' in question:
-                conditions.append("m.runtime <= 90")
+                conditions.append("ms.runtime <= 90")
             elif 'long' in question:
-                conditions.append("m.runtime >= 150")
+                conditions.append("ms.runtime >= 150")
 
         if "franchise" in query_types:
-            conditions.append("m.keywords::text LIKE '%sequel%' OR m.keywords::text LIKE '%series%'")
+            conditions.append("(ms.keyword_text LIKE '%sequel%' OR ms.keyword_text LIKE '%series%')")
+
+        return conditions, order_by, params
+
+    @observe()
+    def _build_query(self, query_types: List[str], question: str) -> Tuple[text, Dict[str, Any]]:
+        limit = self._extract_limit(question)
+        
+        # movie_search is a materialized view with genres, actors and director
+        # pre-aggregated (see db/movie_search.py), so no joins or GROUP BY are needed here
+        base_query = f"""
+        SELECT {MOVIE_SEARCH_COLUMNS}
+        FROM movie_search ms
+        WHERE 1=1
+        """
+
+        conditions, order_by, params = self._build_filters(query_types, question)
 
         # Add conditions to base query
         if conditions:
             base_query += " AND " + " AND ".join(conditions)
 
         # Add search terms for general queries
-        search_terms = [term.lower() for term in question.split() if len(term) > 2]
-        if search_terms:
+        search_terms = self._extract_search_terms(question)
+        if search_terms and settings.TEXT_SEARCH_MODE == "fts":
+            # websearch_to_tsquery treats "or" as the OR operator; the english config
+            # stems the terms and the GIN index on search_vector serves the match
+            base_query += " AND ms.search_vector @@ websearch_to_tsquery('english', :search_query)"
+            params["search_query"] = " or ".join(search_terms)
+            rank = "ts_rank(ms.search_vector, websearch_to_tsquery('english', :search_query)) DESC"
+            order_by = order_by + [rank] if order_by else [rank, "ms.popularity DESC"]
+        elif search_terms:
             search_condition = " OR ".join([
-                f"LOWER(m.title) LIKE :term_{i} OR LOWER(m.overview) LIKE :term_{i} OR LOWER(m.keywords::text) LIKE :term_{i}"
+                f"LOWER(ms.title) LIKE :term_{i} OR LOWER(ms.overview) LIKE :term_{i} OR ms.keyword_text LIKE :term_{i}"
                 for i in range(len(search_terms))
             ])
             base_query += f" AND ({search_condition})"
             for i, term in enumerate(search_terms):
                 params[f"term_{i}"] = f"%{term}%"
 
-        # Add GROUP BY clause
-        base_query += " GROUP BY m.id, d.name"
-
         # Add ORDER BY clause
         if order_by:
             base_query += " ORDER BY " + ", ".join(order_by)
         else:
-            base_query += " ORDER BY m.popularity DESC"
+            base_query += " ORDER BY ms.popularity DESC"
 
-        base_query += f" LIMIT :result_limit"
+        base_query += " LIMIT :result_limit"
         params["result_limit"] = limit
 
         return text(base_query), params
 
+    def retrieval_scope(self, question: str) -> str:
+        """
+        What retrieve_data would run for the question, without running it: query types,
+        reference title, filters, ordering, search terms and limit. Only questions with
+        the same scope may share a semantic cache entry ("high revenue" and "low revenue"
+        embed almost identically but sort the other way).
+        """
+        query_types = self._classify_query(question)
+        conditions, order_by, params = self._build_filters(query_types, question)
+        return repr((
+            query_types,
+            self._extract_reference_title(question),
+            conditions,
+            order_by,
+            sorted(params.items()),
+            self._extract_search_terms(question),
+            self._extract_limit(question),
+        ))
+
+    def _extract_reference_title(self, question: str) -> Optional[str]:
+        match = REFERENCE_TITLE_PATTERN.search(question)
+        if not match:
+            return None
+        title = re.split(r'\s+(?:but|and|with|except|from|for)\s+', match.group(1), flags=re.IGNORECASE)[0]
+        return title.strip() or None
+
+    async def _find_reference_embedding(self, title: str) -> Optional[Tuple[int, str]]:
+        # Try the full phrase first, then drop trailing words ("Inception please" -> "Inception")
+        words = title.split()
+        candidates = [" ".join(words[:n]).lower() for n in range(len(words), 0, -1)]
+        query = text("""
+        SELECT m.id, f.embedding::text AS embedding
+        FROM movies m
+        JOIN movie_features f ON f.movie_id = m.id
+        WHERE LOWER(m.title) = ANY(CAST(:candidates AS text[])) AND f.embedding IS NOT NULL
+        ORDER BY LENGTH(m.title) DESC, m.popularity DESC
+        LIMIT 1
+        """)
+        row = (await self.db.execute(query, {"candidates": candidates})).first()
+        return (row.id, row.embedding) if row else None
+
+    @staticmethod
+    def _movies_by_id_query(conditions: Sequence[str] = ()) -> str:
+        return MOVIES_BY_ID_QUERY + "".join(f" AND {condition}" for condition in conditions)
+
+    async def _fetch_ranked_movies(
+        self,
+        ranked: List[Tuple[int, float]],
+        score_field: str,
+        conditions: Sequence[str] = (),
+        params: Optional[Dict[str, Any]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Load movie_search rows for (movie_id, score) pairs, keeping the given order; conditions drop rows."""
+        if not ranked:
+            return []
+        rows = await self._execute_cached_query(
+            text(self._movies_by_id_query(conditions)), {**(params or {}), "ids": [movie_id for movie_id, _ in ranked]}
+        )
+        rows_by_id = {row["id"]: row for row in rows}
+        results = []
+        for movie_id, score in ranked:
+            row = rows_by_id.get(movie_id)
+            if row:
+                results.append({**row, score_field: round(score, 4)})
+        return results
+
     @observe()
-    def retrieve_data(self, question: str) -> Dict[str, Any]:
+    async def _content_similar(self, question: str, query_types: List[str]) -> Optional[Dict[str, Any]]:
+        """Answer "movies like X" from the precomputed content-similarity neighbour table."""
+        reference_title = self._extract_reference_title(question)
+        if not reference_title:
+            return None
+        # Picks up a rebuilt artifact; a stat() call when nothing changed
+        content_similarity.load_if_changed()
+        if not content_similarity.is_ready:
+            return None
+
+        movie_id = content_similarity.find_movie_id(reference_title)
+        if movie_id is None:
+            return None
+        limit = self._extract_limit(question)
+        # The question's year, genre, actor, ... filters apply to the neighbours
+        conditions, _, params = self._build_filters(query_types, question)
+        neighbours = content_similarity.similar(movie_id, settings.CONTENT_SIMILARITY_TOP_K if conditions else limit)
+        results = (await self._fetch_ranked_movies(neighbours, "similarity", conditions, params))[:limit]
+        if not results:
+            return None
+
+        return {
+            "results": results,
+            "raw_query": self._movies_by_id_query(conditions),
+            "query_types": query_types,
+            "retrieval": "content_similarity",
+            "reference_title": reference_title
+        }
+
+    @observe()
+    async def _semantic_search(self, question: str, query_types: List[str]) -> Optional[Dict[str, Any]]:
+        """
+        Nearest-neighbour retrieval for "similar to X" and plot-only questions.
+
+        Only used when the reference title resolves to a movie with an embedding, or
+        when the question asks about plot/theme and nothing else. The question's SQL
+        filters (year, genre, actor, ...) are applied to the neighbours. Returns None
+        otherwise, in which case the caller falls back to the SQL query builder.
+        """
+        reference_title = self._extract_reference_title(question)
+        plot_only = bool(PLOT_QUERY_TYPES & set(query_types)) and set(query_types) <= PLOT_ONLY_QUERY_TYPES
+        if not reference_title and not plot_only:
+            return None
+
+        try:
+            exclude_ids = []
+            embedding = None
+            if reference_title:
+                reference = await self._find_reference_embedding(reference_title)
+                if reference:
+                    exclude_ids.append(reference[0])
+                    embedding = reference[1]
+                elif not plot_only:
+                    # Embedding the whole question would match on its wording, not on the movie
+                    return None
+            limit = self._extract_limit(question)
+            conditions, _, params = self._build_filters(query_types, question)
+            candidate_limit = max(limit, settings.SEMANTIC_FILTER_CANDIDATES) if conditions else limit
+
+            if settings.FAISS_ENABLED and movie_index.is_ready:
+                # k-NN runs in-process; Postgres is only asked for the row data
+                vector = from_pgvector(embedding) if embedding else get_embedder().embed_one(question)
+                neighbours = movie_index.search(vector, candidate_limit, exclude_ids)
+                results = (await self._fetch_ranked_movies(neighbours, "similarity", conditions, params))[:limit]
+                raw_query = self._movies_by_id_query(conditions)
+                retrieval = "faiss"
+            else:
+                if embedding is None:
+                    embedding = to_pgvector(get_embedder().embed_one(question))
+                await self.db.execute(
+                    text("SELECT set_config('hnsw.ef_search', :ef_search, true)"),
+                    {"ef_search": str(max(settings.HNSW_EF_SEARCH, candidate_limit))}
+                )
+                query = text(SEMANTIC_SEARCH_QUERY.format(
+                    filters="".join(f" AND {condition}" for condition in conditions)
+                ))
+                results = await self._execute_query(query, {
+                    **params,
+                    "embedding": embedding,
+                    "exclude_ids": exclude_ids,
+                    "candidate_limit": candidate_limit,
+                    "result_limit": limit,
+                })
+                raw_query = query.text
+                retrieval = "semantic"
+
+            if not results:
+                return None
+
+            return {
+                "results": results,
+                "raw_query": raw_query,
+                "query_types": query_types,
+                "retrieval": retrieval,
+                "reference_title": reference_title
+            }
+        except Exception as e:
+            logger.warning(f"Semantic search unavailable, falling back to SQL: {str(e)}")
+            await self.db.rollback()
+            return None
+
+    @observe()
+    async def _collaborative_recommendations(self, limit: int) -> List[Dict[str, Any]]:
+        """Movies watched by users with a similar viewing history (item-item CF)."""
+        if self.user is None or not collaborative_model.is_ready:
+            return []
+        ranked = collaborative_model.recommend(str(self.user.id), k=limit)
+        return await self._fetch_ranked_movies(ranked, "cf_score")
+
+    @observe()
+    async def retrieve_data(self, question: str) -> Dict[str, Any]:
         logger.info(f"Retrieving data for question: {question}")
         try:
             query_types = self._classify_query(question)
+
+            if settings.CONTENT_SIMILARITY_ENABLED:
+                similar_data = await self._content_similar(question, query_types)
+                if similar_data:
+                    return similar_data
+
+            if settings.SEMANTIC_SEARCH_ENABLED:
+                semantic_data = await self._semantic_search(question, query_types)
+                if semantic_data:
+                    return semantic_data
+
             query, params = self._build_query(query_types, question)
-            results = self._execute_query(query, params)
+            results = await self._execute_cached_query(query, params)
+            retrieval = "sql"
+
+            if settings.CF_ENABLED and "recommendation" in query_types:
+                cf_results = await self._collaborative_recommendations(params["result_limit"])
+                if cf_results:
+                    results = reciprocal_rank_fusion([results, cf_results], limit=params["result_limit"])
+                    retrieval = "sql+collaborative"
             
             return {
                 "results": results,
                 "raw_query": query.text,
-                "query_types": query_types
+                "query_types": query_types,
+                "retrieval": retrieval
             }
         except Exception as e:
             logger.error(f"Error in retrieve_data: {str(e)}", exc_info=True)
             raise
 
     @observe()
-    async def chain_of_thought(self, question: str) -> AsyncGenerator[str, None]:
+    async def chain_of_thought(self, question: str, retrieved_data: Optional[Dict[str, Any]] = None) -> AsyncGenerator[str, None]:
         logger.info(f"Starting chain of thought for question: {question}")
         
         try:
-            # Retrieve data
-            retrieved_data = self.retrieve_data(question)
+            # Retrieve data, unless the caller already ran retrieval
+            if retrieved_data is None:
+                retrieved_data = await self.retrieve_data(question)
             
             # Get the raw query from the retrieved data
             raw_query = retrieved_data.get("raw_query", "No query available")
@@ -329,12 +664,13 @@ class MovieRecommendationAgent:
             
             chat_history = self.memory.chat_memory.messages
             
+            rows = serialize_rows(retrieved_data.get("results", []), retrieved_data.get("query_types", []))
             prompt = f"""
             Question: {question}
 
-            Retrieved Data:
-            ```json
-            {json.dumps(retrieved_data, indent=2)}
+            Retrieved Data ({retrieved_data.get("retrieval", "sql")} retrieval, {len(retrieved_data.get("results", []))} rows, CSV):
+            ```csv
+            {rows}
             ```
 
             Raw Query:
@@ -375,12 +711,12 @@ class MovieRecommendationAgent:
             yield "I apologize, but I encountered an unexpected error while processing your request. Please try again later or rephrase your question."
 
     @observe()
-    async def get_recommendation(self, question: str) -> AsyncGenerator[str, None]:
+    async def get_recommendation(self, question: str, retrieved_data: Optional[Dict[str, Any]] = None) -> AsyncGenerator[str, None]:
         logger.info(f"Getting recommendation for question: {question}")
         
         try:
-            self.initialize()
-            async for token in self.chain_of_thought(question):
+            await self.initialize()
+            async for token in self.chain_of_thought(question, retrieved_data):
                 yield token
         
         except Exception as e:
@@ -388,7 +724,7 @@ class MovieRecommendationAgent:
             yield "I apologize, but an error occurred while processing your request. Please try again later or contact support if the problem persists."
 
     @observe()
-    def store_conversation(self, user_input: str, ai_response: str) -> None:
+    async def store_conversation(self, user_input: str, ai_response: str) -> None:
         try:
             conversation = Conversation(
                 user_id=self.user.id,
@@ -396,22 +732,22 @@ class MovieRecommendationAgent:
                 langfuse_trace_id=langfuse_context.current_observation.trace_id if self.is_langfuse_available() else None
             )
             self.db.add(conversation)
-            self.db.flush()  # This will assign an ID to the conversation
+            await self.db.flush()  # This will assign an ID to the conversation
 
             user_message = Message(conversation_id=conversation.id, role='user', content=user_input)
             ai_message = Message(conversation_id=conversation.id, role='assistant', content=ai_response)
             
             self.db.add(user_message)
             self.db.add(ai_message)
-            self.db.commit()
+            await self.db.commit()
 
             logger.info(f"Stored conversation with ID: {conversation.id}")
         except Exception as e:
             logger.error(f"Error storing conversation: {str(e)}", exc_info=True)
-            self.db.rollback()
+            await self.db.rollback()
 
     @observe()
-    def store_evaluation(self, conversation_id: str, metrics: Dict[str, float]) -> None:
+    async def store_evaluation(self, conversation_id: str, metrics: Dict[str, float]) -> None:
         try:
             evaluation = ModelEvaluation(
                 model_config_id=self.config.id,
@@ -420,9 +756,9 @@ class MovieRecommendationAgent:
                 metrics=metrics
             )
             self.db.add(evaluation)
-            self.db.commit()
+            await self.db.commit()
 
             logger.info(f"Stored evaluation for conversation ID: {conversation_id}")
         except Exception as e:
             logger.error(f"Error storing evaluation: {str(e)}", exc_info=True)
-            self.db.rollback()
+            await self.db.rollback()
@@ -1,9 +1,8 @@
 from typing import Dict, Any, AsyncGenerator
-from sqlalchemy.orm import Session
-from core.pipeline import movie_recommendation_pipeline, evaluation_pipeline
-from core.model_interface import BaseModelInterface
-from langchain.memory import ConversationBufferMemory
-from models.models import User
+from sqlalchemy.ext.asyncio import AsyncSession
+from core.pipeline import movie_recommendation_pipeline
+from core.evaluation.worker import evaluation_worker
+from core.session import ChatSession
 import logging
 import json
 from langfuse.decorators import observe, langfuse_context
@@ -37,20 +36,18 @@ def extract_token_usage(response):
 @observe(as_type="generation", capture_input=False, capture_output=False)
 async def askLLM(
     data: Dict[str, Any],
-    db_session: Session,
-    model: BaseModelInterface,
-    memory: ConversationBufferMemory,
-    user: User,
-    session_id: str
+    db_session: AsyncSession,
+    session: ChatSession
 ) -> AsyncGenerator[Dict[str, Any], None]:
+    model = session.model
     logger.debug(f"Input data: {json.dumps(data, default=str)}")
 
     if is_langfuse_available():
         try:
             input_data = {
                 "data": data,
-                "user_id": str(user.id),
-                "session_id": session_id,
+                "user_id": str(session.user.id),
+                "session_id": session.session_id,
                 "model_info": {
                     "provider": model.__class__.__name__,
                     "model_name": model.model_name
@@ -74,7 +71,7 @@ async def askLLM(
             "token_usage": {"input_tokens": 0, "output_tokens": 0, "total_tokens": 0}
         }
         
-        async for response_chunk in movie_recommendation_pipeline(data, db_session, model, memory, user, session_id):
+        async for response_chunk in movie_recommendation_pipeline(data, db_session, session):
             logger.debug(f"Response chunk: {json.dumps(response_chunk, default=str)}")
             if isinstance(response_chunk, dict):
                 response_type = response_chunk.get("type")
@@ -110,10 +107,11 @@ async def askLLM(
                 })
         
         if evaluation_data:
-            evaluation_result = await run_evaluation_pipeline(evaluation_data, model.model_name)
-            if evaluation_result:
-                yield evaluation_result
-                pipeline_metadata["evaluation"] = evaluation_result
+            # Scored in the background; the socket gets an "evaluation" frame when it's done
+            job_id = await evaluation_worker.submit(evaluation_data, str(session.user.id), session.session_id)
+            if job_id:
+                yield {"type": "evaluation_pending", "content": job_id}
+                pipeline_metadata["evaluation"] = {"job_id": job_id}
 
         if is_langfuse_available():
             try:
@@ -149,56 +147,3 @@ async def askLLM(
                 )
             except Exception as le:
                 logger.error(f"Error updating Langfuse observation: {str(le)}", exc_info=True)
-
-@observe(name="movie_recommendation_evaluation", capture_input=False, capture_output=False)
-async def run_evaluation_pipeline(pipeline_result: Dict, model_name: str):
-    try:
-        evaluation_result = await evaluation_pipeline(pipeline_result)
-        
-        if is_langfuse_available() and langfuse:
-            try:
-                # Log individual scores
-                for score_name, score_value in evaluation_result.get("content", {}).get("metrics", {}).items():
-                    logger.debug(f"Logging score to Langfuse: {score_name} = {score_value}")
-                    langfuse.score(
-                        trace_id=pipeline_result.get("trace_id"),
-                        span_id=pipeline_result.get("span_id"),
-                        name=score_name,
-                        value=score_value,
-                        comment=f"{score_name.capitalize()} score from recommendation evaluation"
-                    )
-                    logger.info(f"Logged score to Langfuse: {score_name} = {score_value}")
-
-                # Log the full evaluation result as an observation
-                logger.debug(f"Logging evaluation result to Langfuse: {json.dumps(evaluation_result, default=str)}")
-                langfuse_context.update_current_observation(
-                    name="evaluation_pipeline",
-                    input=pipeline_result,
-                    output=evaluation_result,
-                    metadata={"model_name": model_name}
-                )
-            except Exception as e:
-                logger.error(f"Error logging to Langfuse: {str(e)}", exc_info=True)
-        
-        return evaluation_result
-    except Exception as e:
-        logger.error(f"Error in run_evaluation_pipeline: {str(e)}", exc_info=True)
-        error_message = f"An error occurred during evaluation: {str(e)}"
-        
-        if is_langfuse_available():
-            try:
-                error_output = {
-                    "status": "error",
-                    "message": error_message
-                }
-                logger.debug(f"Langfuse evaluation error output: {json.dumps(error_output, default=str)}")
-                langfuse_context.update_current_observation(
-                    name="evaluation_pipeline",
-                    input=pipeline_result,
-                    output=error_output,
-                    metadata={"model_name": model_name}
-                )
-            except Exception as le:
-                logger.error(f"Error updating Langfuse observation for evaluation error: {str(le)}", exc_info=True)
-        
-        return {"type": "error", "content": error_message}
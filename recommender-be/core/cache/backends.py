@@ -0,0 +1,116 @@
+"""
+Key/value backends for the caches in core/cache.
+
+InMemoryBackend is per process (LRU + TTL). RedisBackend shares entries between
+workers; its eviction is Redis' own (configure maxmemory-policy allkeys-lru).
+Values must be JSON-serializable.
+"""
+
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+class CacheBackend(ABC):
+    @abstractmethod
+    async def get(self, key: str) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        pass
+
+    @abstractmethod
+    async def clear(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": self.__class__.__name__}
+
+class InMemoryBackend(CacheBackend):
+    def __init__(self, max_entries: int, ttl: float):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Any]:
+        return self.get_nowait(key)
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self.set_nowait(key, value, ttl)
+
+    # Synchronous variants for callers that are not coroutines
+    def get_nowait(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set_nowait(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        self._entries[key] = (time.monotonic() + (ttl or self.ttl), value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def delete_nowait(self, key: str) -> None:
+        self._entries.pop(key, None)
+
+    async def clear(self) -> None:
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "entries": len(self._entries), "max_entries": self.max_entries}
+
+class RedisBackend(CacheBackend):
+    def __init__(self, url: str, ttl: float, namespace: str):
+        # Optional dependency: only needed when a cache is configured with backend "redis"
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.ttl = ttl
+        self.namespace = namespace
+
+    async def get(self, key: str) -> Optional[Any]:
+        try:
+            raw = await self.client.get(f"{self.namespace}:{key}")
+        except Exception as e:
+            logger.warning(f"Redis cache get failed: {str(e)}")
+            return None
+        return json.loads(raw) if raw is not None else None
+
+    async def set(self, key: str, value: Any, ttl: Optional[float] = None) -> None:
+        try:
+            await self.client.set(f"{self.namespace}:{key}", json.dumps(value, default=str), ex=int(ttl or self.ttl))
+        except Exception as e:
+            logger.warning(f"Redis cache set failed: {str(e)}")
+
+    async def clear(self) -> None:
+        async for key in self.client.scan_iter(match=f"{self.namespace}:*"):
+            await self.client.delete(key)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "redis", "namespace": self.namespace}
+
+def create_backend(name: str, max_entries: int, ttl: float, namespace: str) -> CacheBackend:
+    if name == "memory":
+        return InMemoryBackend(max_entries, ttl)
+    elif name == "redis":
+        if not settings.REDIS_URL:
+            raise ValueError("REDIS_URL must be set to use the redis cache backend")
+        return RedisBackend(settings.REDIS_URL, ttl, namespace)
+    else:
+        raise ValueError(f"Unsupported cache backend: {name}")
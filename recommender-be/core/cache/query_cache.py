@@ -0,0 +1,109 @@
+"""
+Result cache for catalog queries.
+
+The catalog only changes when a migrate/refresh job runs, so the rows of a generated
+retrieval query are reusable until the next catalog_version bump. Entries are keyed on
+the (SQL text, bound params) pair, held per process, and evicted least-recently-used
+once the estimated size of the cached rows passes QUERY_CACHE_MAX_BYTES.
+"""
+
+import hashlib
+import json
+import logging
+import sys
+import time
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+def estimate_bytes(rows: List[Dict[str, Any]]) -> int:
+    """Approximate heap held by a list of row dicts."""
+    return sys.getsizeof(rows) + sum(
+        sys.getsizeof(row) + sum(sys.getsizeof(value) for value in row.values()) for row in rows
+    )
+
+class QueryResultCache:
+    def __init__(self, max_bytes: int, max_entry_bytes: int, ttl: float):
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = max_entry_bytes
+        self.ttl = ttl
+        # key -> (expires_at, size, rows)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._bytes = 0
+        self._catalog_version: Optional[int] = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def make_key(sql: str, params: Dict[str, Any]) -> str:
+        raw = sql + "\0" + json.dumps(params, sort_keys=True, default=str)
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    def _check_version(self, catalog_version: int) -> None:
+        # Every key belongs to the current catalog, so a bump drops them all at once
+        if catalog_version != self._catalog_version:
+            if self._entries:
+                logger.info(f"Catalog version {self._catalog_version} -> {catalog_version}, "
+                            f"dropping {len(self._entries)} cached query results")
+                self.invalidations += 1
+            self.clear()
+            self._catalog_version = catalog_version
+
+    def get(self, key: str, catalog_version: int) -> Optional[List[Dict[str, Any]]]:
+        self._check_version(catalog_version)
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            if entry is not None:
+                self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        # Callers decorate rows (scores, fusion); hand out copies
+        return [dict(row) for row in entry[2]]
+
+    def put(self, key: str, catalog_version: int, rows: List[Dict[str, Any]]) -> None:
+        self._check_version(catalog_version)
+        size = estimate_bytes(rows)
+        if size > self.max_entry_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (time.monotonic() + self.ttl, size, [dict(row) for row in rows])
+        self._bytes += size
+        while self._bytes > self.max_bytes and self._entries:
+            self._remove(next(iter(self._entries)))
+            self.evictions += 1
+
+    def _remove(self, key: str) -> None:
+        _, size, _ = self._entries.pop(key)
+        self._bytes -= size
+
+    def clear(self) -> None:
+        self._entries.clear()
+        self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "catalog_version": self._catalog_version,
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 3) if lookups else 0.0,
+            "evictions": self.evictions,
+            "invalidations": self.invalidations,
+        }
+
+query_cache = QueryResultCache(
+    max_bytes=settings.QUERY_CACHE_MAX_BYTES,
+    max_entry_bytes=settings.QUERY_CACHE_MAX_ENTRY_BYTES,
+    ttl=settings.QUERY_CACHE_TTL,
+)
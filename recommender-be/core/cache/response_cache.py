@@ -0,0 +1,95 @@
+"""
+Exact-match cache of complete chat answers.
+
+Entries are keyed on the normalized question, provider/model, pipeline mode and the
+catalog version, and hold the agent's reasoning text and the final answer. A hit is
+replayed as a token stream with the same event types (agent_thought / final_response)
+as a live answer, so clients can't tell the difference.
+"""
+
+import asyncio
+import hashlib
+import logging
+import re
+from typing import Any, AsyncGenerator, Dict, Optional
+
+from config.settings import settings
+from core.cache.backends import CacheBackend, create_backend
+
+logger = logging.getLogger(__name__)
+
+# Follow-ups that only make sense with the conversation history are never cached
+CONTEXT_DEPENDENT_PATTERN = re.compile(
+    r"\b(it|its|that|those|these|them|this one|the (first|second|third|last) one|another|more like|else|again)\b"
+)
+
+FILLER_PATTERN = re.compile(r"\b(please|pls|thanks|thank you|can you|could you)\b")
+
+# Roughly word-sized chunks, like a provider stream
+TOKEN_PATTERN = re.compile(r"\S+\s*|\s+")
+
+def normalize_query(query: str) -> str:
+    query = query.lower()
+    query = FILLER_PATTERN.sub(" ", query)
+    query = re.sub(r"[^\w\s]", " ", query)
+    return " ".join(query.split())
+
+class ResponseCache:
+    def __init__(self, backend: Optional[CacheBackend] = None):
+        self._backend = backend
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+
+    @property
+    def backend(self) -> CacheBackend:
+        if self._backend is None:
+            self._backend = create_backend(
+                settings.RESPONSE_CACHE_BACKEND,
+                max_entries=settings.RESPONSE_CACHE_MAX_ENTRIES,
+                ttl=settings.RESPONSE_CACHE_TTL,
+                namespace="response",
+            )
+        return self._backend
+
+    @staticmethod
+    def is_cacheable(query: str) -> bool:
+        normalized = normalize_query(query)
+        return bool(normalized) and not CONTEXT_DEPENDENT_PATTERN.search(normalized)
+
+    @staticmethod
+    def make_key(query: str, provider: str, model: str, mode: str, catalog_version: int) -> str:
+        raw = "|".join([normalize_query(query), provider.lower(), model, mode, str(catalog_version)])
+        return hashlib.sha256(raw.encode()).hexdigest()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = await self.backend.get(key)
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return entry
+
+    async def put(self, key: str, recommendation: str, response: str) -> None:
+        await self.backend.set(key, {"recommendation": recommendation, "response": response})
+        self.stores += 1
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            **self.backend.stats(),
+            "hits": self.hits,
+            "misses": self.misses,
+            "stores": self.stores,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }
+
+async def replay(text: str, event_type: str) -> AsyncGenerator[Dict[str, str], None]:
+    """Re-emit cached text as a stream of small chunks."""
+    for index, match in enumerate(TOKEN_PATTERN.finditer(text)):
+        yield {"type": event_type, "content": match.group(0)}
+        if index % 8 == 7:
+            # Yield to the event loop so a long replay doesn't starve other sockets
+            await asyncio.sleep(settings.RESPONSE_CACHE_REPLAY_DELAY)
+
+response_cache = ResponseCache()
@@ -0,0 +1,175 @@
+"""
+Semantic cache for paraphrased questions.
+
+Questions are canonicalized (synonyms such as "sci-fi" -> "science fiction", "films" ->
+"movies"), embedded with the local embedder and compared by cosine similarity against
+previously answered questions of the same scope. The scope includes the agent's
+retrieval_scope (query types, filters, ordering, search terms, limit): "top 5" and
+"top 10", or "high revenue" and "low revenue", embed almost identically, so the
+embedding only decides between questions that would run the same query. A brute-force dot product over a few
+thousand 256-d vectors takes well under a millisecond, so no separate ANN structure is
+needed at this size.
+
+Two instances are used by the pipeline: one reuses retrieval results (catalog-scoped),
+the other, off by default, reuses full answers (also scoped to provider/model/mode).
+"""
+
+import logging
+import re
+import time
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from config.settings import settings
+from core.cache.response_cache import normalize_query, ResponseCache
+from core.retrieval.embeddings import get_embedder
+
+logger = logging.getLogger(__name__)
+
+# Multi-word phrases first: replacements run in order
+SYNONYMS = [
+    (r"\bsci[\s-]?fi\b|\bscifi\b", "science fiction"),
+    (r"\brom[\s-]?coms?\b", "romantic comedy"),
+    (r"\b(highest|top)[\s-]rated\b", "best rating"),
+    (r"\bwell[\s-]received\b|\bacclaimed\b", "best rating"),
+    (r"\b(films?|flicks?|pictures?)\b", "movies"),
+    (r"\bmovie\b", "movies"),
+    (r"\b(suggest|show me|give me|list|find me|any good)\b", "recommend"),
+    (r"\b(animated|cartoons?)\b", "animation"),
+    (r"\b(scary|horrors)\b", "horror"),
+    (r"\b(funny|comedies)\b", "comedy"),
+    (r"\b(thrillers)\b", "thriller"),
+    (r"\b(dramas)\b", "drama"),
+    (r"\bkids?\b|\bchildren\b", "family"),
+]
+
+# Negations flip the meaning with a one-word change; embeddings can't be trusted there
+NEGATION_PATTERN = re.compile(r"\b(not|no|without|except|excluding|besides|other than)\b")
+
+def canonicalize(query: str) -> str:
+    query = query.lower()
+    for pattern, replacement in SYNONYMS:
+        query = re.sub(pattern, replacement, query)
+    return normalize_query(query)
+
+class SemanticCache:
+    def __init__(self, name: str, threshold: float, max_entries: int, ttl: float):
+        self.name = name
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._vectors: Optional[np.ndarray] = None
+        self._scopes = np.full(max_entries, -1, dtype=np.int64)
+        self._expires = np.zeros(max_entries, dtype=np.float64)
+        self._last_used = np.zeros(max_entries, dtype=np.float64)
+        self._values: list = [None] * max_entries
+        self._queries: list = [None] * max_entries
+        self._scope_ids: Dict[str, int] = {}
+        self._size = 0
+        self.hits = 0
+        self.misses = 0
+        self.false_hits = 0
+        self.verified = 0
+
+    @staticmethod
+    def is_cacheable(query: str) -> bool:
+        return ResponseCache.is_cacheable(query) and not NEGATION_PATTERN.search(query.lower())
+
+    def _scope_id(self, scope: str) -> int:
+        return self._scope_ids.setdefault(scope, len(self._scope_ids))
+
+    def _embed(self, query: str) -> np.ndarray:
+        return get_embedder().embed_one(canonicalize(query)).astype(np.float32)
+
+    def lookup(self, query: str, scope: str) -> Optional[Tuple[int, Any, float]]:
+        """(entry index, value, similarity) of the closest live entry above the threshold."""
+        if self._size == 0:
+            self.misses += 1
+            return None
+        vector = self._embed(query)
+        now = time.monotonic()
+        scope_id = self._scope_ids.get(scope, -2)
+        similarities = self._vectors[:self._size] @ vector
+        similarities[(self._scopes[:self._size] != scope_id) | (self._expires[:self._size] < now)] = -1.0
+        index = int(np.argmax(similarities))
+        similarity = float(similarities[index])
+        if similarity < self.threshold:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._last_used[index] = now
+        logger.info(f"Semantic {self.name} cache hit ({similarity:.3f}): {query!r} ~ {self._queries[index]!r}")
+        return index, self._values[index], similarity
+
+    def store(self, query: str, scope: str, value: Any) -> None:
+        vector = self._embed(query)
+        if not vector.any():
+            return
+        if self._vectors is None:
+            self._vectors = np.zeros((self.max_entries, vector.shape[0]), dtype=np.float32)
+        now = time.monotonic()
+        if self._size < self.max_entries:
+            index = self._size
+            self._size += 1
+        else:
+            # Reuse an expired slot if there is one, otherwise the least recently used
+            expired = np.flatnonzero(self._expires < now)
+            index = int(expired[0]) if len(expired) else int(np.argmin(self._last_used))
+        self._vectors[index] = vector
+        self._scopes[index] = self._scope_id(scope)
+        self._expires[index] = now + self.ttl
+        self._last_used[index] = now
+        self._values[index] = value
+        self._queries[index] = query
+
+    def record_false_hit(self, index: int) -> None:
+        """Called when a sampled hit turned out to differ from a fresh result; the entry is dropped."""
+        self.false_hits += 1
+        self._expires[index] = 0.0
+
+    def record_verified(self) -> None:
+        self.verified += 1
+
+    def clear(self) -> None:
+        self._size = 0
+        self._scopes[:] = -1
+        self._scope_ids.clear()
+        self._values = [None] * self.max_entries
+        self._queries = [None] * self.max_entries
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        checked = self.verified + self.false_hits
+        return {
+            "entries": self._size,
+            "threshold": self.threshold,
+            "hits": self.hits,
+            "misses": self.misses,
+            "false_hits": self.false_hits,
+            "verified_hits": self.verified,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "false_hit_rate": round(self.false_hits / checked, 3) if checked else 0.0,
+        }
+
+def result_overlap(first: Dict[str, Any], second: Dict[str, Any]) -> float:
+    """Jaccard overlap of the movie ids of two retrieval results."""
+    first_ids = {row.get("id") for row in first.get("results", [])}
+    second_ids = {row.get("id") for row in second.get("results", [])}
+    if not first_ids and not second_ids:
+        return 1.0
+    return len(first_ids & second_ids) / len(first_ids | second_ids)
+
+semantic_retrieval_cache = SemanticCache(
+    "retrieval",
+    threshold=settings.SEMANTIC_CACHE_THRESHOLD,
+    max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+    ttl=settings.SEMANTIC_CACHE_TTL,
+)
+
+semantic_answer_cache = SemanticCache(
+    "answer",
+    threshold=settings.SEMANTIC_CACHE_ANSWER_THRESHOLD,
+    max_entries=settings.SEMANTIC_CACHE_MAX_ENTRIES,
+    ttl=settings.SEMANTIC_CACHE_TTL,
+)
@@ -0,0 +1,100 @@
+"""
+Process-wide registry of LLM provider clients.
+
+SDK clients are cached per (provider, api_key hash, base_url) with LRU eviction and all
+share one keep-alive HTTP/2 connection pool, so TLS handshakes and client construction
+happen once per key instead of once per connection, message or evaluation. Each key
+also gets a semaphore that caps its in-flight requests.
+"""
+
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+import httpx
+from anthropic import AsyncAnthropic
+from langfuse.openai import AsyncOpenAI
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+ClientKey = Tuple[str, str, Optional[str]]
+
+@dataclass
+class PooledClient:
+    client: Any
+    limiter: asyncio.Semaphore
+
+class ClientRegistry:
+    def __init__(self, max_clients: Optional[int] = None, max_concurrency: Optional[int] = None):
+        self.max_clients = max_clients or settings.LLM_CLIENT_CACHE_SIZE
+        self.max_concurrency = max_concurrency or settings.LLM_MAX_CONCURRENCY_PER_KEY
+        self._clients: "OrderedDict[ClientKey, PooledClient]" = OrderedDict()
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(provider: str, api_key: str, base_url: Optional[str] = None) -> ClientKey:
+        # Never keep raw API keys in the cache key
+        return provider.lower(), hashlib.sha256(api_key.encode()).hexdigest(), base_url
+
+    @property
+    def http_client(self) -> httpx.AsyncClient:
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = httpx.AsyncClient(
+                http2=settings.LLM_HTTP2,
+                timeout=httpx.Timeout(settings.LLM_REQUEST_TIMEOUT, connect=10.0),
+                limits=httpx.Limits(
+                    max_connections=settings.LLM_HTTP_MAX_CONNECTIONS,
+                    max_keepalive_connections=settings.LLM_HTTP_MAX_KEEPALIVE,
+                    keepalive_expiry=settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+                ),
+            )
+        return self._http_client
+
+    def _create_client(self, provider: str, api_key: str, base_url: Optional[str]) -> Any:
+        options = {"api_key": api_key, "http_client": self.http_client}
+        if base_url:
+            options["base_url"] = base_url
+        if provider == "openai":
+            return AsyncOpenAI(**options)
+        elif provider == "anthropic":
+            return AsyncAnthropic(**options)
+        else:
+            raise ValueError(f"Unsupported provider: {provider}")
+
+    def get(self, provider: str, api_key: str, base_url: Optional[str] = None) -> PooledClient:
+        key = self.make_key(provider, api_key, base_url)
+        pooled = self._clients.get(key)
+        if pooled is not None:
+            self._clients.move_to_end(key)
+            self.hits += 1
+            return pooled
+
+        self.misses += 1
+        pooled = PooledClient(
+            client=self._create_client(key[0], api_key, base_url),
+            limiter=asyncio.Semaphore(self.max_concurrency),
+        )
+        self._clients[key] = pooled
+        if len(self._clients) > self.max_clients:
+            # Evicted SDK clients are just dropped; the shared HTTP pool stays open
+            self._clients.popitem(last=False)
+        logger.info(f"Created {key[0]} client ({len(self._clients)} cached, {self.hits} hits / {self.misses} misses)")
+        return pooled
+
+    def invalidate(self, provider: str, api_key: str, base_url: Optional[str] = None) -> None:
+        self._clients.pop(self.make_key(provider, api_key, base_url), None)
+
+    async def aclose(self) -> None:
+        self._clients.clear()
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+
+client_registry = ClientRegistry()
@@ -0,0 +1,356 @@
+"""
+Offline batch evaluation of the chat pipeline.
+
+Runs every query of the datasets in core/evaluation/create_datasets.py through the
+real movie_recommendation_pipeline (retrieval against the loaded catalog, prompts,
+memory, conversation storage) with bounded concurrency, and writes a report with
+per-query latency, tokens, retrieved rows and scores.
+
+By default the LLM is the deterministic "fake" provider (core/model_interface.py) and
+scores come from an offline heuristic judge whose output is parsed by the real
+MovieRecommendationEvaluator._extract_scores. Two runs over the same catalog then
+only differ where retrieval, prompts or latency changed, which is what --baseline
+diffs: a regression exits non-zero so the runner can gate CI.
+
+Usage (from recommender-be/):
+    python batch_evaluation_runner.py --output reports/eval.json
+    python batch_evaluation_runner.py --baseline reports/baseline.json --output reports/eval.json
+    python batch_evaluation_runner.py --provider openai --model gpt-4o-mini --judge model
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import re
+import statistics
+import sys
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import select
+
+from config.settings import settings
+from core.evaluation.create_datasets import generate_complex_evaluation_dataset, generate_metric_evaluation_dataset
+from core.evaluation.evaluator import MovieRecommendationEvaluator
+from core.pipeline import movie_recommendation_pipeline
+from core.session import ChatSession
+from core.utils.serializer import count_tokens
+from db.database import async_engine, async_session_scope
+from models.models import ModelConfig, User
+
+logger = logging.getLogger(__name__)
+
+DATASETS = {
+    "metric": generate_metric_evaluation_dataset,
+    "complex": generate_complex_evaluation_dataset,
+}
+
+RUNNER_EMAIL = "batch-evaluation@localhost"
+
+SCORE_NAMES = [
+    "relevance", "diversity", "clarity", "personalization", "conciseness",
+    "coherence", "helpfulness", "harmfulness", "overall",
+]
+
+# Summary keys where a higher value is a regression; every other compared key regresses downwards
+LOWER_IS_BETTER = {"latency_p50_ms", "latency_p95_ms", "first_token_p50_ms", "errors", "harmfulness"}
+
+WORD_PATTERN = re.compile(r"[a-z0-9']{4,}")
+LIST_ITEM_PATTERN = re.compile(r"^\s*\d+\.\s+(.+)$", re.MULTILINE)
+
+def _words(text: str) -> set:
+    return set(WORD_PATTERN.findall(text.lower()))
+
+def _mentioned(titles: List[str], text: str) -> List[str]:
+    lowered = text.lower()
+    return [title for title in titles if title and title.lower() in lowered]
+
+def heuristic_judgement(item: Dict[str, Any], retrieval: Dict[str, Any], response: str, output_tokens: int) -> str:
+    """Offline stand-in for the GPT-4 judge, in the judge's [SCORES] output format."""
+    expected_movies = item.get("expected_movies")
+    if expected_movies:
+        relevance = len(_mentioned(expected_movies, response)) / len(expected_movies)
+    else:
+        expected = _words(item.get("expected_response", ""))
+        relevance = len(expected & _words(response)) / len(expected) if expected else 0.0
+
+    listed = LIST_ITEM_PATTERN.findall(response)
+    grounded = _mentioned(retrieval.get("titles", []), "\n".join(listed)) if listed else []
+    coherence = len(grounded) / len(listed) if listed else 0.0
+
+    genres = set()
+    for value in retrieval.get("genres", [])[:5]:
+        genres.update(genre.strip() for genre in str(value or "").split(",") if genre.strip())
+    diversity = min(1.0, len(genres) / 5)
+
+    scores = {
+        "relevance": relevance,
+        "diversity": diversity,
+        "clarity": 1.0 if listed else 0.5,
+        "personalization": relevance,
+        "conciseness": min(1.0, 150 / output_tokens) if output_tokens else 0.0,
+        "coherence": coherence,
+        "helpfulness": (relevance + coherence) / 2,
+        "harmfulness": 0.0,
+    }
+    positive = [value for name, value in scores.items() if name != "harmfulness"]
+    scores["overall"] = sum(positive) / len(positive)
+    return "[SCORES]\n" + "\n".join(f"{name}: {value:.2f}" for name, value in scores.items()) + "\n[/SCORES]"
+
+def percentile(samples: List[float], pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100 * len(ordered))) - 1))
+    return round(ordered[index], 1)
+
+async def get_runner_identity(provider: str, model: str, api_key: str) -> Tuple[User, ModelConfig]:
+    """Dedicated user + model config the batch conversations are stored under."""
+    async with async_session_scope() as db:
+        user = (await db.execute(select(User).filter(User.email == RUNNER_EMAIL))).scalars().first()
+        if user is None:
+            user = User(google_id=f"batch-evaluation-{uuid.uuid4()}", email=RUNNER_EMAIL, name="Batch evaluation")
+            db.add(user)
+            await db.flush()
+        config = (await db.execute(
+            select(ModelConfig).filter(ModelConfig.user_id == user.id).order_by(ModelConfig.created_at.desc()).limit(1)
+        )).scalars().first()
+        if config is None:
+            config = ModelConfig(user_id=user.id, provider=provider, model=model, api_key=api_key)
+            db.add(config)
+        else:
+            config.provider, config.model, config.api_key = provider, model, api_key
+        await db.flush()
+        await db.refresh(user)
+        await db.refresh(config)
+        db.expunge_all()
+    return user, config
+
+async def run_query(
+    index: int,
+    dataset: str,
+    item: Dict[str, Any],
+    user: User,
+    config: ModelConfig,
+    mode: str,
+    judge: str,
+    evaluator: MovieRecommendationEvaluator,
+    semaphore: asyncio.Semaphore,
+) -> Dict[str, Any]:
+    async with semaphore:
+        # Fresh session per query: no memory carries over between dataset items
+        session = ChatSession(f"batch-{index}", user, config)
+        response, reasoning, errors = "", "", []
+        evaluation_data: Dict[str, Any] = {}
+        first_token_ms = None
+        start = time.perf_counter()
+        async with async_session_scope() as db:
+            async for event in movie_recommendation_pipeline({"content": item["query"]}, db, session, mode=mode):
+                event_type = event.get("type")
+                if event_type == "final_response":
+                    if first_token_ms is None:
+                        first_token_ms = (time.perf_counter() - start) * 1000
+                    response += event.get("content", "")
+                elif event_type == "agent_thought":
+                    reasoning += event.get("content", "")
+                elif event_type == "error":
+                    errors.append(event.get("content", ""))
+                elif event_type == "evaluation_data":
+                    evaluation_data = event["content"]
+        total_ms = (time.perf_counter() - start) * 1000
+
+        retrieval = evaluation_data.get("retrieval", {})
+        usage = getattr(session.model, "usage", None)
+        input_tokens = usage["input_tokens"] if usage else None
+        output_tokens = usage["output_tokens"] if usage else count_tokens(response)
+
+        if judge == "model":
+            result = await evaluator.evaluate_run({
+                "input": item["query"],
+                "recommendation_from_agent": reasoning,
+                "conversation_response": response,
+            })
+            scores = result.metrics
+        else:
+            scores = evaluator._extract_scores(heuristic_judgement(item, retrieval, response, count_tokens(response)))
+
+        expected_movies = item.get("expected_movies")
+        return {
+            "dataset": dataset,
+            "query": item["query"],
+            "latency_ms": round(total_ms, 1),
+            "first_token_ms": round(first_token_ms, 1) if first_token_ms is not None else None,
+            "stage_timings_ms": evaluation_data.get("stage_timings_ms", {}),
+            "input_tokens": input_tokens,
+            "output_tokens": output_tokens,
+            "retrieval_strategy": retrieval.get("strategy"),
+            "retrieved_rows": retrieval.get("rows", 0),
+            "retrieved_titles": retrieval.get("titles", []),
+            "expected_recall": (
+                round(len(_mentioned(expected_movies, "\n".join(retrieval.get("titles", [])))) / len(expected_movies), 3)
+                if expected_movies else None
+            ),
+            "scores": scores,
+            "errors": errors,
+            "response": response,
+        }
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    latencies = [result["latency_ms"] for result in results]
+    first_tokens = [result["first_token_ms"] for result in results if result["first_token_ms"] is not None]
+    recalls = [result["expected_recall"] for result in results if result["expected_recall"] is not None]
+    summary = {
+        "queries": len(results),
+        "errors": sum(1 for result in results if result["errors"]),
+        "latency_p50_ms": percentile(latencies, 50),
+        "latency_p95_ms": percentile(latencies, 95),
+        "first_token_p50_ms": percentile(first_tokens, 50),
+        "mean_retrieved_rows": round(statistics.mean(result["retrieved_rows"] for result in results), 2) if results else 0,
+        "mean_expected_recall": round(statistics.mean(recalls), 3) if recalls else None,
+        "mean_output_tokens": round(statistics.mean(result["output_tokens"] or 0 for result in results), 1) if results else 0,
+    }
+    for name in SCORE_NAMES:
+        values = [result["scores"].get(name) for result in results if result["scores"].get(name) is not None]
+        summary[name] = round(statistics.mean(values), 3) if values else None
+    return summary
+
+def diff_reports(
+    report: Dict[str, Any],
+    baseline: Dict[str, Any],
+    latency_tolerance: float,
+    score_tolerance: float,
+) -> List[str]:
+    """Human-readable regressions of report against baseline (empty when none)."""
+    regressions = []
+    for key, base in baseline["summary"].items():
+        new = report["summary"].get(key)
+        if not isinstance(base, (int, float)) or not isinstance(new, (int, float)) or key == "queries":
+            continue
+        if key.endswith("_ms"):
+            # Relative tolerance, plus a small absolute floor so sub-10ms stages don't flap
+            if new > base * (1 + latency_tolerance) and new - base > 10:
+                regressions.append(f"{key}: {base} -> {new} ms")
+        elif key in LOWER_IS_BETTER:
+            if new > base + (0 if key == "errors" else score_tolerance):
+                regressions.append(f"{key}: {base} -> {new}")
+        elif key != "mean_output_tokens" and new < base - score_tolerance:
+            regressions.append(f"{key}: {base} -> {new}")
+
+    baseline_queries = {(result["dataset"], result["query"]): result for result in baseline.get("results", [])}
+    for result in report["results"]:
+        base = baseline_queries.get((result["dataset"], result["query"]))
+        if base is None:
+            continue
+        if base["retrieved_rows"] and not result["retrieved_rows"]:
+            regressions.append(f"{result['query']!r}: retrieval returned no rows (baseline {base['retrieved_rows']})")
+        if (
+            base.get("expected_recall") is not None
+            and result.get("expected_recall") is not None
+            and result["expected_recall"] < base["expected_recall"] - score_tolerance
+        ):
+            regressions.append(f"{result['query']!r}: expected recall {base['expected_recall']} -> {result['expected_recall']}")
+    return regressions
+
+def write_report(report: Dict[str, Any], path: str) -> None:
+    if path.endswith(".parquet"):
+        # Optional: pandas needs pyarrow (or fastparquet) for Parquet
+        import pandas as pd
+
+        rows = [
+            {**{key: value for key, value in result.items() if key not in ("scores", "stage_timings_ms")},
+             **{f"score_{name}": value for name, value in result["scores"].items()},
+             **{f"stage_{name}_ms": value for name, value in result["stage_timings_ms"].items()},
+             "retrieved_titles": json.dumps(result["retrieved_titles"]),
+             "errors": json.dumps(result["errors"])}
+            for result in report["results"]
+        ]
+        pd.DataFrame(rows).to_parquet(path, index=False)
+    else:
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2, default=str)
+
+async def run_batch(args) -> Dict[str, Any]:
+    if args.provider == "fake":
+        settings.FAKE_PROVIDER_ENABLED = True
+    if not args.with_caches:
+        # Measure retrieval and generation, not cache hits from a previous run
+        settings.RESPONSE_CACHE_ENABLED = False
+        settings.SEMANTIC_CACHE_ENABLED = False
+        settings.QUERY_CACHE_ENABLED = False
+
+    user, config = await get_runner_identity(args.provider, args.model, args.api_key or "offline")
+    evaluator = MovieRecommendationEvaluator()
+    semaphore = asyncio.Semaphore(args.concurrency)
+    items = [(dataset, item) for dataset in args.datasets for item in DATASETS[dataset]()]
+    if args.limit:
+        items = items[:args.limit]
+
+    started = time.perf_counter()
+    results = await asyncio.gather(*[
+        run_query(index, dataset, item, user, config, args.mode, args.judge, evaluator, semaphore)
+        for index, (dataset, item) in enumerate(items)
+    ])
+    wall = time.perf_counter() - started
+    await async_engine.dispose()
+
+    return {
+        "meta": {
+            "created_at": datetime.utcnow().isoformat(),
+            "datasets": args.datasets,
+            "provider": args.provider,
+            "model": args.model,
+            "mode": args.mode,
+            "judge": args.judge,
+            "concurrency": args.concurrency,
+            "caches": args.with_caches,
+            "wall_seconds": round(wall, 2),
+        },
+        "summary": summarize(list(results)),
+        "results": list(results),
+    }
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--datasets", nargs="+", choices=list(DATASETS), default=list(DATASETS))
+    parser.add_argument("--provider", default="fake")
+    parser.add_argument("--model", default="fake-deterministic")
+    parser.add_argument("--api-key", default=None)
+    parser.add_argument("--mode", choices=["two_pass", "single_pass"], default=settings.PIPELINE_MODE)
+    parser.add_argument("--judge", choices=["heuristic", "model"], default="heuristic",
+                        help="'model' calls the GPT-4 judge (needs OPENAI_API_KEY)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--limit", type=int, default=0, help="Only run the first N queries")
+    parser.add_argument("--with-caches", action="store_true", help="Keep the response/semantic/query caches on")
+    parser.add_argument("--output", default="evaluation_report.json", help=".json or .parquet")
+    parser.add_argument("--baseline", help="Report to diff against; regressions exit with status 1")
+    parser.add_argument("--latency-tolerance", type=float, default=0.2, help="Allowed relative latency increase")
+    parser.add_argument("--score-tolerance", type=float, default=0.05, help="Allowed absolute score/recall drop")
+    args = parser.parse_args(argv)
+
+    report = asyncio.run(run_batch(args))
+    write_report(report, args.output)
+    # The JSON report is also what --baseline reads, so keep one next to a Parquet export
+    if args.output.endswith(".parquet"):
+        write_report(report, args.output[:-len(".parquet")] + ".json")
+
+    print(f"{report['summary']['queries']} queries in {report['meta']['wall_seconds']} s -> {args.output}")
+    for key, value in report["summary"].items():
+        print(f"  {key:<22} {value}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        regressions = diff_reports(report, baseline, args.latency_tolerance, args.score_tolerance)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) against {args.baseline}:")
+            for regression in regressions:
+                print(f"  - {regression}")
+            return 1
+        print(f"\nNo regressions against {args.baseline}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,7 +9,8 @@ import re
 import json
 from langfuse.decorators import langfuse_context, observe
 from models.models import ModelEvaluation, Conversation, ModelConfig
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.exc import IntegrityError
 
 logger = logging.getLogger(__name__)
@@ -88,7 +89,7 @@ class MovieRecommendationEvaluator:
             if isinstance(movie, dict):
                 title = movie.get('title', '')
                 release_date = movie.get('release_date', '')
-                year = release_date[:4] if release_date else ''
+                year = str(release_date)[:4] if release_date else ''
                 overview = movie.get('overview', '')
                 formatted_movies.append(f"{title} ({year}): {overview}")
             elif isinstance(movie, str):
@@ -152,7 +153,7 @@ async def evaluate_movie_recommendations(data: Dict[str, Any]) -> EvaluationResu
     if not trace_id or not span_id:
         logger.warning("trace_id or span_id is missing in the input data")
 
-    if not isinstance(db_session, Session):
+    if not isinstance(db_session, AsyncSession):
         logger.error("Invalid db_session provided")
         return EvaluationResult(metrics={}, comments={"error": "Invalid database session"})
 
@@ -184,9 +185,9 @@ async def evaluate_movie_recommendations(data: Dict[str, Any]) -> EvaluationResu
 
         # Store evaluation results in the database
         if conversation_id:
-            conversation = db_session.query(Conversation).get(conversation_id)
+            conversation = await db_session.get(Conversation, conversation_id)
             if conversation:
-                model_config = conversation.model_config
+                model_config = await db_session.get(ModelConfig, conversation.model_config_id)
                 try:
                     evaluation = ModelEvaluation(
                         model_config_id=model_config.id,
@@ -195,16 +196,17 @@ async def evaluate_movie_recommendations(data: Dict[str, Any]) -> EvaluationResu
                         metrics=result.metrics
                     )
                     db_session.add(evaluation)
-                    db_session.commit()
+                    await db_session.commit()
                     logger.info(f"Evaluation stored for conversation_id: {conversation_id}")
                 except IntegrityError as ie:
                     logger.error(f"IntegrityError while storing evaluation: {str(ie)}")
-                    db_session.rollback()
+                    await db_session.rollback()
                     # If an evaluation already exists, update it instead
-                    existing_evaluation = db_session.query(ModelEvaluation).filter_by(conversation_id=conversation_id).first()
+                    stmt = select(ModelEvaluation).filter_by(conversation_id=conversation_id).limit(1)
+                    existing_evaluation = (await db_session.execute(stmt)).scalars().first()
                     if existing_evaluation:
                         existing_evaluation.metrics = result.metrics
-                        db_session.commit()
+                        await db_session.commit()
                         logger.info(f"Existing evaluation updated for conversation_id: {conversation_id}")
                     else:
                         logger.error("Failed to store or update evaluation")
@@ -0,0 +1,248 @@
+"""
+Background evaluation of chat answers.
+
+askLLM used to await the GPT-4 judge inside the socket's message handler, so the
+user couldn't send the next message until it returned. Answers are now enqueued as
+rows in evaluation_jobs and scored by a pool of worker tasks in this process (or,
+with EVALUATION_PROCESS_POOL > 0, by judge calls running in child processes).
+
+Rows are the source of truth: a job is claimed with a conditional UPDATE, so several
+API workers can share the table, and a periodic sweep re-queues pending jobs and
+jobs whose worker died mid-run, so evaluations survive restarts.
+Finished scores are pushed to the session's socket as an "evaluation" frame when it
+is still open, and can always be polled from GET /api/evaluations/{job_id}.
+"""
+
+import asyncio
+import logging
+import random
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from sqlalchemy import text
+
+from config.settings import settings
+from core.evaluation.evaluator import MovieRecommendationEvaluator
+from core.utils.helpers import store_model_evaluation
+from db.database import async_session_scope
+from models.models import EvaluationJob
+
+logger = logging.getLogger(__name__)
+
+CLAIM_JOB = """
+UPDATE evaluation_jobs
+SET status = 'running', attempts = attempts + 1, updated_at = now()
+WHERE id = :id AND status = 'pending'
+RETURNING payload, attempts, conversation_id, model_config_id, model_name
+"""
+
+# One event loop per pool child, kept for the child's lifetime: the shared provider
+# HTTP client (core.client_registry) binds its connections to the loop that opened
+# them, so a fresh asyncio.run() per job would reuse them from a closed loop
+_child_loop: Optional[asyncio.AbstractEventLoop] = None
+_child_evaluator: Optional[MovieRecommendationEvaluator] = None
+
+def _init_child() -> None:
+    """Process pool initializer: the child's persistent event loop and evaluator."""
+    global _child_loop, _child_evaluator
+    _child_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(_child_loop)
+    _child_evaluator = MovieRecommendationEvaluator()
+
+def _evaluate_in_process(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Judge call for the process pool, run on the child's persistent event loop."""
+    return _child_loop.run_until_complete(_child_evaluator.evaluate_run(payload)).dict()
+
+class EvaluationWorker:
+    def __init__(self, concurrency: int, queue_size: int, process_pool: int):
+        self.concurrency = concurrency
+        self.process_pool = process_pool
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._queued = set()
+        self._tasks = []
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._evaluator = None
+        # session_id -> coroutine that delivers a frame to that socket
+        self._listeners: Dict[str, Callable[[Dict[str, Any]], Awaitable[Any]]] = {}
+        self.submitted = 0
+        self.skipped = 0
+        self.completed = 0
+        self.failed = 0
+
+    async def start(self) -> None:
+        # evaluation_jobs comes from its alembic revision (or migrate_data on a fresh database)
+        if self.process_pool > 0:
+            self._pool = ProcessPoolExecutor(max_workers=self.process_pool, initializer=_init_child)
+        self._tasks = [asyncio.create_task(self._consume()) for _ in range(self.concurrency)]
+        self._tasks.append(asyncio.create_task(self._sweep_forever()))
+        logger.info(f"Evaluation worker started with {self.concurrency} consumers, process pool {self.process_pool}")
+
+    async def stop(self) -> None:
+        # Unfinished jobs stay in the table and are picked up again after a restart
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def subscribe(self, session_id: str, deliver: Callable[[Dict[str, Any]], Awaitable[Any]]) -> None:
+        self._listeners[session_id] = deliver
+
+    def unsubscribe(self, session_id: str) -> None:
+        self._listeners.pop(session_id, None)
+
+    async def submit(self, evaluation_data: Dict[str, Any], user_id: str, session_id: str) -> Optional[str]:
+        """Persist an evaluation job (sampled at EVALUATION_SAMPLE_RATE); returns its id."""
+        if not settings.EVALUATION_ENABLED:
+            return None
+        if random.random() >= settings.EVALUATION_SAMPLE_RATE:
+            self.skipped += 1
+            return None
+        if not evaluation_data.get("conversation_id") or not evaluation_data.get("model_config_id"):
+            logger.warning("Evaluation data has no conversation or model config, not queued")
+            return None
+
+        job_id = uuid.uuid4()
+        try:
+            async with async_session_scope() as db:
+                db.add(EvaluationJob(
+                    id=job_id,
+                    user_id=uuid.UUID(str(user_id)),
+                    conversation_id=evaluation_data["conversation_id"],
+                    model_config_id=evaluation_data["model_config_id"],
+                    model_name=evaluation_data.get("model_name"),
+                    session_id=session_id,
+                    payload={
+                        "input": evaluation_data.get("input", ""),
+                        "recommendation_from_agent": str(evaluation_data.get("recommendation_from_agent", "")),
+                        "conversation_response": evaluation_data.get("conversation_response", ""),
+                    },
+                ))
+        except Exception as e:
+            # Evaluation is best effort; never fail the chat message over it
+            logger.error(f"Error queueing evaluation: {str(e)}", exc_info=True)
+            return None
+        self.submitted += 1
+        self._enqueue(str(job_id))
+        return str(job_id)
+
+    def _enqueue(self, job_id: str) -> None:
+        if job_id in self._queued:
+            return
+        try:
+            self._queue.put_nowait(job_id)
+            self._queued.add(job_id)
+        except asyncio.QueueFull:
+            # Still pending in the table; the sweep will queue it once there is room
+            logger.warning(f"Evaluation queue full, job {job_id} left for the next sweep")
+
+    async def _sweep_forever(self) -> None:
+        while True:
+            try:
+                await self.sweep()
+            except Exception as e:
+                logger.error(f"Evaluation sweep failed: {str(e)}", exc_info=True)
+            await asyncio.sleep(settings.EVALUATION_SWEEP_INTERVAL)
+
+    async def sweep(self) -> None:
+        """Re-queue pending jobs and release jobs stuck in 'running' (worker crashed or restarted)."""
+        async with async_session_scope() as db:
+            await db.execute(text("""
+                UPDATE evaluation_jobs SET status = 'pending', updated_at = now()
+                WHERE status = 'running' AND updated_at < now() - make_interval(secs => :timeout)
+            """), {"timeout": float(settings.EVALUATION_JOB_TIMEOUT)})
+            rows = await db.execute(text("""
+                SELECT id FROM evaluation_jobs WHERE status = 'pending' ORDER BY created_at LIMIT :limit
+            """), {"limit": self._queue.maxsize - self._queue.qsize()})
+            job_ids = [str(row.id) for row in rows]
+        for job_id in job_ids:
+            self._enqueue(job_id)
+
+    async def _consume(self) -> None:
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self.process(job_id)
+            except Exception as e:
+                logger.error(f"Error processing evaluation job {job_id}: {str(e)}", exc_info=True)
+            finally:
+                self._queued.discard(job_id)
+                self._queue.task_done()
+
+    async def _evaluate(self, payload: Dict[str, Any]) -> Dict[str, Any]:
+        if self._pool is not None:
+            return await asyncio.get_running_loop().run_in_executor(self._pool, _evaluate_in_process, payload)
+        if self._evaluator is None:
+            self._evaluator = MovieRecommendationEvaluator()
+        return (await self._evaluator.evaluate_run(payload)).dict()
+
+    async def process(self, job_id: str) -> None:
+        async with async_session_scope() as db:
+            job = (await db.execute(text(CLAIM_JOB), {"id": uuid.UUID(job_id)})).first()
+        if job is None:
+            return  # Already claimed by another worker, or finished
+
+        status, error = "done", None
+        try:
+            result = await self._evaluate(job.payload)
+            if not result.get("metrics"):
+                raise RuntimeError(result.get("comments", {}).get("error", "Evaluation returned no metrics"))
+        except Exception as e:
+            result = None
+            error = str(e)
+            status = "failed" if job.attempts >= settings.EVALUATION_MAX_ATTEMPTS else "pending"
+            logger.warning(f"Evaluation job {job_id} attempt {job.attempts} failed: {error}")
+
+        async with async_session_scope() as db:
+            if result is not None:
+                await store_model_evaluation(
+                    db, job.model_config_id, job.model_name, job.conversation_id, result["metrics"]
+                )
+            evaluation_job = await db.get(EvaluationJob, uuid.UUID(job_id))
+            evaluation_job.status = status
+            evaluation_job.result = result
+            evaluation_job.error = error
+            session_id = evaluation_job.session_id
+
+        if status == "pending":
+            return  # Retried by the next sweep
+        if status == "done":
+            self.completed += 1
+        else:
+            self.failed += 1
+        await self._deliver(session_id, job_id, status, result, error)
+
+    async def _deliver(self, session_id: Optional[str], job_id: str, status: str, result, error) -> None:
+        deliver = self._listeners.get(session_id) if session_id else None
+        if deliver is None:
+            return  # Socket gone; the client can still poll GET /api/evaluations/{job_id}
+        frame = {
+            "message_id": job_id,
+            "content": result if status == "done" else {"error": error},
+            "type": "evaluation",
+            "timestamp": datetime.utcnow().isoformat(),
+        }
+        try:
+            await deliver(frame)
+        except Exception as e:
+            logger.warning(f"Could not deliver evaluation {job_id} to session {session_id}: {str(e)}")
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "queued": self._queue.qsize(),
+            "submitted": self.submitted,
+            "skipped_by_sampling": self.skipped,
+            "completed": self.completed,
+            "failed": self.failed,
+            "sample_rate": settings.EVALUATION_SAMPLE_RATE,
+        }
+
+evaluation_worker = EvaluationWorker(
+    concurrency=settings.EVALUATION_WORKER_CONCURRENCY,
+    queue_size=settings.EVALUATION_QUEUE_SIZE,
+    process_pool=settings.EVALUATION_PROCESS_POOL,
+)
@@ -0,0 +1,131 @@
+"""
+Token-bounded conversation memory for chat sessions.
+
+Replaces ConversationBufferMemory, which kept every full response for the lifetime of
+the socket. Messages are stored truncated, the window is capped by message count and by
+total tokens, and turns that fall out of the window are either dropped or folded into a
+short running summary by a background task, so summarizing never delays a reply.
+"""
+
+import asyncio
+import logging
+import sys
+from typing import List, Optional
+
+from langchain.schema import AIMessage, BaseMessage, HumanMessage
+
+from config.settings import settings
+from core.utils.serializer import count_tokens
+
+logger = logging.getLogger(__name__)
+
+SUMMARY_PREFIX = "Summary of the earlier conversation: "
+
+def _truncate_tokens(text: str, max_tokens: int) -> str:
+    if count_tokens(text) <= max_tokens:
+        return text
+    # Rough cut by characters, then trim until it fits
+    cut = text[:max_tokens * 4]
+    while cut and count_tokens(cut) > max_tokens:
+        cut = cut[:int(len(cut) * 0.9)]
+    return cut.rstrip() + " …"
+
+class TokenBudgetMemory:
+    def __init__(
+        self,
+        max_tokens: Optional[int] = None,
+        max_messages: Optional[int] = None,
+        max_message_tokens: Optional[int] = None,
+        summarizer=None,
+    ):
+        self.max_tokens = max_tokens or settings.MEMORY_MAX_TOKENS
+        self.max_messages = max_messages or settings.MEMORY_MAX_MESSAGES
+        self.max_message_tokens = max_message_tokens or settings.MEMORY_MAX_MESSAGE_TOKENS
+        self.summarizer = summarizer
+        self.summary = ""
+        self._messages: List[BaseMessage] = []
+        self._tokens: List[int] = []
+        self._evicted: List[BaseMessage] = []
+        self._summary_task: Optional[asyncio.Task] = None
+
+    @property
+    def chat_memory(self) -> "TokenBudgetMemory":
+        # Same access path as langchain's memories (memory.chat_memory.messages)
+        return self
+
+    @property
+    def messages(self) -> List[BaseMessage]:
+        if self.summary:
+            return [AIMessage(content=SUMMARY_PREFIX + self.summary), *self._messages]
+        return list(self._messages)
+
+    def add_user_message(self, content: str) -> None:
+        self._add(HumanMessage(content=_truncate_tokens(content, self.max_message_tokens)))
+
+    def add_ai_message(self, content: str) -> None:
+        self._add(AIMessage(content=_truncate_tokens(content, self.max_message_tokens)))
+
+    def _add(self, message: BaseMessage) -> None:
+        self._messages.append(message)
+        self._tokens.append(count_tokens(message.content))
+        while len(self._messages) > 1 and (
+            len(self._messages) > self.max_messages or sum(self._tokens) > self.max_tokens
+        ):
+            self._tokens.pop(0)
+            self._evicted.append(self._messages.pop(0))
+        if self._evicted:
+            self._schedule_summary()
+
+    def _schedule_summary(self) -> None:
+        if self.summarizer is None:
+            self._evicted.clear()
+            return
+        if self._summary_task is None or self._summary_task.done():
+            try:
+                self._summary_task = asyncio.get_running_loop().create_task(self._summarize())
+            except RuntimeError:
+                # No event loop (offline use): drop instead of summarizing
+                self._evicted.clear()
+
+    async def _summarize(self) -> None:
+        while self._evicted:
+            evicted, self._evicted = self._evicted, []
+            transcript = "\n".join(
+                f"{'User' if isinstance(message, HumanMessage) else 'AI'}: {message.content}" for message in evicted
+            )
+            prompt = (
+                f"Update the running summary of a movie recommendation chat in at most "
+                f"{settings.MEMORY_SUMMARY_TOKENS} tokens. Keep the user's stated tastes, movies already "
+                f"recommended and open requests.\n\nCurrent summary: {self.summary or '(none)'}\n\n"
+                f"New turns:\n{transcript}"
+            )
+            try:
+                summary = await self.summarizer.generate([HumanMessage(content=prompt)])
+                if summary.startswith("Error:"):
+                    # Model wrappers return their errors as text
+                    raise RuntimeError(summary)
+                self.summary = _truncate_tokens(summary.strip(), settings.MEMORY_SUMMARY_TOKENS)
+            except Exception as e:
+                logger.warning(f"Conversation summary failed, dropping {len(evicted)} messages: {str(e)}")
+
+    def clear(self) -> None:
+        self._messages.clear()
+        self._tokens.clear()
+        self._evicted.clear()
+        self.summary = ""
+
+    def close(self) -> None:
+        if self._summary_task is not None and not self._summary_task.done():
+            self._summary_task.cancel()
+
+    @property
+    def token_count(self) -> int:
+        return sum(self._tokens) + (count_tokens(self.summary) if self.summary else 0)
+
+    def memory_bytes(self) -> int:
+        """Approximate heap held by the stored messages and summary."""
+        return (
+            sum(sys.getsizeof(message) + sys.getsizeof(message.content) for message in self._messages)
+            + sys.getsizeof(self.summary)
+            + sum(sys.getsizeof(message.content) for message in self._evicted)
+        )
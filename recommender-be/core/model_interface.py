@@ -1,10 +1,16 @@
 from abc import ABC, abstractmethod
-from typing import AsyncIterator, List
+import asyncio
+import csv
+import io
+import re
+import weakref
+from typing import AsyncIterator, Dict, List, Optional
 from langchain.schema import HumanMessage, AIMessage
 from langfuse.decorators import observe, langfuse_context
 import logging
-from langfuse.openai import AsyncOpenAI
-from anthropic import AsyncAnthropic
+from core.client_registry import client_registry
+from config.settings import settings
+from core.utils.serializer import count_tokens
 
 logger = logging.getLogger(__name__)
 
@@ -20,6 +26,24 @@ class BaseModelInterface(ABC):
 class BaseModel(BaseModelInterface):
     def __init__(self, model_name: str):
         self.model_name = model_name
+        # Streams handed out by generate_stream; entries drop out once garbage collected
+        self._streams: "weakref.WeakSet[AsyncIterator[str]]" = weakref.WeakSet()
+
+    def _track(self, stream: AsyncIterator[str]) -> AsyncIterator[str]:
+        self._streams.add(stream)
+        return stream
+
+    async def close_streams(self) -> None:
+        """
+        Close the streams from generate_stream that are still open.
+
+        The @observe wrappers between the socket and the model do not forward aclose()
+        to the generator they wrap, so closing the outermost one leaves the provider
+        stream suspended (connection checked out) until garbage collection.
+        """
+        for stream in list(self._streams):
+            if not stream.ag_running:
+                await stream.aclose()
 
     def handle_error(self, e: Exception) -> str:
         error_message = f"Error: {str(e)}"
@@ -30,9 +54,11 @@ class BaseModel(BaseModelInterface):
         logger.info(f"Complete {self.__class__.__name__} response: {response[:100]}...")  # Log first 100 chars
 
 class OpenAIModel(BaseModel):
-    def __init__(self, model_name: str, api_key: str):
+    def __init__(self, model_name: str, api_key: str, base_url: Optional[str] = None):
         super().__init__(model_name)
-        self.client = AsyncOpenAI(api_key=api_key)
+        pooled = client_registry.get("openai", api_key, base_url)
+        self.client = pooled.client
+        self.limiter = pooled.limiter
 
     @observe(as_type="generation")
     async def generate_stream(self, messages: List[HumanMessage | AIMessage]) -> AsyncIterator[str]:
@@ -45,17 +71,24 @@ class OpenAIModel(BaseModel):
                     metadata={"stream": True}
                 )
 
-                response = await self.client.chat.completions.create(
-                    model=self.model_name,
-                    messages=openai_messages,
-                    stream=True
-                )
-
                 total_tokens = 0
-                async for chunk in response:
-                    if chunk.choices[0].delta.content:
-                        yield chunk.choices[0].delta.content
-                        total_tokens += 1
+                # The slot only covers opening the stream: the consumer may stop reading
+                # (socket closed) while this generator is suspended at a yield
+                async with self.limiter:
+                    response = await self.client.chat.completions.create(
+                        model=self.model_name,
+                        messages=openai_messages,
+                        stream=True
+                    )
+
+                try:
+                    async for chunk in response:
+                        if chunk.choices[0].delta.content:
+                            yield chunk.choices[0].delta.content
+                            total_tokens += 1
+                finally:
+                    # Hands the connection back to the shared pool when the stream is abandoned
+                    await response.response.aclose()
 
                 langfuse_context.update_current_observation(
                     usage={
@@ -67,7 +100,7 @@ class OpenAIModel(BaseModel):
                 error_message = self.handle_error(e)
                 yield error_message
         
-        return stream_generator()
+        return self._track(stream_generator())
 
     @observe(as_type="generation")
     async def generate(self, messages: List[HumanMessage | AIMessage]) -> str:
@@ -79,10 +112,11 @@ class OpenAIModel(BaseModel):
                 metadata={"stream": False}
             )
 
-            response = await self.client.chat.completions.create(
-                model=self.model_name,
-                messages=openai_messages,
-            )
+            async with self.limiter:
+                response = await self.client.chat.completions.create(
+                    model=self.model_name,
+                    messages=openai_messages,
+                )
             complete_response = response.choices[0].message.content
             self.log_response(complete_response)
 
@@ -105,9 +139,11 @@ class OpenAIModel(BaseModel):
             return error_message
 
 class AnthropicModel(BaseModel):
-    def __init__(self, model_name: str, api_key: str):
+    def __init__(self, model_name: str, api_key: str, base_url: Optional[str] = None):
         super().__init__(model_name)
-        self.client = AsyncAnthropic(api_key=api_key)
+        pooled = client_registry.get("anthropic", api_key, base_url)
+        self.client = pooled.client
+        self.limiter = pooled.limiter
 
     @observe(as_type="generation")
     async def generate_stream(self, messages: List[HumanMessage | AIMessage]) -> AsyncIterator[str]:
@@ -120,18 +156,24 @@ class AnthropicModel(BaseModel):
                     metadata={"stream": True}
                 )
 
-                response = await self.client.messages.create(
-                    model=self.model_name,
-                    messages=anthropic_messages,
-                    max_tokens=1000,
-                    stream=True
-                )
-
                 total_tokens = 0
-                async for chunk in response:
-                    if chunk.delta.text:
-                        yield chunk.delta.text
-                        total_tokens += 1
+                # As in OpenAIModel: hold the slot only while opening the stream
+                async with self.limiter:
+                    response = await self.client.messages.create(
+                        model=self.model_name,
+                        messages=anthropic_messages,
+                        max_tokens=1000,
+                        stream=True
+                    )
+
+                try:
+                    async for chunk in response:
+                        # message_start, content_block_start, ... carry no text
+                        if chunk.type == "content_block_delta" and chunk.delta.text:
+                            yield chunk.delta.text
+                            total_tokens += 1
+                finally:
+                    await response.response.aclose()
 
                 langfuse_context.update_current_observation(
                     usage={
@@ -143,7 +185,7 @@ class AnthropicModel(BaseModel):
                 error_message = self.handle_error(e)
                 yield error_message
         
-        return stream_generator()
+        return self._track(stream_generator())
 
     @observe(as_type="generation")
     async def generate(self, messages: List[HumanMessage | AIMessage]) -> str:
@@ -155,11 +197,12 @@ class AnthropicModel(BaseModel):
                 metadata={"stream": False}
             )
 
-            response = await self.client.messages.create(
-                model=self.model_name,
-                messages=anthropic_messages,
-                max_tokens=1000,
-            )
+            async with self.limiter:
+                response = await self.client.messages.create(
+                    model=self.model_name,
+                    messages=anthropic_messages,
+                    max_tokens=1000,
+                )
 
             complete_response = response.content[0].text
             self.log_response(complete_response)
@@ -181,12 +224,71 @@ class AnthropicModel(BaseModel):
             )
             return error_message
 
+class FakeModel(BaseModel):
+    """
+    Deterministic offline provider for batch evaluation (provider "fake").
+
+    Answers are built only from the prompt: the titles of the retrieved-rows CSV block
+    or, for the two-pass answer, the numbered lines of the agent's recommendation. The
+    same prompt always gives the same answer, so runs are comparable without network.
+    """
+
+    CSV_BLOCK = re.compile(r"```csv\n(.*?)```", re.DOTALL)
+    NUMBERED_LINE = re.compile(r"^\s*\d+\.\s+(.+)$", re.MULTILINE)
+
+    def __init__(self, model_name: str, api_key: str = "", base_url: Optional[str] = None):
+        super().__init__(model_name)
+        if not settings.FAKE_PROVIDER_ENABLED:
+            raise ValueError("The fake provider is only available for offline evaluation runs")
+        self.usage: Dict[str, int] = {"input_tokens": 0, "output_tokens": 0, "calls": 0}
+
+    def _answer(self, messages: List[HumanMessage | AIMessage]) -> str:
+        prompt = "\n".join(str(message.content) for message in messages)
+        block = self.CSV_BLOCK.search(prompt)
+        items = []
+        if block:
+            for row in csv.DictReader(io.StringIO(block.group(1))):
+                if row.get("title"):
+                    year = f" ({row['year']})" if row.get("year") else ""
+                    genres = f" - {row['genres']}" if row.get("genres") else ""
+                    items.append(f"{row['title']}{year}{genres}")
+        else:
+            items = self.NUMBERED_LINE.findall(str(messages[-1].content) if messages else "")
+        if not items:
+            return "I couldn't find movies matching your request in the catalog."
+        lines = [f"{index}. {item}" for index, item in enumerate(items[:5], start=1)]
+        return "Here are some movies you might enjoy:\n" + "\n".join(lines)
+
+    def _record(self, messages: List[HumanMessage | AIMessage], answer: str) -> None:
+        self.usage["input_tokens"] += sum(count_tokens(str(message.content)) for message in messages)
+        self.usage["output_tokens"] += count_tokens(answer)
+        self.usage["calls"] += 1
+
+    async def generate_stream(self, messages: List[HumanMessage | AIMessage]) -> AsyncIterator[str]:
+        answer = self._answer(messages)
+        self._record(messages, answer)
+
+        async def stream_generator():
+            for token in re.findall(r"\S+\s*|\s+", answer):
+                yield token
+                await asyncio.sleep(0)
+
+        return self._track(stream_generator())
+
+    async def generate(self, messages: List[HumanMessage | AIMessage]) -> str:
+        answer = self._answer(messages)
+        self._record(messages, answer)
+        return answer
+
 class ModelFactory:
     @staticmethod
-    def create_model(provider: str, model_name: str, api_key: str) -> BaseModelInterface:
+    def create_model(provider: str, model_name: str, api_key: str, base_url: Optional[str] = None) -> BaseModelInterface:
+        # Cheap: the SDK client and its connection pool come from client_registry
         if provider.lower() == "openai":
-            return OpenAIModel(model_name, api_key)
+            return OpenAIModel(model_name, api_key, base_url)
         elif provider.lower() == "anthropic":
-            return AnthropicModel(model_name, api_key)
+            return AnthropicModel(model_name, api_key, base_url)
+        elif provider.lower() == "fake":
+            return FakeModel(model_name, api_key, base_url)
         else:
             raise ValueError(f"Unsupported provider: {provider}")
@@ -3,22 +3,31 @@ This module contains the main pipeline for movie recommendations and a separate
 It includes integration with Langfuse for metric logging and tracing.
 """
 
+import asyncio
 import logging
-from typing import AsyncGenerator, Dict, Union, Any, List
-from sqlalchemy.orm import Session
-from langchain.memory import ConversationBufferMemory
+import random
+import time
+from typing import AsyncGenerator, Awaitable, Dict, Union, Any, List, Optional, Set
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.database import async_session_scope
+from core.memory import TokenBudgetMemory
 from langchain.schema import SystemMessage, HumanMessage
-from models.models import User
+from models.models import ModelConfig
 from core.model_interface import BaseModelInterface
 from core.agent.agent import MovieRecommendationAgent
+from core.session import ChatSession
+from core.cache.response_cache import response_cache, replay
+from core.cache.semantic_cache import semantic_retrieval_cache, semantic_answer_cache, result_overlap
+from db.catalog import get_catalog_version
 from core.utils.helpers import (
     get_or_create_conversation,
     create_message,
     classify_input,
-    get_model_config,
     store_model_evaluation,
 )
-from core.utils.prompts import create_memory_prompt, get_system_message
+from core.utils.serializer import serialize_rows
+from core.utils.prompts import create_memory_prompt, create_single_pass_prompt, get_system_message
+from config.settings import settings
 from core.evaluation.evaluator import evaluate_movie_recommendations
 from langfuse.decorators import langfuse_context, observe
 from config.langfuse_config import get_langfuse
@@ -38,15 +47,9 @@ def is_langfuse_available():
         return False
 
 @observe()
-def initialize_conversation(db_session: Session, user_id: str):
-    logger.info(f"Initializing conversation for user_id: {user_id}")
-    model_config = get_model_config(db_session, user_id)
-    if model_config is None:
-        logger.error(f"No model configuration found for user_id: {user_id}")
-        raise ValueError(f"No model configuration found for user_id: {user_id}")
-    
-    logger.info(f"Model configuration found for user_id: {user_id}, model_config_id: {model_config.id}")
-    conversation = get_or_create_conversation(db_session, user_id, str(model_config.id))
+async def initialize_conversation(db_session: AsyncSession, user_id: str, model_config: ModelConfig):
+    logger.info(f"Initializing conversation for user_id: {user_id}, model_config_id: {model_config.id}")
+    conversation = await get_or_create_conversation(db_session, user_id, str(model_config.id))
     if conversation is None:
         logger.error(f"Failed to create or retrieve conversation for user_id: {user_id}")
         raise ValueError(f"Failed to create or retrieve conversation for user_id: {user_id}")
@@ -54,16 +57,80 @@ def initialize_conversation(db_session: Session, user_id: str):
     logger.info(f"Conversation initialized for user_id: {user_id}, conversation_id: {conversation.id}")
     return conversation.id
 
+class StageTimings:
+    """Wall-clock duration of each pipeline stage, in milliseconds."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.stages: Dict[str, float] = {}
+
+    async def run(self, name: str, stage: Awaitable):
+        start = time.perf_counter()
+        try:
+            return await stage
+        finally:
+            self.stages[name] = round((time.perf_counter() - start) * 1000, 1)
+
+    def mark(self, name: str) -> None:
+        # Milestones (e.g. first token) are measured from the start of the pipeline
+        self.stages.setdefault(name, round((time.perf_counter() - self.started) * 1000, 1))
+
 @observe()
 def classify_user_input(content: str):
     return classify_input(content)
 
 @observe()
-async def retrieve_context(db_session: Session, user: User, content: str) -> AsyncGenerator[Dict[str, str], None]:
-    agent = MovieRecommendationAgent(db_session, user)
-    agent.initialize()
+async def bootstrap_conversation(db_session: AsyncSession, session: ChatSession, content: str) -> str:
+    """Open (or reuse) the conversation and store the user's message."""
+    if session.conversation_id is None:
+        session.conversation_id = await initialize_conversation(db_session, str(session.user.id), session.config)
+    await store_user_message(db_session, str(session.conversation_id), content)
+    return session.conversation_id
+
+# Sampled semantic-hit checks run in the background; the loop only keeps weak
+# references to tasks, so they are held here until done
+verification_tasks: Set[asyncio.Task] = set()
+
+@observe()
+async def retrieve_movie_data(agent: MovieRecommendationAgent, content: str, catalog_version: int = 0) -> Dict[str, Any]:
+    use_cache = settings.SEMANTIC_CACHE_ENABLED and semantic_retrieval_cache.is_cacheable(content)
+    if use_cache:
+        scope = f"{catalog_version}|{agent.retrieval_scope(content)}"
+        hit = semantic_retrieval_cache.lookup(content, scope)
+        if hit:
+            index, cached, _ = hit
+            if random.random() < settings.SEMANTIC_CACHE_VERIFY_RATE:
+                task = asyncio.create_task(verify_semantic_hit(agent.user, content, index, cached))
+                verification_tasks.add(task)
+                task.add_done_callback(verification_tasks.discard)
+            return cached
+
+    # Own session: an AsyncSession can't be shared with the concurrent bootstrap stage
+    async with async_session_scope() as retrieval_db:
+        retrieved_data = await agent.bind(retrieval_db).retrieve_data(content)
+
+    # Collaborative results are personal and must not be served to other users
+    if use_cache and "collaborative" not in retrieved_data.get("retrieval", ""):
+        semantic_retrieval_cache.store(content, scope, retrieved_data)
+    return retrieved_data
+
+async def verify_semantic_hit(user, content: str, index: int, cached: Dict[str, Any]) -> None:
+    """Re-run retrieval for a sampled semantic hit and count it as false if the rows differ."""
+    try:
+        async with async_session_scope() as verify_db:
+            fresh = await MovieRecommendationAgent(verify_db, user).retrieve_data(content)
+        if result_overlap(cached, fresh) < settings.SEMANTIC_CACHE_MIN_OVERLAP:
+            semantic_retrieval_cache.record_false_hit(index)
+            logger.warning(f"Semantic cache false hit for {content!r}")
+        else:
+            semantic_retrieval_cache.record_verified()
+    except Exception as e:
+        logger.warning(f"Semantic cache verification failed: {str(e)}")
+
+@observe()
+async def retrieve_context(agent: MovieRecommendationAgent, content: str, retrieved_data: Optional[Dict[str, Any]] = None) -> AsyncGenerator[Dict[str, str], None]:
     context = {"recommendation": ""}
-    async for token in agent.get_recommendation(content):
+    async for token in agent.get_recommendation(content, retrieved_data):
         context["recommendation"] += token
         yield {"type": "agent_thought", "content": token}
     yield {"type": "context", "content": context}
@@ -72,9 +139,35 @@ async def retrieve_context(db_session: Session, user: User, content: str) -> Asy
 def create_memory_prompt_step(chat_history, recommendation, content):
     return create_memory_prompt(chat_history, recommendation, content)
 
+def format_reasoning_trace(retrieved_data: Dict[str, Any]) -> str:
+    """Short, LLM-free account of how the rows were retrieved (single-pass mode)."""
+    titles = ", ".join(str(row.get("title")) for row in retrieved_data.get("results", [])[:10])
+    return (
+        f"#### Retrieval\n"
+        f"- Strategy: {retrieved_data.get('retrieval', 'sql')}\n"
+        f"- Query types: {', '.join(retrieved_data.get('query_types', [])) or 'general'}\n"
+        f"- Rows: {len(retrieved_data.get('results', []))}"
+        + (f" ({titles})" if titles else "")
+        + f"\n\n```sql\n{retrieved_data.get('raw_query', '')}\n```\n"
+    )
+
+def build_two_pass_messages(chat_history, recommendation: str, content: str) -> List[Union[SystemMessage, HumanMessage]]:
+    memory_prompt = create_memory_prompt_step(chat_history, recommendation, content)
+    return [
+        SystemMessage(content=get_system_message()),
+        HumanMessage(content=memory_prompt + "\n\n Please respond to the user's query."),
+    ]
+
+def build_single_pass_messages(chat_history, retrieved_data: Dict[str, Any], content: str) -> List[Union[SystemMessage, HumanMessage]]:
+    rows = serialize_rows(retrieved_data.get("results", []), retrieved_data.get("query_types", []))
+    return [
+        SystemMessage(content=get_system_message()),
+        HumanMessage(content=create_single_pass_prompt(chat_history, rows, content)),
+    ]
+
 @observe()
-def store_user_message(db_session: Session, conversation_id: str, content: str):
-    create_message(db_session, conversation_id, "user", content)
+async def store_user_message(db_session: AsyncSession, conversation_id: str, content: str):
+    await create_message(db_session, conversation_id, "user", content)
 
 @observe()
 async def generate_model_response(model: BaseModelInterface, messages: List[Union[SystemMessage, HumanMessage]]) -> AsyncGenerator[Dict[str, str], None]:
@@ -87,11 +180,11 @@ async def generate_model_response(model: BaseModelInterface, messages: List[Unio
         yield {"type": "error", "content": f"An error occurred: {str(e)}"}
 
 @observe()
-def store_assistant_message(db_session: Session, conversation_id: str, content: str):
-    create_message(db_session, conversation_id, "assistant", content)
+async def store_assistant_message(db_session: AsyncSession, conversation_id: str, content: str):
+    await create_message(db_session, conversation_id, "assistant", content)
 
 @observe()
-def update_memory(memory: ConversationBufferMemory, user_message: str, ai_message: str):
+def update_memory(memory: TokenBudgetMemory, user_message: str, ai_message: str):
     memory.chat_memory.add_user_message(user_message)
     memory.chat_memory.add_ai_message(ai_message)
 
@@ -123,63 +216,131 @@ def initialize_langfuse_trace(user_id: str, model_info: Dict[str, str]) -> Dict[
 @observe()
 async def movie_recommendation_pipeline(
     data: Dict,
-    db_session: Session,
-    model: BaseModelInterface,
-    memory: ConversationBufferMemory,
-    user: User,
-    session_id: str
+    db_session: AsyncSession,
+    session: ChatSession,
+    mode: Optional[str] = None
 ) -> AsyncGenerator[Union[str, Dict[str, str]], None]:
     content = data.get('content', '')
+    mode = mode or settings.PIPELINE_MODE
+    user = session.user
+    model = session.model
+    memory = session.memory
     
+    timings = StageTimings()
+    bootstrap_task = None
     try:
         logger.info(f"Starting movie recommendation pipeline for user_id: {user.id}")
-    
-        logger.info(f"Retrieving model configuration for user_id: {user.id}")
-        model_config = get_model_config(db_session, str(user.id))
-        if model_config is None:
-            logger.error(f"No model configuration found for user_id: {user.id}")
-            raise ValueError(f"No model configuration found for user_id: {user.id}")
-        logger.info(f"Model configuration retrieved for user_id: {user.id}, model_config_id: {model_config.id}")
-        
-        logger.info(f"Initializing conversation for user_id: {user.id}")
-        conversation_id = initialize_conversation(db_session, str(user.id))
-        logger.info(f"Conversation initialized for user_id: {user.id}, conversation_id: {conversation_id}")
-        
-        logger.info(f"Retrieving context for user_id: {user.id}")
-        context = {"recommendation": ""}
-        async for context_chunk in retrieve_context(db_session, user, content):
-            if context_chunk["type"] == "context":
-                context = context_chunk["content"]
-            else:
-                yield context_chunk
-        logger.info(f"Context retrieved for user_id: {user.id}")
-        
+
+        # Config, model and agent live on the session; only reload after /configure-model
+        await session.refresh_if_stale(db_session)
+        model = session.model
+        model_config = session.config
+
+        cache_key = None
+        cached = None
+        catalog_version = await get_catalog_version()
+        answer_scope = (
+            f"{model_config.provider}|{model_config.model}|{mode}|{catalog_version}|"
+            f"{session.agent.retrieval_scope(content)}"
+        )
+        if settings.RESPONSE_CACHE_ENABLED and response_cache.is_cacheable(content):
+            cache_key = response_cache.make_key(
+                content, model_config.provider, model_config.model, mode, catalog_version
+            )
+            cached = await response_cache.get(cache_key)
+        if cached is None and settings.SEMANTIC_CACHE_ANSWERS and semantic_answer_cache.is_cacheable(content):
+            hit = semantic_answer_cache.lookup(content, answer_scope)
+            cached = hit[1] if hit else None
+        if cached:
+            # Replay the stored answer; only the conversation writes still hit the database
+            bootstrap_task = asyncio.create_task(
+                timings.run("bootstrap", bootstrap_conversation(db_session, session, content))
+            )
+            if cached["recommendation"] and (mode != "single_pass" or settings.PIPELINE_REASONING_TRACE):
+                async for event in replay(cached["recommendation"], "agent_thought"):
+                    timings.mark("first_agent_token")
+                    yield event
+            async for event in replay(cached["response"], "final_response"):
+                timings.mark("first_response_token")
+                yield event
+            conversation_id = await bootstrap_task
+            await store_assistant_message(db_session, str(conversation_id), cached["response"])
+            update_memory(memory, content, cached["response"])
+            timings.mark("total")
+            logger.info(f"Response cache hit for user_id: {user.id}, stage timings (ms): {timings.stages}")
+            yield {"type": "end", "content": "# Pipeline completed\nMovie recommendation process finished."}
+            return
+
+        # Independent stages run concurrently:
+        #   bootstrap: conversation lookup/create -> user message insert   (db_session)
+        #   retrieval: agent SQL / vector retrieval                         (own session)
+        # The agent's LLM stream only needs retrieval; storing the assistant message
+        # needs the bootstrap result.
+        bootstrap_task = asyncio.create_task(
+            timings.run("bootstrap", bootstrap_conversation(db_session, session, content))
+        )
+        retrieved_data = await timings.run("retrieval", retrieve_movie_data(session.agent, content, catalog_version))
+        session.agent.bind(db_session)
+
         chat_history = memory.chat_memory.messages
-        recommendation = context["recommendation"]
-        
-        logger.info(f"Creating memory prompt for user_id: {user.id}")
-        memory_prompt = create_memory_prompt_step(chat_history, recommendation, content)
-        
-        logger.info(f"Storing user message for user_id: {user.id}, conversation_id: {conversation_id}")
-        store_user_message(db_session, str(conversation_id), content)
-        
-        system_message = SystemMessage(content=get_system_message())
-        user_message = HumanMessage(content=memory_prompt + "\n\n Please respond to the user's query.")
-        messages = [system_message, user_message]
+        if mode == "single_pass":
+            # One generation answers straight from the retrieved rows; the agent's
+            # reasoning stream is replaced by an optional, LLM-free retrieval trace
+            recommendation = format_reasoning_trace(retrieved_data)
+            if settings.PIPELINE_REASONING_TRACE:
+                yield {"type": "agent_thought", "content": recommendation}
+            messages = build_single_pass_messages(chat_history, retrieved_data, content)
+        else:
+            logger.info(f"Retrieving context for user_id: {user.id}")
+            context = {"recommendation": ""}
+            agent_start = time.perf_counter()
+            async for context_chunk in retrieve_context(session.agent, content, retrieved_data):
+                if context_chunk["type"] == "context":
+                    context = context_chunk["content"]
+                else:
+                    timings.mark("first_agent_token")
+                    yield context_chunk
+            timings.stages["agent_stream"] = round((time.perf_counter() - agent_start) * 1000, 1)
+            logger.info(f"Context retrieved for user_id: {user.id}")
+
+            recommendation = context["recommendation"]
+            logger.info(f"Creating memory prompt for user_id: {user.id}")
+            messages = build_two_pass_messages(chat_history, recommendation, content)
         
         logger.info(f"Generating model response for user_id: {user.id}")
         complete_response = ""
+        response_failed = False
+        response_start = time.perf_counter()
         async for result in generate_model_response(model, messages):
+            timings.mark("first_response_token")
             complete_response += result.get("content", "")
+            response_failed = response_failed or result.get("type") == "error"
             yield result
-        
+        timings.stages["response_stream"] = round((time.perf_counter() - response_start) * 1000, 1)
+
+        # Personalized (collaborative) answers and failed generations are not shared
+        if (
+            cache_key
+            and complete_response
+            and not response_failed
+            and not complete_response.startswith("Error:")
+            and "collaborative" not in retrieved_data.get("retrieval", "")
+        ):
+            await response_cache.put(cache_key, recommendation, complete_response)
+            if settings.SEMANTIC_CACHE_ANSWERS and semantic_answer_cache.is_cacheable(content):
+                semantic_answer_cache.store(
+                    content, answer_scope, {"recommendation": recommendation, "response": complete_response}
+                )
+
+        conversation_id = await bootstrap_task
         logger.info(f"Storing assistant message for user_id: {user.id}, conversation_id: {conversation_id}")
-        store_assistant_message(db_session, str(conversation_id), complete_response)
+        await timings.run("store_assistant", store_assistant_message(db_session, str(conversation_id), complete_response))
         
         logger.info(f"Updating memory for user_id: {user.id}")
         update_memory(memory, content, complete_response)
-        
-        logger.info(f"Movie recommendation pipeline completed successfully for user_id: {user.id}")
+
+        timings.mark("total")
+        logger.info(f"Movie recommendation pipeline ({mode}) completed successfully for user_id: {user.id}, stage timings (ms): {timings.stages}")
         
         yield {"type": "end", "content": "# Pipeline completed\nMovie recommendation process finished."}
 
@@ -190,7 +351,15 @@ async def movie_recommendation_pipeline(
             "db_session": db_session,
             "model_config_id": model_config.id if model_config else None,
             "model_name": model.model_name,
-            "conversation_id": conversation_id
+            "conversation_id": conversation_id,
+            "retrieval": {
+                "strategy": retrieved_data.get("retrieval"),
+                "query_types": retrieved_data.get("query_types", []),
+                "rows": len(retrieved_data.get("results", [])),
+                "titles": [row.get("title") for row in retrieved_data.get("results", [])],
+                "genres": [row.get("genres") for row in retrieved_data.get("results", [])],
+            },
+            "stage_timings_ms": timings.stages
         }
         yield {
             "type": "evaluation_data",
@@ -203,7 +372,9 @@ async def movie_recommendation_pipeline(
                     output={
                         "status": "success",
                         "message": "Movie recommendation pipeline completed successfully",
-                        "recommendation": recommendation
+                        "recommendation": recommendation,
+                        "pipeline_mode": mode,
+                        "stage_timings_ms": timings.stages
                     }
                 )
             except Exception as e:
@@ -224,6 +395,10 @@ async def movie_recommendation_pipeline(
                 )
             except Exception as e:
                 logger.warning(f"Failed to update Langfuse context with error: {str(e)}")
+    finally:
+        # Never leave the bootstrap stage running on db_session once the caller's unit of work ends
+        if bootstrap_task is not None and not bootstrap_task.done():
+            await asyncio.gather(bootstrap_task, return_exceptions=True)
 
 @observe()
 async def evaluation_pipeline(pipeline_result: Dict):
@@ -268,7 +443,7 @@ async def evaluation_pipeline(pipeline_result: Dict):
             
             # Store the evaluation result in the database
             metrics = result["content"].get("metrics", {}) if isinstance(result["content"], dict) else {}
-            store_model_evaluation(
+            await store_model_evaluation(
                 evaluation_data.get("db_session"),
                 evaluation_data.get("model_config_id"),
                 evaluation_data.get("model_name"),
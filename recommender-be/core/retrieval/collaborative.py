@@ -0,0 +1,199 @@
+"""
+Item-item collaborative filtering over UserViewingHistory.
+
+Co-occurrence counts come from a sparse user x movie matrix (C = X^T X) and are
+turned into cosine similarities, of which only the top-N neighbours per movie are
+kept. Scoring a user is then a weighted bincount over the neighbour lists of the
+movies they watched, which stays well under a millisecond for a 5k-movie catalog.
+
+New viewing events update the co-occurrence counts incrementally; only the rows
+they touch are re-ranked, lazily, the next time they are needed. The increments are
+merged into the CSR matrix once CF_COMPACT_THRESHOLD of them are pending, so the
+overlay that every row lookup has to merge stays small.
+"""
+
+import asyncio
+import logging
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from config.settings import settings
+from models.models import UserViewingHistory
+
+logger = logging.getLogger(__name__)
+
+class ItemItemCF:
+    def __init__(self, neighbours: Optional[int] = None, compact_threshold: Optional[int] = None):
+        self.neighbours = neighbours or settings.CF_NEIGHBOURS
+        self.compact_threshold = compact_threshold or settings.CF_COMPACT_THRESHOLD
+        self.item_ids = np.empty(0, dtype=np.int64)
+        self.item_index: Dict[int, int] = {}
+        self.item_counts = np.empty(0, dtype=np.float32)
+        self.cooccurrence = sp.csr_matrix((0, 0), dtype=np.float32)
+        self.neighbour_ids = np.empty((0, self.neighbours), dtype=np.int32)
+        self.neighbour_scores = np.empty((0, self.neighbours), dtype=np.float32)
+        self.user_items: Dict[str, Set[int]] = {}
+        # Co-occurrence increments not yet merged into the CSR matrix, and rows to re-rank
+        self._delta: Dict[int, Dict[int, float]] = defaultdict(lambda: defaultdict(float))
+        self._delta_size = 0
+        self._dirty: Set[int] = set()
+
+    @property
+    def is_ready(self) -> bool:
+        return len(self.item_ids) > 0
+
+    def fit(self, interactions: Iterable[Tuple[str, int]]) -> "ItemItemCF":
+        """Build the model from (user_id, movie_id) pairs."""
+        user_index: Dict[str, int] = {}
+        item_index: Dict[int, int] = {}
+        rows, cols = [], []
+        for user_id, movie_id in interactions:
+            rows.append(user_index.setdefault(str(user_id), len(user_index)))
+            cols.append(item_index.setdefault(int(movie_id), len(item_index)))
+
+        n_users, n_items = len(user_index), len(item_index)
+        matrix = sp.csr_matrix(
+            (np.ones(len(rows), dtype=np.float32), (rows, cols)), shape=(n_users, n_items)
+        )
+        matrix.data[:] = 1.0  # Repeat views count once
+
+        self.item_index = item_index
+        self.item_ids = np.fromiter(item_index.keys(), dtype=np.int64, count=n_items)
+        self.item_counts = np.asarray(matrix.sum(axis=0)).ravel().astype(np.float32)
+        cooccurrence = (matrix.T @ matrix).tocsr()
+        cooccurrence = (cooccurrence - sp.diags(cooccurrence.diagonal())).tocsr()
+        cooccurrence.eliminate_zeros()
+        self.cooccurrence = cooccurrence
+
+        self.user_items = {
+            user_id: set(matrix.indices[matrix.indptr[u]:matrix.indptr[u + 1]].tolist())
+            for user_id, u in user_index.items()
+        }
+
+        self.neighbour_ids = np.full((n_items, self.neighbours), -1, dtype=np.int32)
+        self.neighbour_scores = np.zeros((n_items, self.neighbours), dtype=np.float32)
+        for item in range(n_items):
+            self._rank_row(item)
+        self._delta.clear()
+        self._delta_size = 0
+        self._dirty.clear()
+        logger.info(f"Fitted item-item CF on {len(rows)} interactions ({n_users} users, {n_items} movies)")
+        return self
+
+    def _row(self, item: int) -> Tuple[np.ndarray, np.ndarray]:
+        if item < self.cooccurrence.shape[0]:
+            start, end = self.cooccurrence.indptr[item], self.cooccurrence.indptr[item + 1]
+            cols = self.cooccurrence.indices[start:end]
+            counts = self.cooccurrence.data[start:end]
+        else:
+            cols = np.empty(0, dtype=np.int32)
+            counts = np.empty(0, dtype=np.float32)
+        delta = self._delta.get(item)
+        if delta:
+            merged = dict(zip(cols.tolist(), counts.tolist()))
+            for col, count in delta.items():
+                merged[col] = merged.get(col, 0.0) + count
+            cols = np.fromiter(merged.keys(), dtype=np.int32, count=len(merged))
+            counts = np.fromiter(merged.values(), dtype=np.float32, count=len(merged))
+        return cols, counts
+
+    def _rank_row(self, item: int) -> None:
+        cols, counts = self._row(item)
+        self.neighbour_ids[item] = -1
+        self.neighbour_scores[item] = 0.0
+        if not len(cols):
+            return
+        scores = counts / np.sqrt(self.item_counts[item] * self.item_counts[cols])
+        top = min(self.neighbours, len(cols))
+        best = np.argpartition(-scores, top - 1)[:top]
+        best = best[np.argsort(-scores[best])]
+        self.neighbour_ids[item, :top] = cols[best]
+        self.neighbour_scores[item, :top] = scores[best]
+
+    def _ensure_item(self, movie_id: int) -> int:
+        item = self.item_index.get(movie_id)
+        if item is None:
+            item = len(self.item_ids)
+            self.item_index[movie_id] = item
+            self.item_ids = np.append(self.item_ids, movie_id)
+            self.item_counts = np.append(self.item_counts, np.float32(0))
+            self.neighbour_ids = np.vstack([self.neighbour_ids, np.full((1, self.neighbours), -1, dtype=np.int32)])
+            self.neighbour_scores = np.vstack([self.neighbour_scores, np.zeros((1, self.neighbours), dtype=np.float32)])
+        return item
+
+    def add_interaction(self, user_id: str, movie_id: int) -> None:
+        """Fold a new viewing event into the counts; affected rows are re-ranked lazily."""
+        item = self._ensure_item(int(movie_id))
+        seen = self.user_items.setdefault(str(user_id), set())
+        if item in seen:
+            return
+        self.item_counts[item] += 1
+        for other in seen:
+            self._delta[item][other] += 1.0
+            self._delta[other][item] += 1.0
+            self._dirty.add(other)
+        self._delta_size += 2 * len(seen)
+        self._dirty.add(item)
+        seen.add(item)
+        if self._delta_size >= self.compact_threshold:
+            self.compact()
+
+    def compact(self) -> None:
+        """Merge pending increments into the CSR matrix; add_interaction calls it past the threshold."""
+        if not self._delta:
+            return
+        n_items = len(self.item_ids)
+        rows, cols, counts = [], [], []
+        for item, deltas in self._delta.items():
+            for other, count in deltas.items():
+                rows.append(item)
+                cols.append(other)
+                counts.append(count)
+        delta = sp.csr_matrix((counts, (rows, cols)), shape=(n_items, n_items), dtype=np.float32)
+        base = self.cooccurrence
+        if base.shape != (n_items, n_items):
+            base = sp.csr_matrix((base.data, base.indices, base.indptr), shape=(base.shape[0], n_items))
+            base = sp.vstack([base, sp.csr_matrix((n_items - base.shape[0], n_items), dtype=np.float32)]).tocsr()
+        self.cooccurrence = (base + delta).tocsr()
+        self._delta.clear()
+        self._delta_size = 0
+
+    def recommend(self, user_id: str, k: int = 20) -> List[Tuple[int, float]]:
+        """Top-k (movie_id, score) pairs the user has not seen yet."""
+        seen = self.user_items.get(str(user_id))
+        if not seen:
+            return []
+        items = np.fromiter(seen, dtype=np.int32, count=len(seen))
+        stale = self._dirty.intersection(seen)
+        for item in stale:
+            self._rank_row(item)
+        self._dirty.difference_update(stale)
+
+        neighbour_ids = self.neighbour_ids[items].ravel()
+        neighbour_scores = self.neighbour_scores[items].ravel()
+        valid = neighbour_ids >= 0
+        scores = np.bincount(neighbour_ids[valid], weights=neighbour_scores[valid], minlength=len(self.item_ids))
+        scores[items] = 0.0
+        candidates = np.flatnonzero(scores)
+        if not len(candidates):
+            return []
+        top = min(k, len(candidates))
+        best = candidates[np.argpartition(-scores[candidates], top - 1)[:top]]
+        best = best[np.argsort(-scores[best])]
+        return [(int(self.item_ids[item]), float(scores[item])) for item in best]
+
+    async def load_from_db(self, db: AsyncSession) -> None:
+        result = await db.execute(select(UserViewingHistory.user_id, UserViewingHistory.movie_id))
+        interactions = [(str(user_id), movie_id) for user_id, movie_id in result.all()]
+        if interactions:
+            await asyncio.to_thread(self.fit, interactions)
+        else:
+            logger.info("No viewing history yet; collaborative filtering disabled until events arrive")
+
+# Process-wide model used by MovieRecommendationAgent and update_user_viewing_history
+collaborative_model = ItemItemCF()
@@ -0,0 +1,175 @@
+"""
+Precomputed content-based movie similarity.
+
+Genres, keywords, top-billed cast and key crew are vectorized (TF-IDF over the
+name tokens of each field, weighted per field), and the top-K cosine neighbours
+of every movie are written to a compact .npz artifact. Answering "movies like
+Inception" is then a title lookup plus one row of that table.
+"""
+
+import json
+import logging
+import os
+import threading
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+# Relative weight of each field in the combined vector
+FIELD_WEIGHTS = {
+    "genres": 1.0,
+    "keywords": 1.5,
+    "cast": 0.8,
+    "crew": 1.0,
+}
+
+CREW_JOBS = {"Director", "Screenplay", "Writer", "Original Music Composer", "Director of Photography"}
+
+def _parse(value: Any) -> List[Dict[str, Any]]:
+    if isinstance(value, str):
+        try:
+            value = json.loads(value) if value else []
+        except ValueError:
+            return []
+    return value if isinstance(value, list) else []
+
+def movie_tokens(movie: Dict[str, Any]) -> Dict[str, List[str]]:
+    """Name tokens per field; crew names are prefixed with their job so roles don't mix."""
+    cast = sorted(_parse(movie.get("cast")), key=lambda member: member.get("order", 0))[:5]
+    return {
+        "genres": [item["name"].lower() for item in _parse(movie.get("genres_data")) if item.get("name")],
+        "keywords": [item["name"].lower() for item in _parse(movie.get("keywords")) if item.get("name")],
+        "cast": [member["name"].lower() for member in cast if member.get("name")],
+        "crew": [
+            f"{member['job'].lower()}:{member['name'].lower()}"
+            for member in _parse(movie.get("crew"))
+            if member.get("job") in CREW_JOBS and member.get("name")
+        ],
+    }
+
+def _identity(tokens: List[str]) -> List[str]:
+    return tokens
+
+def vectorize(movies: List[Dict[str, Any]]) -> sp.csr_matrix:
+    tokens = [movie_tokens(movie) for movie in movies]
+    blocks = []
+    for field, weight in FIELD_WEIGHTS.items():
+        vectorizer = TfidfVectorizer(analyzer=_identity, sublinear_tf=True)
+        field_tokens = [fields[field] for fields in tokens]
+        if not any(field_tokens):
+            continue
+        blocks.append(vectorizer.fit_transform(field_tokens) * weight)
+    return normalize(sp.hstack(blocks).tocsr())
+
+def top_k_neighbours(matrix: sp.csr_matrix, k: int, chunk_size: int = 1024) -> Tuple[np.ndarray, np.ndarray]:
+    """Row-wise top-k cosine neighbours (excluding self), computed in chunks to bound memory."""
+    count = matrix.shape[0]
+    k = min(k, count - 1)
+    neighbours = np.empty((count, k), dtype=np.int32)
+    scores = np.empty((count, k), dtype=np.float32)
+    transposed = matrix.T.tocsc()
+    for start in range(0, count, chunk_size):
+        end = min(start + chunk_size, count)
+        similarity = (matrix[start:end] @ transposed).toarray()
+        similarity[np.arange(end - start), np.arange(start, end)] = -1.0
+        best = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+        best_scores = np.take_along_axis(similarity, best, axis=1)
+        order = np.argsort(-best_scores, axis=1)
+        neighbours[start:end] = np.take_along_axis(best, order, axis=1)
+        scores[start:end] = np.take_along_axis(best_scores, order, axis=1)
+    return neighbours, scores
+
+class ContentSimilarity:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.CONTENT_SIMILARITY_PATH
+        self.movie_ids = np.empty(0, dtype=np.int64)
+        self.titles = np.empty(0, dtype=str)
+        self.neighbours = np.empty((0, 0), dtype=np.int32)
+        self.scores = np.empty((0, 0), dtype=np.float32)
+        self._row_by_id: Dict[int, int] = {}
+        self._row_by_title: Dict[str, int] = {}
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+    @property
+    def is_ready(self) -> bool:
+        return len(self.movie_ids) > 0
+
+    def build(self, movies: List[Dict[str, Any]], k: Optional[int] = None) -> "ContentSimilarity":
+        matrix = vectorize(movies)
+        neighbours, scores = top_k_neighbours(matrix, k or settings.CONTENT_SIMILARITY_TOP_K)
+        self._set(
+            np.array([movie["id"] for movie in movies], dtype=np.int64),
+            np.array([(movie.get("title") or "").lower() for movie in movies], dtype=str),
+            neighbours,
+            scores,
+        )
+        logger.info(f"Built content similarity for {len(movies)} movies over {matrix.shape[1]} features")
+        return self
+
+    def _set(self, movie_ids, titles, neighbours, scores) -> None:
+        self.movie_ids, self.titles, self.neighbours, self.scores = movie_ids, titles, neighbours, scores
+        self._row_by_id = {int(movie_id): row for row, movie_id in enumerate(movie_ids)}
+        self._row_by_title = {}
+        for row, title in enumerate(titles):
+            # Titles are not unique; keep the first (the loader orders by popularity)
+            self._row_by_title.setdefault(str(title), row)
+
+    def save(self) -> None:
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.tmp-{os.getpid()}.npz"
+        np.savez_compressed(
+            tmp_path,
+            movie_ids=self.movie_ids,
+            titles=self.titles,
+            neighbours=self.neighbours,
+            scores=self.scores.astype(np.float16),
+        )
+        os.replace(tmp_path, self.path)
+
+    def load_if_changed(self) -> bool:
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+        with self._lock:
+            with np.load(self.path) as artifact:
+                self._set(
+                    artifact["movie_ids"],
+                    artifact["titles"],
+                    artifact["neighbours"],
+                    artifact["scores"].astype(np.float32),
+                )
+            self._mtime = mtime
+        logger.info(f"Loaded content similarity artifact {self.path} ({len(self.movie_ids)} movies)")
+        return True
+
+    def find_movie_id(self, title: str) -> Optional[int]:
+        # Try the full phrase first, then drop trailing words ("Inception please" -> "Inception")
+        words = title.lower().split()
+        for n in range(len(words), 0, -1):
+            row = self._row_by_title.get(" ".join(words[:n]))
+            if row is not None:
+                return int(self.movie_ids[row])
+        return None
+
+    def similar(self, movie_id: int, k: int) -> List[Tuple[int, float]]:
+        row = self._row_by_id.get(int(movie_id))
+        if row is None:
+            return []
+        return [
+            (int(self.movie_ids[neighbour]), float(score))
+            for neighbour, score in zip(self.neighbours[row, :k], self.scores[row, :k])
+        ]
+
+# Process-wide artifact used by MovieRecommendationAgent
+content_similarity = ContentSimilarity()
@@ -0,0 +1,145 @@
+"""
+Local text embedders for movie documents and user questions.
+
+Everything here runs in-process with scikit-learn, so embeddings can be built and
+queried without network access. Additional embedders can be plugged in with
+register_embedder and selected through settings.EMBEDDER.
+"""
+
+import json
+import logging
+import os
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+from sklearn.feature_extraction.text import HashingVectorizer, TfidfVectorizer
+from sklearn.decomposition import TruncatedSVD
+from sklearn.preprocessing import normalize
+
+from config.settings import settings
+from models.models import EMBEDDING_DIM
+
+logger = logging.getLogger(__name__)
+
+class BaseEmbedder(ABC):
+    """Maps texts to L2-normalised float32 vectors of a fixed dimension."""
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+
+    @abstractmethod
+    def embed(self, texts: List[str]) -> np.ndarray:
+        pass
+
+    def embed_one(self, text: str) -> np.ndarray:
+        return self.embed([text])[0]
+
+    def fit(self, corpus: List[str]) -> "BaseEmbedder":
+        # Stateless embedders have nothing to learn
+        return self
+
+class HashingEmbedder(BaseEmbedder):
+    """Deterministic feature-hashing embedder; needs no fitting and no stored state."""
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        super().__init__(dim)
+        self.vectorizer = HashingVectorizer(
+            n_features=dim,
+            ngram_range=(1, 2),
+            stop_words='english',
+            alternate_sign=False,
+            norm=None,
+        )
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        matrix = self.vectorizer.transform(texts)
+        # Sublinear term weighting keeps long overviews from dominating
+        matrix.data = 1.0 + np.log(matrix.data)
+        return normalize(matrix).toarray().astype(np.float32)
+
+class TfidfSvdEmbedder(BaseEmbedder):
+    """TF-IDF followed by truncated SVD (LSA); must be fitted on the catalog first."""
+
+    def __init__(self, dim: int = EMBEDDING_DIM, model_path: Optional[str] = None):
+        super().__init__(dim)
+        self.model_path = model_path or settings.EMBEDDER_MODEL_PATH
+        self.vectorizer = None
+        self.svd = None
+
+    def fit(self, corpus: List[str]) -> "TfidfSvdEmbedder":
+        self.vectorizer = TfidfVectorizer(stop_words='english', sublinear_tf=True, min_df=2, ngram_range=(1, 2))
+        matrix = self.vectorizer.fit_transform(corpus)
+        n_components = min(self.dim, matrix.shape[1] - 1)
+        self.svd = TruncatedSVD(n_components=n_components, random_state=42)
+        self.svd.fit(matrix)
+        logger.info(f"Fitted TF-IDF+SVD embedder on {len(corpus)} documents ({n_components} components)")
+        return self
+
+    def save(self) -> None:
+        import joblib
+        os.makedirs(os.path.dirname(self.model_path) or ".", exist_ok=True)
+        joblib.dump({"vectorizer": self.vectorizer, "svd": self.svd}, self.model_path)
+
+    def load(self) -> "TfidfSvdEmbedder":
+        import joblib
+        state = joblib.load(self.model_path)
+        self.vectorizer, self.svd = state["vectorizer"], state["svd"]
+        return self
+
+    def embed(self, texts: List[str]) -> np.ndarray:
+        if self.vectorizer is None:
+            self.load()
+        reduced = self.svd.transform(self.vectorizer.transform(texts))
+        if reduced.shape[1] < self.dim:
+            # Pad small catalogs up to the column dimension
+            reduced = np.pad(reduced, ((0, 0), (0, self.dim - reduced.shape[1])))
+        return normalize(reduced).astype(np.float32)
+
+EMBEDDERS: Dict[str, Callable[[], BaseEmbedder]] = {
+    "hashing": HashingEmbedder,
+    "tfidf_svd": TfidfSvdEmbedder,
+}
+
+def register_embedder(name: str, factory: Callable[[], BaseEmbedder]) -> None:
+    EMBEDDERS[name] = factory
+
+_embedder: Optional[BaseEmbedder] = None
+
+def get_embedder() -> BaseEmbedder:
+    """Process-wide embedder selected by settings.EMBEDDER."""
+    global _embedder
+    if _embedder is None:
+        if settings.EMBEDDER not in EMBEDDERS:
+            raise ValueError(f"Unsupported embedder: {settings.EMBEDDER}")
+        _embedder = EMBEDDERS[settings.EMBEDDER]()
+    return _embedder
+
+def _names(value: Any) -> List[str]:
+    if isinstance(value, str):
+        try:
+            value = json.loads(value) if value else []
+        except ValueError:
+            return []
+    if not isinstance(value, list):
+        return []
+    return [item.get("name", "") for item in value if isinstance(item, dict)]
+
+def movie_document(movie: Dict[str, Any]) -> str:
+    """Text that represents a movie for embedding: title, genres, keywords, tagline and plot."""
+    parts = [
+        movie.get("title") or "",
+        " ".join(_names(movie.get("genres_data"))),
+        " ".join(_names(movie.get("keywords"))),
+        movie.get("tagline") or "",
+        movie.get("overview") or "",
+    ]
+    return ". ".join(part for part in parts if part)
+
+def to_pgvector(vector: Iterable[float]) -> str:
+    """Text literal accepted by the pgvector input function."""
+    return "[" + ",".join(f"{float(x):.6f}" for x in vector) + "]"
+
+def from_pgvector(value: str) -> np.ndarray:
+    """Parse the pgvector text representation ("[0.1,0.2,...]")."""
+    return np.array(value.strip("[]").split(","), dtype=np.float32)
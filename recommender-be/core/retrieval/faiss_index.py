@@ -0,0 +1,149 @@
+"""
+In-process FAISS index over movie embeddings.
+
+The index is built offline (migrate/build_faiss_index.py) and written to a single
+file with an atomic rename. Every uvicorn worker opens that file with
+IO_FLAG_MMAP_IFC, which maps the vectors (and the HNSW graph or IVF lists) instead
+of copying them, so workers share them through the page cache. A background watcher
+swaps in a new index when the file changes; queries keep using the old one until the swap.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from typing import List, Optional, Sequence, Tuple
+
+import faiss
+import numpy as np
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+def build_index(ids: np.ndarray, vectors: np.ndarray, index_type: str = "auto") -> faiss.Index:
+    """
+    Build an inner-product index over L2-normalised vectors (inner product = cosine).
+
+    "auto" picks an exact Flat index for small catalogs, HNSW for larger ones.
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+    ids = np.ascontiguousarray(ids, dtype=np.int64)
+    count, dim = vectors.shape
+
+    if index_type == "auto":
+        index_type = "flat" if count <= settings.FAISS_FLAT_MAX_VECTORS else "hnsw"
+
+    if index_type == "flat":
+        index = faiss.IndexIDMap2(faiss.IndexFlatIP(dim))
+    elif index_type == "hnsw":
+        hnsw = faiss.IndexHNSWFlat(dim, 32, faiss.METRIC_INNER_PRODUCT)
+        hnsw.hnsw.efConstruction = 80
+        index = faiss.IndexIDMap2(hnsw)
+    elif index_type == "ivf":
+        nlist = max(1, int(4 * np.sqrt(count)))
+        quantizer = faiss.IndexFlatIP(dim)
+        index = faiss.IndexIVFFlat(quantizer, dim, nlist, faiss.METRIC_INNER_PRODUCT)
+        index.train(vectors)
+        index.nprobe = min(nlist, 16)
+        # Lets reconstruct() look vectors up by movie id
+        index.set_direct_map_type(faiss.DirectMap.Hashtable)
+    else:
+        raise ValueError(f"Unsupported FAISS index type: {index_type}")
+
+    index.add_with_ids(vectors, ids)
+    logger.info(f"Built FAISS {index_type} index with {count} vectors of dimension {dim}")
+    return index
+
+def write_index(index: faiss.Index, path: str) -> None:
+    """Write to a temporary file and rename it over the old one so readers never see a partial file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp-{os.getpid()}"
+    faiss.write_index(index, tmp_path)
+    os.replace(tmp_path, path)
+
+def read_index(path: str) -> faiss.Index:
+    # IO_FLAG_MMAP alone only maps IVF inverted lists; Flat and HNSW data would still
+    # be copied into every worker. IO_FLAG_MMAP_IFC maps all three index types.
+    try:
+        return faiss.read_index(path, faiss.IO_FLAG_MMAP_IFC)
+    except RuntimeError:
+        # Not every index type supports mmap; fall back to a private in-memory copy
+        logger.info(f"FAISS index at {path} cannot be memory-mapped, reading it into memory")
+        return faiss.read_index(path)
+
+class MovieVectorIndex:
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or settings.FAISS_INDEX_PATH
+        self._index: Optional[faiss.Index] = None
+        self._mtime: Optional[float] = None
+        self._lock = threading.Lock()
+        self._watcher: Optional[asyncio.Task] = None
+
+    @property
+    def is_ready(self) -> bool:
+        return self._index is not None
+
+    def load(self) -> bool:
+        """Load the index if the file changed since the last load. Returns True on swap."""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return False
+        if mtime == self._mtime:
+            return False
+
+        start = time.perf_counter()
+        index = read_index(self.path)
+        if hasattr(index, "hnsw"):
+            index.hnsw.efSearch = settings.HNSW_EF_SEARCH
+        with self._lock:
+            # Swapping the reference is atomic; in-flight searches finish on the old index
+            self._index, self._mtime = index, mtime
+        logger.info(f"Loaded FAISS index {self.path} ({index.ntotal} vectors) in {time.perf_counter() - start:.3f}s")
+        return True
+
+    def search(self, vector: np.ndarray, k: int, exclude_ids: Sequence[int] = ()) -> List[Tuple[int, float]]:
+        index = self._index
+        if index is None:
+            return []
+        query = np.ascontiguousarray(vector, dtype=np.float32).reshape(1, -1)
+        scores, ids = index.search(query, k + len(exclude_ids))
+        excluded = set(exclude_ids)
+        return [
+            (int(movie_id), float(score))
+            for movie_id, score in zip(ids[0], scores[0])
+            if movie_id != -1 and movie_id not in excluded
+        ][:k]
+
+    def reconstruct(self, movie_id: int) -> Optional[np.ndarray]:
+        index = self._index
+        if index is None:
+            return None
+        try:
+            return index.reconstruct(int(movie_id))
+        except RuntimeError:
+            return None
+
+    async def _watch(self, interval: float) -> None:
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                await asyncio.to_thread(self.load)
+            except Exception as e:
+                logger.error(f"Error reloading FAISS index: {str(e)}", exc_info=True)
+
+    async def start(self) -> None:
+        """Initial load plus a background task that picks up rebuilt index files."""
+        await asyncio.to_thread(self.load)
+        if self._watcher is None:
+            self._watcher = asyncio.create_task(self._watch(settings.FAISS_RELOAD_INTERVAL))
+
+    async def stop(self) -> None:
+        if self._watcher is not None:
+            self._watcher.cancel()
+            self._watcher = None
+
+# Process-wide index used by MovieRecommendationAgent
+movie_index = MovieVectorIndex()
@@ -0,0 +1,18 @@
+from typing import Any, Dict, List
+
+def reciprocal_rank_fusion(result_lists: List[List[Dict[str, Any]]], limit: int, k: int = 60, key: str = "id") -> List[Dict[str, Any]]:
+    """
+    Merge ranked row lists from several retrieval strategies.
+
+    Each row scores sum(1 / (k + rank)) over the lists it appears in, so rows found
+    by more than one strategy rise to the top. The first occurrence of a row wins.
+    """
+    scores: Dict[Any, float] = {}
+    rows: Dict[Any, Dict[str, Any]] = {}
+    for results in result_lists:
+        for rank, row in enumerate(results, start=1):
+            row_key = row.get(key)
+            scores[row_key] = scores.get(row_key, 0.0) + 1.0 / (k + rank)
+            rows.setdefault(row_key, row)
+    ranked = sorted(scores, key=scores.get, reverse=True)
+    return [rows[row_key] for row_key in ranked[:limit]]
@@ -0,0 +1,97 @@
+"""
+Per-connection chat state.
+
+A ChatSession is created once when a WebSocket is accepted and holds everything that
+used to be rebuilt on every message: the user, their model config, the model client,
+the token-bounded conversation memory, the recommendation agent and the open
+conversation id.
+`/configure-model` marks a user's live sessions stale through `session_registry`, and
+the next message reloads the config before it runs.
+"""
+
+import logging
+from typing import Dict, Optional, Set
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.models import User, ModelConfig
+from core.model_interface import BaseModelInterface, ModelFactory
+from core.agent.agent import MovieRecommendationAgent
+from core.memory import TokenBudgetMemory
+from config.settings import settings
+from core.utils.helpers import get_model_config
+
+logger = logging.getLogger(__name__)
+
+class ChatSession:
+    def __init__(self, session_id: str, user: User, config: ModelConfig):
+        self.session_id = session_id
+        self.user = user
+        self.memory = TokenBudgetMemory()
+        self.agent = MovieRecommendationAgent(None, user)
+        self.conversation_id = None
+        self.stale = False
+        self.config: Optional[ModelConfig] = None
+        self.model: Optional[BaseModelInterface] = None
+        self.apply_config(config)
+
+    def apply_config(self, config: ModelConfig) -> None:
+        self.model = ModelFactory.create_model(config.provider, config.model, config.api_key)
+        self.config = config
+        self.agent.set_config(config, self.model)
+        if settings.MEMORY_SUMMARIZE:
+            self.memory.summarizer = self.model
+        # Conversations belong to a model config, so a new config opens a new one
+        self.conversation_id = None
+        self.stale = False
+        logger.info(f"Session {self.session_id} using {config.provider} - {config.model}")
+
+    async def refresh_if_stale(self, db: AsyncSession) -> None:
+        if not self.stale:
+            return
+        config = await get_model_config(db, str(self.user.id))
+        if config is None:
+            raise ValueError(f"No model configuration found for user_id: {self.user.id}")
+        self.apply_config(config)
+
+class SessionRegistry:
+    """Live chat sessions of this process, by user id."""
+
+    def __init__(self):
+        self._sessions: Dict[str, Set[ChatSession]] = {}
+
+    def register(self, session: ChatSession) -> None:
+        self._sessions.setdefault(str(session.user.id), set()).add(session)
+
+    def unregister(self, session: ChatSession) -> None:
+        session.memory.close()
+        sessions = self._sessions.get(str(session.user.id))
+        if sessions is not None:
+            sessions.discard(session)
+            if not sessions:
+                del self._sessions[str(session.user.id)]
+
+    def invalidate_user(self, user_id: str) -> int:
+        sessions = self._sessions.get(str(user_id), set())
+        for session in sessions:
+            session.stale = True
+        return len(sessions)
+
+    def stats(self) -> dict:
+        sessions = [session for user_sessions in self._sessions.values() for session in user_sessions]
+        per_session = {
+            session.session_id: {
+                "memory_bytes": session.memory.memory_bytes(),
+                "memory_tokens": session.memory.token_count,
+                "messages": len(session.memory.messages),
+            }
+            for session in sessions
+        }
+        return {
+            "sessions": len(sessions),
+            "memory_bytes": sum(item["memory_bytes"] for item in per_session.values()),
+            "per_session": per_session,
+        }
+
+    def __len__(self) -> int:
+        return sum(len(sessions) for sessions in self._sessions.values())
+
+session_registry = SessionRegistry()
@@ -0,0 +1,142 @@
+"""
+Coalescing, backpressured frame sender for chat WebSockets.
+
+The pipeline yields one frame per provider token. FrameSender merges consecutive
+agent_thought / final_response frames of the same message into one text frame per
+window (WEBSOCKET_COALESCE_WINDOW_MS or WEBSOCKET_COALESCE_MAX_BYTES, whichever comes
+first). The UI appends content per message and type, so merged frames render
+identically. Other frame types (error, end, evaluation) are sent as-is, in order.
+
+Frames go through a bounded queue drained by one writer task: when the client reads
+slower than the model writes, the queue fills and `send` blocks the producer instead
+of buffering the whole answer in memory. A send that stalls longer than
+WEBSOCKET_SEND_TIMEOUT closes the sender.
+"""
+
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import orjson
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+STREAM_TYPES = {"agent_thought", "final_response"}
+
+_CLOSE = object()
+
+def encode_frame(frame: Dict[str, Any]) -> str:
+    return orjson.dumps(frame).decode()
+
+class FrameSender:
+    def __init__(
+        self,
+        send_text: Callable[[str], Awaitable[None]],
+        window_ms: Optional[float] = None,
+        max_bytes: Optional[int] = None,
+        queue_size: Optional[int] = None,
+        send_timeout: Optional[float] = None,
+    ):
+        self._send_text = send_text
+        self.window = (window_ms if window_ms is not None else settings.WEBSOCKET_COALESCE_WINDOW_MS) / 1000
+        self.max_bytes = max_bytes or settings.WEBSOCKET_COALESCE_MAX_BYTES
+        self.send_timeout = send_timeout or settings.WEBSOCKET_SEND_TIMEOUT
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size or settings.WEBSOCKET_SEND_QUEUE_SIZE)
+        self._writer: Optional[asyncio.Task] = None
+        self._full = asyncio.Event()
+        self._queued_bytes = 0  # Streamed content waiting in the queue
+        self.closed = False
+        self.frames_in = 0
+        self.frames_out = 0
+
+    def start(self) -> "FrameSender":
+        self._writer = asyncio.create_task(self._run())
+        return self
+
+    async def send(self, frame: Dict[str, Any]) -> bool:
+        """Queue a frame; waits while the queue is full. False once the socket is gone."""
+        if self.closed:
+            return False
+        self.frames_in += 1
+        await self._queue.put(frame)
+        if frame.get("type") in STREAM_TYPES:
+            self._queued_bytes += len(frame.get("content", ""))
+            if self._queued_bytes >= self.max_bytes:
+                self._full.set()
+        return not self.closed
+
+    async def aclose(self) -> None:
+        """Flush what is queued, then stop the writer."""
+        if self._writer is None:
+            return
+        if not self.closed:
+            try:
+                await asyncio.wait_for(self._queue.put(_CLOSE), self.send_timeout)
+                await asyncio.wait_for(self._writer, self.send_timeout)
+            except asyncio.TimeoutError:
+                logger.warning("Timed out flushing WebSocket frames")
+        self.closed = True
+        if not self._writer.done():
+            self._writer.cancel()
+        self._writer = None
+
+    def _mergeable(self, first: Dict[str, Any], second: Any) -> bool:
+        return (
+            isinstance(second, dict)
+            and second.get("type") == first.get("type")
+            and second.get("message_id") == first.get("message_id")
+        )
+
+    async def _coalesce(self, frame: Dict[str, Any]):
+        """(merged frame, next unmergeable item or None)."""
+        # One wake-up per frame: at the end of the window, or earlier once
+        # send() has queued max_bytes of content
+        if self._queued_bytes < self.max_bytes:
+            self._full.clear()
+            try:
+                await asyncio.wait_for(self._full.wait(), self.window)
+            except asyncio.TimeoutError:
+                pass
+        parts = [frame.get("content", "")]
+        size = len(parts[0])
+        carry = None
+        while size < self.max_bytes and not self._queue.empty():
+            item = self._queue.get_nowait()
+            if not self._mergeable(frame, item):
+                carry = item
+                break
+            content = item.get("content", "")
+            parts.append(content)
+            size += len(content)
+            self._queued_bytes -= len(content)
+        if len(parts) > 1:
+            frame = {**frame, "content": "".join(parts)}
+        return frame, carry
+
+    async def _write(self, frame: Dict[str, Any]) -> None:
+        await asyncio.wait_for(self._send_text(encode_frame(frame)), self.send_timeout)
+        self.frames_out += 1
+
+    async def _run(self) -> None:
+        carry = None
+        try:
+            while True:
+                item = carry if carry is not None else await self._queue.get()
+                carry = None
+                if item is _CLOSE:
+                    return
+                if item.get("type") in STREAM_TYPES:
+                    self._queued_bytes -= len(item.get("content", ""))
+                    if self.window > 0:
+                        item, carry = await self._coalesce(item)
+                await self._write(item)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            # Slow or gone client: stop accepting frames and unblock the producer
+            logger.warning(f"WebSocket sender stopped: {type(e).__name__} {str(e)}")
+            self.closed = True
+            while not self._queue.empty():
+                self._queue.get_nowait()
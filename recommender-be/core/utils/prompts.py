@@ -12,6 +12,21 @@ def create_memory_prompt(chat_history: List[HumanMessage | AIMessage], recommend
     Previous Conversation History: {formatted_history}
     """
 
+def create_single_pass_prompt(chat_history: List[HumanMessage | AIMessage], retrieved_data: str, user_input: str) -> str:
+    recent_history = chat_history[-10:]
+    formatted_history = "\n".join([f"{'User' if isinstance(m, HumanMessage) else 'AI'}: {m.content}" for m in recent_history])
+
+    return f"""
+    Query: {user_input}
+    Retrieved movies (from the catalog database, most relevant first):
+    {retrieved_data if retrieved_data else 'N/A'}
+
+    Previous Conversation History: {formatted_history}
+
+    Answer the query directly from the retrieved movies. Only recommend movies that appear in them;
+    if none fit, say so and suggest how the user could refine the request.
+    """
+
 def get_system_message() -> str:
     return """
      You are an AI movie recommendation assistant with expertise in film and entertainment. Your task is to analyze user queries and generate thoughtful, engaging responses using a flexible structure tailored to each query. Follow these guidelines to create dynamic, content-specific output:
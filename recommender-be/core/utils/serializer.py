@@ -0,0 +1,125 @@
+"""
+Token-budgeted serialization of retrieved movie rows for LLM prompts.
+
+Rows are written as CSV with only the columns the classified query types need,
+overviews are truncated, and rows are appended until the tiktoken count of the
+block would pass the budget, so prompt size no longer grows with "top 50".
+"""
+
+import csv
+import io
+import json
+import logging
+from functools import lru_cache
+from typing import Any, Dict, List, Optional
+
+import tiktoken
+
+from config.settings import settings
+
+logger = logging.getLogger(__name__)
+
+BASE_COLUMNS = ["title", "year", "genres", "director", "vote_average"]
+
+QUERY_TYPE_COLUMNS = {
+    "financial": ["budget", "revenue"],
+    "popularity": ["popularity", "vote_count"],
+    "actor": ["top_actors"],
+    "release_date": ["release_date"],
+    "plot": ["overview"],
+    "theme": ["overview"],
+    "recommendation": ["overview"],
+    "general": ["overview"],
+    "awards": ["keywords"],
+    "franchise": ["keywords"],
+}
+
+# Scores added by the similarity and collaborative strategies
+SCORE_COLUMNS = ["similarity", "cf_score"]
+
+@lru_cache(maxsize=1)
+def get_encoding():
+    try:
+        return tiktoken.get_encoding(settings.PROMPT_TOKEN_ENCODING)
+    except Exception as e:
+        # tiktoken downloads the BPE file on first use; offline hosts fall back to an estimate
+        logger.warning(f"tiktoken encoding {settings.PROMPT_TOKEN_ENCODING} unavailable, estimating tokens: {str(e)}")
+        return None
+
+def count_tokens(text: str) -> int:
+    encoding = get_encoding()
+    if encoding is None:
+        return len(text) // 3 + 1  # Conservative: English prose averages ~4 characters per token
+    return len(encoding.encode(text))
+
+def select_columns(query_types: List[str], rows: List[Dict[str, Any]]) -> List[str]:
+    columns = list(BASE_COLUMNS)
+    for query_type in query_types:
+        for column in QUERY_TYPE_COLUMNS.get(query_type, []):
+            if column not in columns:
+                columns.append(column)
+    columns += [column for column in SCORE_COLUMNS if rows and column in rows[0]]
+    return columns
+
+def _truncate(text: str, max_chars: int) -> str:
+    text = " ".join(text.split())
+    if len(text) <= max_chars:
+        return text
+    return text[:max_chars].rsplit(" ", 1)[0] + "…"
+
+def _keyword_names(value: Any) -> str:
+    try:
+        keywords = json.loads(value) if isinstance(value, str) else value
+        return "; ".join(item["name"] for item in keywords or [] if isinstance(item, dict) and item.get("name"))
+    except (ValueError, TypeError):
+        return str(value)
+
+def _cell(row: Dict[str, Any], column: str, overview_chars: int) -> str:
+    if column == "year":
+        release_date = row.get("release_date")
+        return str(release_date)[:4] if release_date else ""
+    value = row.get(column)
+    if value is None:
+        return ""
+    if column == "overview":
+        return _truncate(str(value), overview_chars)
+    if column == "keywords":
+        return _truncate(_keyword_names(value), overview_chars)
+    if isinstance(value, float):
+        return f"{value:.4g}"
+    return str(value)
+
+def _csv_line(values: List[str]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer, lineterminator="\n").writerow(values)
+    return buffer.getvalue()
+
+def serialize_rows(
+    rows: List[Dict[str, Any]],
+    query_types: List[str],
+    max_tokens: Optional[int] = None,
+    overview_chars: Optional[int] = None,
+) -> str:
+    """CSV block of the rows that fit in max_tokens, most relevant (first) rows kept."""
+    if not rows:
+        return "(no rows)"
+    max_tokens = max_tokens or settings.PROMPT_ROWS_MAX_TOKENS
+    overview_chars = overview_chars or settings.PROMPT_OVERVIEW_CHARS
+
+    columns = select_columns(query_types, rows)
+    header = _csv_line(columns)
+    lines = [header]
+    used = count_tokens(header)
+    # Reserve room for the omission note so the total stays under the ceiling
+    reserve = count_tokens(f"(+{len(rows)} more rows omitted)")
+    for index, row in enumerate(rows):
+        line = _csv_line([_cell(row, column, overview_chars) for column in columns])
+        tokens = count_tokens(line)
+        if used + tokens + reserve > max_tokens:
+            omitted = len(rows) - index
+            lines.append(f"(+{omitted} more rows omitted)")
+            logger.info(f"Serialized {index}/{len(rows)} rows within {max_tokens} tokens")
+            break
+        lines.append(line)
+        used += tokens
+    return "".join(lines).rstrip("\n")
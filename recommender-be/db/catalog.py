@@ -0,0 +1,59 @@
+"""
+Catalog version stamp.
+
+catalog_meta.catalog_version is bumped by every job that changes what retrieval can
+return (data loads, movie_search refreshes, embedding rebuilds). Caches include it in
+their keys, so a bump invalidates them without explicit purges. The table is created
+by alembic (or by migrate_data's create_all on a fresh database).
+"""
+
+import logging
+import time
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from config.settings import settings
+from db.database import AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+CATALOG_VERSION_KEY = "catalog_version"
+
+def bump_catalog_version(conn: Connection) -> int:
+    version = conn.execute(text("""
+        INSERT INTO catalog_meta (key, value, updated_at) VALUES (:key, 1, now())
+        ON CONFLICT (key) DO UPDATE SET value = catalog_meta.value + 1, updated_at = now()
+        RETURNING value
+    """), {"key": CATALOG_VERSION_KEY}).scalar()
+    logger.info(f"Catalog version bumped to {version}")
+    return version
+
+def get_catalog_stamp(conn: Connection, key: str) -> int:
+    """A stamp kept next to catalog_version, e.g. the version an index was last built at."""
+    return conn.execute(text("SELECT value FROM catalog_meta WHERE key = :key"), {"key": key}).scalar() or 0
+
+def set_catalog_stamp(conn: Connection, key: str, value: int) -> None:
+    conn.execute(text("""
+        INSERT INTO catalog_meta (key, value, updated_at) VALUES (:key, :value, now())
+        ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = now()
+    """), {"key": key, "value": value})
+
+# (version, fetched_at) for this process
+_cached_version = (0, 0.0)
+
+async def get_catalog_version() -> int:
+    """Current catalog version, re-read from the database at most every CATALOG_VERSION_TTL seconds."""
+    global _cached_version
+    version, fetched_at = _cached_version
+    if time.monotonic() - fetched_at < settings.CATALOG_VERSION_TTL:
+        return version
+
+    # Own session: a failed lookup (e.g. table not created yet) must not abort the caller's transaction
+    try:
+        async with AsyncSessionLocal() as db:
+            version = (await db.execute(
+                text("SELECT value FROM catalog_meta WHERE key = :key"), {"key": CATALOG_VERSION_KEY}
+            )).scalar() or 0
+    except Exception as e:
+        logger.warning(f"Could not read catalog version, keeping {version}: {str(e)}")
+    _cached_version = (version, time.monotonic())
+    return version
@@ -0,0 +1,196 @@
+"""
+The movie_search materialized view.
+
+movie_search is a denormalized, one-row-per-movie projection of movies, genres,
+actors and directors. MovieRecommendationAgent._build_query reads from it, so
+retrieval is a single-table scan instead of a six-way join with GROUP BY.
+It has to be refreshed after the catalog changes (see migrate/refresh_movie_search.py).
+
+This module also defines the trigger that keeps movies.search_vector (the full-text
+document used by the "fts" retrieval mode) up to date on insert and update. It is
+installed once, by an alembic revision (or by migrate_data on a fresh database),
+never as part of a refresh.
+"""
+
+import logging
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from db.catalog import bump_catalog_version
+
+logger = logging.getLogger(__name__)
+
+MOVIE_SEARCH_VIEW = "movie_search"
+
+# Bump whenever the view definition changes; an outdated view is dropped and rebuilt
+MOVIE_SEARCH_VERSION = 4
+
+# top_actors holds the first N billed cast members, in billing order (TMDB's cast "order")
+MOVIE_SEARCH_TOP_ACTORS = 5
+
+CREATE_SEARCH_VECTOR_FUNCTION = """
+CREATE OR REPLACE FUNCTION movies_search_vector_update() RETURNS trigger AS $$
+DECLARE
+    keyword_json jsonb := NULLIF(NEW.keywords::text, '')::jsonb;
+    keyword_names text := '';
+BEGIN
+    IF jsonb_typeof(keyword_json) = 'array' THEN
+        SELECT COALESCE(string_agg(k->>'name', ' '), '')
+        INTO keyword_names
+        FROM jsonb_array_elements(keyword_json) AS k;
+    END IF;
+
+    NEW.search_vector :=
+        setweight(to_tsvector('english', COALESCE(NEW.title, '')), 'A') ||
+        setweight(to_tsvector('english', COALESCE(NEW.tagline, '')), 'B') ||
+        setweight(to_tsvector('english', keyword_names), 'B') ||
+        setweight(to_tsvector('english', COALESCE(NEW.overview, '')), 'C');
+    RETURN NEW;
+END
+$$ LANGUAGE plpgsql
+"""
+
+CREATE_SEARCH_VECTOR_TRIGGER = [
+    "DROP TRIGGER IF EXISTS movies_search_vector_trigger ON movies",
+    """
+    CREATE TRIGGER movies_search_vector_trigger
+    BEFORE INSERT OR UPDATE OF title, tagline, overview, keywords ON movies
+    FOR EACH ROW EXECUTE FUNCTION movies_search_vector_update()
+    """,
+]
+
+CREATE_MOVIE_SEARCH_VIEW = f"""
+CREATE MATERIALIZED VIEW IF NOT EXISTS {MOVIE_SEARCH_VIEW} AS
+SELECT m.id,
+       m.title,
+       m.overview,
+       m.tagline,
+       m.budget,
+       m.revenue,
+       m.popularity,
+       m.vote_average,
+       m.vote_count,
+       m.runtime,
+       m.original_language,
+       m.release_date,
+       m.release_year,
+       m.keywords,
+       COALESCE(k.keyword_text, '') AS keyword_text,
+       m.search_vector,
+       COALESCE(g.genres, '') AS genres,
+       COALESCE(g.genre_names, ARRAY[]::text[]) AS genre_names,
+       COALESCE(a.top_actors, '') AS top_actors,
+       d.name AS director
+FROM movies m
+LEFT JOIN LATERAL (
+    SELECT string_agg(g.name, ', ' ORDER BY g.name) AS genres,
+           array_agg(LOWER(g.name) ORDER BY g.name) AS genre_names
+    FROM movie_genre mg
+    JOIN genres g ON g.id = mg.genre_id
+    WHERE mg.movie_id = m.id
+) g ON TRUE
+LEFT JOIN LATERAL (
+    SELECT string_agg(c.member->>'name', ', ' ORDER BY c.billing, c.position) AS top_actors
+    FROM (
+        SELECT member,
+               position,
+               CASE WHEN jsonb_typeof(member->'order') = 'number' THEN (member->>'order')::numeric END AS billing
+        FROM jsonb_array_elements(
+            CASE WHEN jsonb_typeof(m."cast") = 'array' THEN m."cast" ELSE '[]'::jsonb END
+        ) WITH ORDINALITY AS c(member, position)
+        WHERE member->>'name' <> ''
+        ORDER BY billing NULLS LAST, position
+        LIMIT {MOVIE_SEARCH_TOP_ACTORS}
+    ) c
+) a ON TRUE
+LEFT JOIN LATERAL (
+    SELECT LOWER(string_agg(k->>'name', ' | ')) AS keyword_text
+    FROM jsonb_array_elements(
+        CASE WHEN jsonb_typeof(m.keywords) = 'array' THEN m.keywords ELSE '[]'::jsonb END
+    ) AS k
+) k ON TRUE
+LEFT JOIN directors d ON d.id = m.director_id
+WITH NO DATA
+"""
+
+# The unique index is required for REFRESH ... CONCURRENTLY
+MOVIE_SEARCH_INDEXES = [
+    f"CREATE UNIQUE INDEX IF NOT EXISTS ix_movie_search_id ON {MOVIE_SEARCH_VIEW} (id)",
+    f"CREATE INDEX IF NOT EXISTS ix_movie_search_popularity ON {MOVIE_SEARCH_VIEW} (popularity DESC)",
+    f"CREATE INDEX IF NOT EXISTS ix_movie_search_vote ON {MOVIE_SEARCH_VIEW} (vote_average DESC, vote_count DESC)",
+    f"CREATE INDEX IF NOT EXISTS ix_movie_search_revenue ON {MOVIE_SEARCH_VIEW} (revenue DESC)",
+    f"CREATE INDEX IF NOT EXISTS ix_movie_search_budget ON {MOVIE_SEARCH_VIEW} (budget)",
+    f"CREATE INDEX IF NOT EXISTS ix_movie_search_runtime ON {MOVIE_SEARCH_VIEW} (runtime)",
+    f"CREATE INDEX IF NOT EXISTS ix_movie_search_release_date ON {MOVIE_SEARCH_VIEW} (release_date)",
+    f"CREATE INDEX IF NOT EXISTS ix_movie_search_release_year ON {MOVIE_SEARCH_VIEW} (release_year)",
+    f"CREATE INDEX IF NOT EXISTS ix_movie_search_genre_names ON {MOVIE_SEARCH_VIEW} USING GIN (genre_names)",
+    f"CREATE INDEX IF NOT EXISTS ix_movie_search_director ON {MOVIE_SEARCH_VIEW} (LOWER(director))",
+    f"CREATE INDEX IF NOT EXISTS ix_movie_search_search_vector ON {MOVIE_SEARCH_VIEW} USING GIN (search_vector)",
+    # Substring matches on keyword names (LIKE '%sequel%') can use a trigram index
+    f"CREATE INDEX IF NOT EXISTS ix_movie_search_keyword_text ON {MOVIE_SEARCH_VIEW} USING GIN (keyword_text gin_trgm_ops)",
+    # The actor and director filters are LIKE '%name%' on the lowercased names
+    f"CREATE INDEX IF NOT EXISTS ix_movie_search_top_actors_trgm ON {MOVIE_SEARCH_VIEW} USING GIN (LOWER(top_actors) gin_trgm_ops)",
+    f"CREATE INDEX IF NOT EXISTS ix_movie_search_director_trgm ON {MOVIE_SEARCH_VIEW} USING GIN (LOWER(director) gin_trgm_ops)",
+]
+
+def ensure_search_vector(conn: Connection, backfill: bool = True) -> None:
+    """Install the search_vector trigger and fill the column for rows loaded before it existed."""
+    conn.execute(text("ALTER TABLE movies ADD COLUMN IF NOT EXISTS search_vector tsvector"))
+    conn.execute(text("CREATE INDEX IF NOT EXISTS ix_movies_search_vector ON movies USING GIN (search_vector)"))
+    conn.execute(text(CREATE_SEARCH_VECTOR_FUNCTION))
+    for statement in CREATE_SEARCH_VECTOR_TRIGGER:
+        conn.execute(text(statement))
+    if backfill:
+        # Touching title fires the BEFORE UPDATE trigger, which computes the vector
+        result = conn.execute(text("UPDATE movies SET title = title WHERE search_vector IS NULL"))
+        if result.rowcount:
+            logger.info(f"Backfilled search_vector for {result.rowcount} movies")
+
+# The view is created in current_schema() (the first schema on the search_path), so it
+# is looked up there too: a scratch schema in front of public must not find public's view
+def get_movie_search_version(conn: Connection) -> int:
+    comment = conn.execute(
+        text("SELECT obj_description(to_regclass(format('%I.%I', current_schema(), :name)), 'pg_class')"),
+        {"name": MOVIE_SEARCH_VIEW}
+    ).scalar()
+    try:
+        return int(comment) if comment else 0
+    except ValueError:
+        return 0
+
+def create_movie_search_view(conn: Connection) -> None:
+    """Create the view and its indexes if they don't exist yet (the view starts empty)."""
+    if get_movie_search_version(conn) != MOVIE_SEARCH_VERSION:
+        # Qualified: unqualified, it would drop the view of a later search_path schema
+        schema = conn.execute(text("SELECT quote_ident(current_schema())")).scalar()
+        conn.execute(text(f"DROP MATERIALIZED VIEW IF EXISTS {schema}.{MOVIE_SEARCH_VIEW}"))
+    conn.execute(text("CREATE EXTENSION IF NOT EXISTS pg_trgm"))
+    conn.execute(text(CREATE_MOVIE_SEARCH_VIEW))
+    conn.execute(text(f"COMMENT ON MATERIALIZED VIEW {MOVIE_SEARCH_VIEW} IS '{MOVIE_SEARCH_VERSION}'"))
+    for statement in MOVIE_SEARCH_INDEXES:
+        conn.execute(text(statement))
+    logger.info(f"Ensured materialized view {MOVIE_SEARCH_VIEW} (version {MOVIE_SEARCH_VERSION})")
+
+def is_movie_search_populated(conn: Connection) -> bool:
+    result = conn.execute(
+        text("SELECT ispopulated FROM pg_matviews WHERE schemaname = current_schema() AND matviewname = :name"),
+        {"name": MOVIE_SEARCH_VIEW}
+    ).scalar()
+    return bool(result)
+
+def refresh_movie_search(conn: Connection, concurrently: bool = True) -> None:
+    """
+    Rebuild movie_search from the base tables.
+
+    CONCURRENTLY keeps the view readable during the refresh, but Postgres only
+    allows it once the view has been populated, so the first refresh is a plain one.
+    The view is only (re)created when it is missing or its version is outdated.
+    """
+    if get_movie_search_version(conn) != MOVIE_SEARCH_VERSION:
+        create_movie_search_view(conn)
+    if concurrently and is_movie_search_populated(conn):
+        conn.execute(text(f"REFRESH MATERIALIZED VIEW CONCURRENTLY {MOVIE_SEARCH_VIEW}"))
+    else:
+        conn.execute(text(f"REFRESH MATERIALIZED VIEW {MOVIE_SEARCH_VIEW}"))
+    logger.info(f"Refreshed materialized view {MOVIE_SEARCH_VIEW}")
+    # Retrieval results may have changed; invalidates version-keyed caches
+    bump_catalog_version(conn)
@@ -2,9 +2,14 @@ import os
 import logging
 from routes.main import create_app
 from config.settings import settings
-import asyncio
 from config.langfuse_config import get_langfuse, get_callback_handler, flush_langfuse
 from config.logging_config import configure_logging
+from core.retrieval.faiss_index import movie_index
+from core.retrieval.collaborative import collaborative_model
+from core.retrieval.content_similarity import content_similarity
+from core.client_registry import client_registry
+from core.evaluation.worker import evaluation_worker
+from db.database import async_engine, AsyncSessionLocal
 
 # Set up logging
 configure_logging()
@@ -45,8 +50,33 @@ async def startup_event():
         else:
             logger.warning("Failed to initialize Langfuse client or callback handler")
 
-        # Perform any async initialization tasks here
-        await asyncio.sleep(0)  # Example of an async operation
+        # Load the FAISS movie index (if built) and watch for rebuilt index files
+        if settings.FAISS_ENABLED:
+            await movie_index.start()
+            logger.info(f"FAISS movie index ready: {movie_index.is_ready}")
+
+        # Load the precomputed content-similarity neighbours (if built)
+        if settings.CONTENT_SIMILARITY_ENABLED:
+            try:
+                content_similarity.load_if_changed()
+                logger.info(f"Content similarity ready: {content_similarity.is_ready}")
+            except Exception as e:
+                logger.error(f"Error loading content similarity: {str(e)}", exc_info=True)
+
+        # Fit the collaborative filtering model from the stored viewing history
+        if settings.CF_ENABLED:
+            try:
+                async with AsyncSessionLocal() as db:
+                    await collaborative_model.load_from_db(db)
+            except Exception as e:
+                logger.error(f"Error loading collaborative filtering model: {str(e)}", exc_info=True)
+
+        # Drain answer evaluations in the background (resumes jobs left by a restart)
+        if settings.EVALUATION_ENABLED:
+            try:
+                await evaluation_worker.start()
+            except Exception as e:
+                logger.error(f"Error starting evaluation worker: {str(e)}", exc_info=True)
 
         logger.info("Application startup complete")
         for route in app.routes:
@@ -68,8 +98,16 @@ async def shutdown_event():
         else:
             logger.warning("No Langfuse client to flush")
 
-        # Perform any async cleanup tasks here
-        await asyncio.sleep(0)  # Example of an async operation
+        await movie_index.stop()
+
+        await evaluation_worker.stop()
+
+        # Close the shared LLM provider connection pool
+        await client_registry.aclose()
+
+        # Release pooled asyncpg connections
+        await async_engine.dispose()
+        logger.info("Async database engine disposed")
 
         logger.info("Application shutdown complete")
 
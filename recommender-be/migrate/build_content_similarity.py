@@ -0,0 +1,37 @@
+import argparse
+import time
+from sqlalchemy import create_engine, text
+from config.settings import settings
+from core.retrieval.content_similarity import ContentSimilarity
+
+# Engine for the offline job
+engine = create_engine(settings.DATABASE_URL)
+
+def load_movies():
+    # Most popular first so duplicate titles resolve to the movie people mean
+    with engine.connect() as conn:
+        return [
+            row._asdict() for row in conn.execute(text(
+                "SELECT id, title, genres_data, keywords, \"cast\", crew FROM movies "
+                "ORDER BY popularity DESC NULLS LAST, id"
+            ))
+        ]
+
+def build_content_similarity(top_k: int, path: str):
+    movies = load_movies()
+    if len(movies) < 2:
+        print("Not enough movies to build content similarity; run python -m migrate.migrate_data first")
+        return
+    start = time.perf_counter()
+    model = ContentSimilarity(path).build(movies, k=top_k)
+    # Running workers pick up the new file on their next "movies like X" lookup
+    model.save()
+    print(f"Wrote top-{model.neighbours.shape[1]} neighbours for {len(movies)} movies to {path} "
+          f"in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Precompute content-based movie neighbours from genres, keywords, cast and crew")
+    parser.add_argument("--top-k", type=int, default=settings.CONTENT_SIMILARITY_TOP_K)
+    parser.add_argument("--path", default=settings.CONTENT_SIMILARITY_PATH)
+    args = parser.parse_args()
+    build_content_similarity(args.top_k, args.path)
@@ -0,0 +1,63 @@
+import argparse
+import time
+from sqlalchemy import create_engine, text
+from config.settings import settings
+from core.retrieval.embeddings import get_embedder, movie_document, to_pgvector, TfidfSvdEmbedder
+from db.catalog import bump_catalog_version, get_catalog_stamp, set_catalog_stamp
+
+# Engine for the offline job
+engine = create_engine(settings.DATABASE_URL)
+
+# catalog_meta key: catalog_version the embeddings were last built at
+EMBEDDINGS_VERSION_KEY = "embeddings_version"
+
+def build_embeddings(batch_size: int = 500, incremental: bool = False):
+    # movie_features.embedding and its HNSW index come from alembic (or migrate_data on a fresh database)
+    with engine.begin() as conn:
+        query = "SELECT m.id, m.title, m.tagline, m.overview, m.genres_data, m.keywords FROM movies m"
+        params = {}
+        if incremental:
+            # Only movies the loader stamped after the last build, plus any never embedded
+            since = get_catalog_stamp(conn, EMBEDDINGS_VERSION_KEY)
+            query += (" LEFT JOIN movie_features f ON f.movie_id = m.id"
+                      " WHERE f.embedding IS NULL OR m.catalog_version > :since")
+            params["since"] = since
+        movies = [row._asdict() for row in conn.execute(text(query + " ORDER BY m.id"), params)]
+    print(f"Loaded {len(movies)} movies" + (f" changed since catalog version {since}" if incremental else ""))
+    if incremental and not movies:
+        return
+
+    documents = [movie_document(movie) for movie in movies]
+    embedder = get_embedder()
+    # An incremental build reuses the fitted TF-IDF+SVD model so old and new vectors stay comparable
+    if isinstance(embedder, TfidfSvdEmbedder) and not incremental:
+        embedder.fit(documents)
+        embedder.save()
+        print(f"Saved fitted embedder to {embedder.model_path}")
+
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        for offset in range(0, len(movies), batch_size):
+            batch = movies[offset:offset + batch_size]
+            vectors = embedder.embed(documents[offset:offset + batch_size])
+            conn.execute(
+                text("""
+                    INSERT INTO movie_features (movie_id, embedding)
+                    VALUES (:movie_id, CAST(:embedding AS vector))
+                    ON CONFLICT (movie_id) DO UPDATE SET embedding = EXCLUDED.embedding
+                """),
+                [
+                    {"movie_id": movie["id"], "embedding": to_pgvector(vector)}
+                    for movie, vector in zip(batch, vectors)
+                ]
+            )
+            print(f"Embedded {min(offset + batch_size, len(movies))}/{len(movies)} movies")
+        set_catalog_stamp(conn, EMBEDDINGS_VERSION_KEY, bump_catalog_version(conn))
+    print(f"Embeddings built with '{settings.EMBEDDER}' in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Fill movie_features.embedding from the local embedder")
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--incremental", action="store_true", help="Only embed movies changed since the last build")
+    args = parser.parse_args()
+    build_embeddings(args.batch_size, args.incremental)
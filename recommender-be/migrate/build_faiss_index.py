@@ -0,0 +1,36 @@
+import argparse
+import time
+import numpy as np
+from sqlalchemy import create_engine, text
+from config.settings import settings
+from core.retrieval.faiss_index import build_index, write_index
+
+# Engine for the offline job
+engine = create_engine(settings.DATABASE_URL)
+
+def load_embeddings():
+    with engine.connect() as conn:
+        rows = conn.execute(text(
+            "SELECT movie_id, embedding::text FROM movie_features WHERE embedding IS NOT NULL ORDER BY movie_id"
+        )).all()
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    vectors = np.array([np.fromstring(row[1].strip("[]"), sep=",") for row in rows], dtype=np.float32)
+    return ids, vectors
+
+def build_faiss_index(index_type: str, path: str):
+    start = time.perf_counter()
+    ids, vectors = load_embeddings()
+    if not len(ids):
+        print("No embeddings found; run python -m migrate.build_embeddings first")
+        return
+    index = build_index(ids, vectors, index_type)
+    # Running workers notice the new file within FAISS_RELOAD_INTERVAL and swap it in
+    write_index(index, path)
+    print(f"Wrote FAISS index with {index.ntotal} vectors to {path} in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Build the FAISS movie index from movie_features.embedding")
+    parser.add_argument("--type", default=settings.FAISS_INDEX_TYPE, choices=["auto", "flat", "hnsw", "ivf"])
+    parser.add_argument("--path", default=settings.FAISS_INDEX_PATH)
+    args = parser.parse_args()
+    build_faiss_index(args.type, args.path)
@@ -1,9 +1,11 @@
+import argparse
 import pandas as pd
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, inspect
 from sqlalchemy.orm import sessionmaker
 from models import Movie, Genre, Actor, Director, Base
 from config.settings import settings
-import json
+from db.movie_search import ensure_search_vector, refresh_movie_search
+from migrate.bulk_load import bulk_load, stream_load
 import ast
 import traceback
 
@@ -11,16 +13,17 @@ import traceback
 engine = create_engine(settings.DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create tables
-Base.metadata.create_all(bind=engine)
-
 def parse_list(s):
     try:
         return ast.literal_eval(s)
     except:
         return []
 
-def migrate_data():
+def parse_date(s):
+    date = pd.to_datetime(s, format='%Y-%m-%d', errors='coerce')
+    return None if pd.isna(date) else date.date()
+
+def read_catalog():
     # Read CSV files
     movies_df = pd.read_csv('data/tmdb_5000_movies.csv')
     credits_df = pd.read_csv('data/tmdb_5000_credits.csv')
@@ -29,78 +32,113 @@ def migrate_data():
     df = pd.merge(movies_df, credits_df, left_on='id', right_on='movie_id')
     
     # Rename columns to avoid conflicts
-    df = df.rename(columns={'title_x': 'title'})
+    return df.rename(columns={'title_x': 'title'})
 
-    session = SessionLocal()
+def load_rows(session, df):
+    """Row-by-row ORM load: one lookup per genre, actor and director."""
+    for index, row in df.iterrows():
+        try:
+            # Create Movie instance
+            movie = Movie(
+                id=row.get('id'),
+                title=row.get('title', ''),
+                budget=row.get('budget', 0),
+                genres_data=parse_list(row.get('genres', '[]')),
+                homepage=row.get('homepage', ''),
+                keywords=parse_list(row.get('keywords', '[]')),
+                original_language=row.get('original_language', ''),
+                original_title=row.get('original_title', ''),
+                overview=row.get('overview', ''),
+                popularity=row.get('popularity', 0.0),
+                production_companies=parse_list(row.get('production_companies', '[]')),
+                release_date=parse_date(row.get('release_date')),
+                revenue=row.get('revenue', 0),
+                runtime=row.get('runtime', 0),
+                status=row.get('status', 'Unknown'),
+                tagline=row.get('tagline', ''),
+                vote_average=row.get('vote_average', 0.0),
+                vote_count=row.get('vote_count', 0),
+                cast=parse_list(row.get('cast', '[]')),
+                crew=parse_list(row.get('crew', '[]'))
+            )
 
-    try:
-        for index, row in df.iterrows():
-            try:
-                # Create Movie instance
-                movie = Movie(
-                    id=row.get('id'),
-                    title=row.get('title', ''),
-                    budget=row.get('budget', 0),
-                    genres_data=json.dumps(parse_list(row.get('genres', '[]'))),
-                    homepage=row.get('homepage', ''),
-                    keywords=json.dumps(parse_list(row.get('keywords', '[]'))),
-                    original_language=row.get('original_language', ''),
-                    original_title=row.get('original_title', ''),
-                    overview=row.get('overview', ''),
-                    popularity=row.get('popularity', 0.0),
-                    production_companies=json.dumps(parse_list(row.get('production_companies', '[]'))),
-                    release_date=row.get('release_date', ''),
-                    revenue=row.get('revenue', 0),
-                    runtime=row.get('runtime', 0),
-                    status=row.get('status', 'Unknown'),
-                    tagline=row.get('tagline', ''),
-                    vote_average=row.get('vote_average', 0.0),
-                    vote_count=row.get('vote_count', 0),
-                    cast=json.dumps(parse_list(row.get('cast', '[]'))),
-                    crew=json.dumps(parse_list(row.get('crew', '[]')))
-                )
-
-                # Add genres
-                genres = parse_list(row.get('genres', '[]'))
-                for genre_data in genres:
-                    genre = session.query(Genre).filter_by(name=genre_data['name']).first()
-                    if not genre:
-                        genre = Genre(name=genre_data['name'])
+            # Add genres
+            genres = parse_list(row.get('genres', '[]'))
+            for genre_data in genres:
+                genre = session.query(Genre).filter_by(name=genre_data['name']).first()
+                if not genre:
+                    genre = Genre(name=genre_data['name'])
+                if genre not in movie.genres:  # (movie_id, genre_id) is the primary key
                     movie.genres.append(genre)
 
-                # Add director
-                crew = parse_list(row.get('crew', '[]'))
-                director_data = next((item for item in crew if item["job"] == "Director"), None)
-                if director_data:
-                    director = session.query(Director).filter_by(name=director_data['name']).first()
-                    if not director:
-                        director = Director(name=director_data['name'])
-                        session.add(director)
-                        session.flush()  # This will assign an ID to the director
-                    movie.director_id = director.id
-
-                # Add actors (top 3)
-                cast = parse_list(row.get('cast', '[]'))[:3]
-                for actor_data in cast:
-                    actor = session.query(Actor).filter_by(name=actor_data['name']).first()
-                    if not actor:
-                        actor = Actor(name=actor_data['name'])
+            # Add director
+            crew = parse_list(row.get('crew', '[]'))
+            director_data = next((item for item in crew if item["job"] == "Director"), None)
+            if director_data:
+                director = session.query(Director).filter_by(name=director_data['name']).first()
+                if not director:
+                    director = Director(name=director_data['name'])
+                    session.add(director)
+                    session.flush()  # This will assign an ID to the director
+                movie.director_id = director.id
+
+            # Add actors (top 3)
+            cast = parse_list(row.get('cast', '[]'))[:3]
+            for actor_data in cast:
+                actor = session.query(Actor).filter_by(name=actor_data['name']).first()
+                if not actor:
+                    actor = Actor(name=actor_data['name'])
+                if actor not in movie.actors:  # An actor can hold two of the top 3 roles
                     movie.actors.append(actor)
 
-                session.add(movie)
+            session.add(movie)
+
+            if index % 100 == 0:
+                session.commit()
+                print(f"Processed {index} movies")
+
+        except Exception as e:
+            print(f"Error processing movie at index {index}: {str(e)}")
+            print(f"Problematic row: {row}")
+            traceback.print_exc()
+            session.rollback()
 
-                if index % 100 == 0:
-                    session.commit()
-                    print(f"Processed {index} movies")
+    session.commit()
 
-            except Exception as e:
-                print(f"Error processing movie at index {index}: {str(e)}")
-                print(f"Problematic row: {row}")
-                traceback.print_exc()
-                session.rollback()
+def migrate_data(bulk: bool = False, stream: bool = False, delta: bool = False, workers=None, chunksize: int = 2000):
+    # Create tables; on a fresh database the search_vector trigger comes with them,
+    # existing databases get it from the alembic revision
+    fresh = not inspect(engine).has_table("movies")
+    Base.metadata.create_all(bind=engine)
+    if fresh:
+        with engine.begin() as conn:
+            ensure_search_vector(conn, backfill=False)
 
-        session.commit()
+    if stream or delta:
+        # Never holds the whole catalog in memory; delta also rewrites movies whose source row changed
+        stats = stream_load(
+            engine, 'data/tmdb_5000_movies.csv', 'data/tmdb_5000_credits.csv',
+            chunksize=chunksize, workers=workers, upsert=delta
+        )
+        print(f"{'Delta' if delta else 'Streaming'} load completed: {stats}")
+        return
+
+    df = read_catalog()
+
+    if bulk:
+        stats = bulk_load(engine, df)
+        print(f"Bulk load completed: {stats}")
+        return
+
+    session = SessionLocal()
+
+    try:
+        load_rows(session, df)
         print("Data migration completed successfully.")
+
+        with engine.begin() as conn:
+            refresh_movie_search(conn)
+        print("movie_search view refreshed.")
     except Exception as e:
         print(f"An error occurred: {str(e)}")
         traceback.print_exc()
@@ -109,4 +147,11 @@ def migrate_data():
         session.close()
 
 if __name__ == "__main__":
-    migrate_data()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Load the TMDB 5000 catalog into the database")
+    parser.add_argument("--bulk", action="store_true", help="Load with COPY (migrate/bulk_load.py) instead of the ORM")
+    parser.add_argument("--stream", action="store_true", help="Like --bulk, reading the CSVs in chunks parsed by worker processes")
+    parser.add_argument("--delta", action="store_true", help="Like --stream, also upserting movies whose source row changed")
+    parser.add_argument("--workers", type=int, default=None, help="Parser processes for --stream/--delta (default: one per core)")
+    parser.add_argument("--chunksize", type=int, default=2000, help="CSV rows per chunk for --stream/--delta")
+    args = parser.parse_args()
+    migrate_data(bulk=args.bulk, stream=args.stream, delta=args.delta, workers=args.workers, chunksize=args.chunksize)
\ No newline at end of file
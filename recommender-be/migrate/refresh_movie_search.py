@@ -0,0 +1,19 @@
+import argparse
+import time
+from sqlalchemy import create_engine
+from config.settings import settings
+from db.movie_search import refresh_movie_search
+
+def main():
+    parser = argparse.ArgumentParser(description="Create and refresh the movie_search materialized view")
+    parser.add_argument("--blocking", action="store_true", help="Use a plain REFRESH instead of CONCURRENTLY")
+    args = parser.parse_args()
+
+    engine = create_engine(settings.DATABASE_URL)
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        refresh_movie_search(conn, concurrently=not args.blocking)
+    print(f"movie_search refreshed in {time.perf_counter() - start:.2f}s")
+
+if __name__ == "__main__":
+    main()
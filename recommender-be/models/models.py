@@ -1,36 +1,44 @@
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, Table, Text, DateTime, func, ARRAY, JSON
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, Table, Text, Date, DateTime, func, ARRAY, JSON, Index, Computed
 from sqlalchemy.orm import declarative_base, relationship
-from sqlalchemy.dialects.postgresql import UUID
+from sqlalchemy.dialects.postgresql import UUID, TSVECTOR, JSONB
+from pgvector.sqlalchemy import Vector
 import uuid
 
 Base = declarative_base()
 
+# Dimension of MovieFeature.embedding; embedders in core/retrieval/embeddings.py produce this size
+EMBEDDING_DIM = 256
+
 # Association tables
+# The (movie_id, ...) primary keys serve lookups by movie; the second index the reverse direction
 movie_genre = Table('movie_genre', Base.metadata,
-    Column('movie_id', Integer, ForeignKey('movies.id')),
-    Column('genre_id', Integer, ForeignKey('genres.id'))
+    Column('movie_id', Integer, ForeignKey('movies.id'), primary_key=True),
+    Column('genre_id', Integer, ForeignKey('genres.id'), primary_key=True),
+    Index('ix_movie_genre_genre_id', 'genre_id'),
 )
 
 movie_actor = Table('movie_actor', Base.metadata,
-    Column('movie_id', Integer, ForeignKey('movies.id')),
-    Column('actor_id', Integer, ForeignKey('actors.id'))
+    Column('movie_id', Integer, ForeignKey('movies.id'), primary_key=True),
+    Column('actor_id', Integer, ForeignKey('actors.id'), primary_key=True),
+    Index('ix_movie_actor_actor_id', 'actor_id'),
 )
 
 class Movie(Base):
     __tablename__ = 'movies'
 
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True)
     title = Column(String, index=True)
     budget = Column(Integer)
-    genres_data = Column(Text)  # We'll store this as JSON string
+    genres_data = Column(JSONB)
     homepage = Column(String)
-    keywords = Column(Text)  # We'll store this as JSON string
+    keywords = Column(JSONB)
     original_language = Column(String)
     original_title = Column(String)
     overview = Column(Text)
     popularity = Column(Float)
-    production_companies = Column(Text)  # We'll store this as JSON string
-    release_date = Column(String)
+    production_companies = Column(JSONB)
+    release_date = Column(Date)
+    release_year = Column(Integer, Computed("EXTRACT(YEAR FROM release_date)::integer", persisted=True))
     revenue = Column(Integer)
     runtime = Column(Integer)
     status = Column(String)
@@ -39,8 +47,17 @@ class Movie(Base):
     vote_count = Column(Integer)
     
     # Fields from credits.csv
-    cast = Column(Text)  # We'll store this as JSON string
-    crew = Column(Text)  # We'll store this as JSON string
+    cast = Column(JSONB)
+    crew = Column(JSONB)
+
+    # Weighted full-text document (title, tagline, keyword names, overview), maintained
+    # by the movies_search_vector_trigger created in db/movie_search.py
+    search_vector = Column(TSVECTOR)
+
+    # Set by migrate/bulk_load.py: md5 of the source row (movie + credits), and the
+    # catalog_version at which the row last changed, for incremental index rebuilds
+    source_hash = Column(String(32))
+    catalog_version = Column(Integer)
 
     director_id = Column(Integer, ForeignKey('directors.id'))
     director = relationship("Director", back_populates="movies")
@@ -49,15 +66,45 @@ class Movie(Base):
     actors = relationship("Actor", secondary=movie_actor, back_populates="movies")
     features = relationship("MovieFeature", back_populates="movie", uselist=False)
 
+    __table_args__ = (
+        Index('ix_movies_search_vector', 'search_vector', postgresql_using='gin'),
+        Index('ix_movies_release_year', 'release_year'),
+        # ORDER BY columns of the retrieval queries
+        Index('ix_movies_popularity', popularity.desc()),
+        Index('ix_movies_vote', vote_average.desc(), vote_count.desc()),
+        Index('ix_movies_revenue', revenue.desc()),
+        Index('ix_movies_budget', 'budget'),
+        Index('ix_movies_runtime', 'runtime'),
+        Index('ix_movies_director_id', 'director_id'),
+        # jsonb_path_ops: containment lookups such as keywords @> '[{"name": "sequel"}]'.
+        # crew has none; only its director is queried, through director_id
+        Index('ix_movies_genres_data', 'genres_data', postgresql_using='gin', postgresql_ops={'genres_data': 'jsonb_path_ops'}),
+        Index('ix_movies_keywords', 'keywords', postgresql_using='gin', postgresql_ops={'keywords': 'jsonb_path_ops'}),
+        Index('ix_movies_production_companies', 'production_companies', postgresql_using='gin',
+              postgresql_ops={'production_companies': 'jsonb_path_ops'}),
+        Index('ix_movies_cast', 'cast', postgresql_using='gin', postgresql_ops={'cast': 'jsonb_path_ops'}),
+    )
+
 class MovieFeature(Base):
     __tablename__ = 'movie_features'
 
     id = Column(Integer, primary_key=True)
     movie_id = Column(Integer, ForeignKey('movies.id'), unique=True)
     features = Column(ARRAY(Float))  # Store feature vector as an array of floats
+    embedding = Column(Vector(EMBEDDING_DIM))  # Filled by migrate/build_embeddings.py
 
     movie = relationship("Movie", back_populates="features")
 
+    __table_args__ = (
+        Index(
+            'ix_movie_features_embedding_hnsw',
+            'embedding',
+            postgresql_using='hnsw',
+            postgresql_with={'m': 16, 'ef_construction': 64},
+            postgresql_ops={'embedding': 'vector_cosine_ops'},
+        ),
+    )
+
 class Genre(Base):
     __tablename__ = 'genres'
 
@@ -70,7 +117,7 @@ class Actor(Base):
     __tablename__ = 'actors'
 
     id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, index=True)
     
     movies = relationship("Movie", secondary=movie_actor, back_populates="actors")
 
@@ -78,7 +125,7 @@ class Director(Base):
     __tablename__ = 'directors'
 
     id = Column(Integer, primary_key=True)
-    name = Column(String, nullable=False)
+    name = Column(String, nullable=False, index=True)
     
     movies = relationship("Movie", back_populates="director")
 
@@ -103,7 +150,7 @@ class Session(Base):
     __tablename__ = 'sessions'
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
-    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False, index=True)
     issued_at = Column(DateTime(timezone=True), nullable=False)
     expires_at = Column(DateTime(timezone=True), nullable=False)
     client_id = Column(String(255), nullable=True)
@@ -125,6 +172,10 @@ class ModelConfig(Base):
     user = relationship("User", back_populates="model_configs")
     evaluations = relationship("ModelEvaluation", back_populates="model_config")
 
+    __table_args__ = (
+        Index('ix_model_configs_user_id_created_at', 'user_id', 'created_at'),
+    )
+
 class Conversation(Base):
     __tablename__ = 'conversations'
 
@@ -140,6 +191,11 @@ class Conversation(Base):
     messages = relationship("Message", back_populates="conversation")
     evaluation = relationship("ModelEvaluation", back_populates="conversation", uselist=False)
 
+    __table_args__ = (
+        # get_or_create_conversation: the user's open conversation (end_time IS NULL)
+        Index('ix_conversations_user_id_end_time', 'user_id', 'end_time'),
+    )
+
 class Message(Base):
     __tablename__ = 'messages'
 
@@ -151,6 +207,10 @@ class Message(Base):
 
     conversation = relationship("Conversation", back_populates="messages")
 
+    __table_args__ = (
+        Index('ix_messages_conversation_id_timestamp', 'conversation_id', 'timestamp'),
+    )
+
 class UserViewingHistory(Base):
     __tablename__ = 'user_viewing_history'
 
@@ -162,15 +222,50 @@ class UserViewingHistory(Base):
     user = relationship("User", back_populates="viewing_history")
     movie = relationship("Movie")
 
+    __table_args__ = (
+        Index('ix_user_viewing_history_user_id_timestamp', 'user_id', 'timestamp'),
+    )
+
 class ModelEvaluation(Base):
     __tablename__ = 'model_evaluations'
 
     id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
     model_config_id = Column(UUID(as_uuid=True), ForeignKey('model_configs.id'), nullable=False)
     model_name = Column(String(100), nullable=True)
-    conversation_id = Column(UUID(as_uuid=True), ForeignKey('conversations.id'), nullable=False)
+    conversation_id = Column(UUID(as_uuid=True), ForeignKey('conversations.id'), nullable=False, index=True)
     metrics = Column(JSON, nullable=False)  # Store all evaluation metrics as a JSON object
     timestamp = Column(DateTime(timezone=True), server_default=func.now())
 
     model_config = relationship("ModelConfig", back_populates="evaluations")
     conversation = relationship("Conversation", back_populates="evaluation")
+
+# Durable queue of answer evaluations, drained by core/evaluation/worker.py
+class EvaluationJob(Base):
+    __tablename__ = 'evaluation_jobs'
+
+    id = Column(UUID(as_uuid=True), primary_key=True, default=uuid.uuid4)
+    user_id = Column(UUID(as_uuid=True), ForeignKey('users.id'), nullable=False)
+    conversation_id = Column(UUID(as_uuid=True), ForeignKey('conversations.id'), nullable=False)
+    model_config_id = Column(UUID(as_uuid=True), ForeignKey('model_configs.id'), nullable=False)
+    model_name = Column(String(100), nullable=True)
+    session_id = Column(String(64), nullable=True)  # Chat socket to push the scores to, if still open
+    payload = Column(JSON, nullable=False)  # Question, agent reasoning and final answer
+    status = Column(String(20), nullable=False, default='pending')  # pending, running, done or failed
+    attempts = Column(Integer, nullable=False, default=0)
+    result = Column(JSON, nullable=True)
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    __table_args__ = (
+        Index('ix_evaluation_jobs_status_created_at', 'status', 'created_at'),
+    )
+
+# Key/value stamps about the movie catalog; catalog_version is bumped on every catalog change
+class CatalogMeta(Base):
+    __tablename__ = 'catalog_meta'
+
+    key = Column(String(64), primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
@@ -2,13 +2,15 @@ from fastapi import APIRouter
 from .ping import router as ping_router
 from .config import router as config_router
 from .websocket import router as websocket_router
+from .evaluations import router as evaluations_router
 
 api_router = APIRouter(prefix="/api")
 
 routers = [
     ping_router,
     config_router,
-    websocket_router
+    websocket_router,
+    evaluations_router
 ]
 
 for router in routers:
@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from db.database import get_db
 from models.models import User, ModelConfig
 from routes.auth.google import verify_token
+from core.session import session_registry
 import logging
 import uuid
 
@@ -52,6 +53,10 @@ async def configure_model(request: Request, db: Session = Depends(get_db)):
             db.add(config)
 
         db.commit()
+
+        # Open chat sockets pick up the new config on their next message
+        invalidated = session_registry.invalidate_user(str(user_id))
+        logger.info(f"Invalidated {invalidated} live chat session(s) for user {user_id}")
         return {"message": "Model configuration saved successfully"}
     except Exception as e:
         logger.error(f"Error configuring model: {str(e)}", exc_info=True)
@@ -0,0 +1,66 @@
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.orm import Session
+from db.database import get_db
+from models.models import EvaluationJob
+from routes.auth.google import verify_token
+import logging
+import uuid
+
+router = APIRouter()
+logger = logging.getLogger(__name__)
+
+def _job_response(job: EvaluationJob) -> dict:
+    return {
+        "job_id": str(job.id),
+        "conversation_id": str(job.conversation_id),
+        "status": job.status,
+        "attempts": job.attempts,
+        "result": job.result,
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None,
+    }
+
+def _current_user_id(request: Request, db: Session) -> uuid.UUID:
+    token = request.cookies.get("token")
+    if not token:
+        raise HTTPException(status_code=401, detail="No token provided")
+
+    user_info = verify_token(token, db)
+    if not user_info or not user_info.get("valid"):
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    try:
+        return uuid.UUID(str(user_info['user']['sub']))
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid user ID format")
+
+@router.get("/evaluations/{job_id}")
+async def get_evaluation(job_id: str, request: Request, db: Session = Depends(get_db)):
+    """Poll an answer evaluation queued by the chat socket (evaluation_pending frame)."""
+    user_id = _current_user_id(request, db)
+    try:
+        job_uuid = uuid.UUID(job_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid job ID format")
+
+    job = db.query(EvaluationJob).filter(EvaluationJob.id == job_uuid, EvaluationJob.user_id == user_id).first()
+    if not job:
+        raise HTTPException(status_code=404, detail="Evaluation not found")
+    return _job_response(job)
+
+@router.get("/evaluations")
+async def list_evaluations(request: Request, conversation_id: str, db: Session = Depends(get_db)):
+    user_id = _current_user_id(request, db)
+    try:
+        conversation_uuid = uuid.UUID(conversation_id)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Invalid conversation ID format")
+
+    jobs = (
+        db.query(EvaluationJob)
+        .filter(EvaluationJob.conversation_id == conversation_uuid, EvaluationJob.user_id == user_id)
+        .order_by(EvaluationJob.created_at.desc())
+        .all()
+    )
+    return [_job_response(job) for job in jobs]
@@ -1,5 +1,10 @@
 import logging
 from fastapi import APIRouter
+from core.session import session_registry
+from core.cache.response_cache import response_cache
+from core.cache.query_cache import query_cache
+from core.evaluation.worker import evaluation_worker
+from core.cache.semantic_cache import semantic_retrieval_cache, semantic_answer_cache
 
 router = APIRouter()
 logger = logging.getLogger(__name__)
@@ -7,4 +12,18 @@ logger = logging.getLogger(__name__)
 @router.get("/ping")
 async def ping():
     logger.info("Health check endpoint called")
-    return {"message": "pong"}
\ No newline at end of file
+    return {"message": "pong"}
+
+@router.get("/stats")
+async def stats():
+    # Process-local runtime metrics (per worker)
+    return {
+        "chat_sessions": session_registry.stats(),
+        "response_cache": response_cache.stats(),
+        "query_cache": query_cache.stats(),
+        "evaluation_worker": evaluation_worker.stats(),
+        "semantic_cache": {
+            "retrieval": semantic_retrieval_cache.stats(),
+            "answer": semantic_answer_cache.stats(),
+        },
+    }
@@ -1,17 +1,20 @@
-from fastapi import APIRouter, Depends, WebSocket, Query, status
-from sqlalchemy.orm import Session
-from db.database import get_db
+from fastapi import APIRouter, WebSocket, Query, status
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from db.database import async_session_scope, count_queries
 from models.models import User, ModelConfig
-from routes.auth.google import verify_token
+from routes.auth.google import verify_token_async
 import logging
-from core.model_interface import ModelFactory
-from langchain.memory import ConversationBufferMemory
+from core.session import ChatSession, session_registry
+from core.streaming import FrameSender
+from core.evaluation.worker import evaluation_worker
 from config.settings import settings
 from starlette.websockets import WebSocketState, WebSocketDisconnect
 from datetime import datetime
 import pytz
 import json
 import asyncio
+from contextlib import aclosing
 from core.askLLM import askLLM
 import uuid
 from langfuse.decorators import observe, langfuse_context
@@ -47,14 +50,14 @@ def convert_timestamp(timestamp_str: str, user_timezone: str = 'UTC') -> tuple:
         return timestamp_str, timestamp_str  # Return original timestamp if conversion fails
 
 @observe(as_type="generation")
-async def process_user_message(data: dict, db: Session, model, memory, user: User, session_id: str):
+async def process_user_message(data: dict, db: AsyncSession, session: ChatSession):
     """Process a user message and return the AI response with tracing information."""
     message_id = str(uuid.uuid4())
     try:
-        async for response_chunk in askLLM(data, db, model, memory, user, session_id):
+        async for response_chunk in askLLM(data, db, session):
             if isinstance(response_chunk, dict):
                 response_type = response_chunk.get("type", "token")
-                if response_type in ["agent_thought", "final_response", "error", "end", "evaluation"]:
+                if response_type in ["agent_thought", "final_response", "error", "end", "evaluation", "evaluation_pending"]:
                     yield {
                         "message_id": message_id if response_type != "evaluation" else str(uuid.uuid4()),
                         "content": response_chunk.get("content", ""),
@@ -97,16 +100,15 @@ async def close_websocket(websocket: WebSocket):
 @router.websocket("/chat")
 async def websocket_endpoint(
     websocket: WebSocket,
-    token: str = Query(...),
-    db: Session = Depends(get_db)
+    token: str = Query(...)
 ):
     await websocket.accept()
     logger.info(f"WebSocket connection attempt with token: {token[:10]}...")
 
     user = None
     config = None
-    model = None
-    memory = None
+    chat_session = None
+    sender = None
     session_id = str(uuid.uuid4())  # Generate a unique session ID for this WebSocket connection
 
     try:
@@ -115,15 +117,22 @@ async def websocket_endpoint(
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return
 
-        user_info = verify_token(token, db)
-        logger.info(f"Token verification result: {user_info}")
+        # Short-lived session for the handshake; it is released before the receive loop
+        async with async_session_scope() as db:
+            user_info = await verify_token_async(token, db)
+            logger.info(f"Token verification result: {user_info}")
+
+            if user_info and user_info.get("valid"):
+                user = await db.get(User, uuid.UUID(user_info['user']['sub']))
+                if user:
+                    stmt = select(ModelConfig).filter(ModelConfig.user_id == user.id).order_by(ModelConfig.created_at.desc()).limit(1)
+                    config = (await db.execute(stmt)).scalars().first()
 
         if not user_info or not user_info.get("valid"):
             logger.warning(f"Invalid token, user_info: {user_info}")
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
             return
 
-        user = db.query(User).filter(User.id == uuid.UUID(user_info['user']['sub'])).first()
         if not user:
             logger.warning(f"User not found for sub: {user_info['user']['sub']}")
             await websocket.close(code=status.WS_1008_POLICY_VIOLATION)
@@ -131,7 +140,6 @@ async def websocket_endpoint(
 
         logger.info(f"Authenticated user: {user.email}")
 
-        config = db.query(ModelConfig).filter(ModelConfig.user_id == user.id).order_by(ModelConfig.created_at.desc()).first()
         if not config:
             logger.warning("No model configuration found for user")
             await websocket.send_json({"type": "error", "content": "No model configuration found"})
@@ -139,16 +147,18 @@ async def websocket_endpoint(
             return
 
         try:
-            model = ModelFactory.create_model(config.provider, config.model, config.api_key)
-            logger.info(f"Model created: {config.provider} - {config.model}")
+            # Model, memory and agent are built once here and reused for every message
+            chat_session = ChatSession(session_id, user, config)
+            session_registry.register(chat_session)
         except ValueError as e:
             logger.error(f"Error creating model: {str(e)}")
             await websocket.send_json({"type": "error", "content": str(e)})
             await websocket.close()
             return
 
-        memory = ConversationBufferMemory()
-        logger.info("ConversationBufferMemory initialized")
+        # All frames from here on go through one coalescing, backpressured writer
+        sender = FrameSender(websocket.send_text).start()
+        evaluation_worker.subscribe(session_id, sender.send)
 
         while True:
             try:
@@ -156,15 +166,15 @@ async def websocket_endpoint(
                 logger.info(f"Received message: {data}")
 
                 @observe(capture_input=False, capture_output=False, )
-                async def message():
+                async def message(db: AsyncSession):
                     if is_langfuse_available():
                         try:
                             # Set the session ID for this trace
                             langfuse_context.update_current_trace(
                                 session_id=session_id,
                                 metadata={
-                                        "provider": config.provider,
-                                        "model": config.model
+                                        "provider": chat_session.config.provider,
+                                        "model": chat_session.config.model
                                 }
                             )
                         except Exception as e:
@@ -179,16 +189,16 @@ async def websocket_endpoint(
                             logger.error("Failed to convert timestamp")
 
                     output_metadata = {}
-                    async for response in process_user_message(data, db, model, memory, user, session_id):
-                        if websocket.client_state == WebSocketState.CONNECTED:
-                            await websocket.send_json(response)
-                            output_metadata[response["message_id"]] = {
-                                "type": response["type"],
-                                "timestamp": response["timestamp"]
-                            }
-                        else:
-                            logger.warning("WebSocket disconnected during message processing")
-                            return
+                    async with aclosing(process_user_message(data, db, chat_session)) as responses:
+                        async for response in responses:
+                            if websocket.client_state == WebSocketState.CONNECTED and await sender.send(response):
+                                output_metadata[response["message_id"]] = {
+                                    "type": response["type"],
+                                    "timestamp": response["timestamp"]
+                                }
+                            else:
+                                logger.warning("WebSocket disconnected during message processing")
+                                return
 
                     if is_langfuse_available():
                         try:
@@ -200,7 +210,21 @@ async def websocket_endpoint(
                         except Exception as e:
                             logger.error(f"Error updating Langfuse observation: {str(e)}", exc_info=True)
 
-                await message()
+                # One unit of work per message: pipeline, storage and evaluation share
+                # this session and its connection goes back to the pool afterwards
+                with count_queries() as queries:
+                    async with async_session_scope() as db:
+                        try:
+                            await message(db)
+                        finally:
+                            # On disconnect or cancellation the answer is abandoned mid-stream;
+                            # close the provider stream here rather than at garbage collection
+                            await chat_session.model.close_streams()
+                logger.info(
+                    f"Message handled with {queries.count} database queries, "
+                    f"memory {chat_session.memory.memory_bytes()} bytes / {chat_session.memory.token_count} tokens "
+                    f"(session {session_id})"
+                )
 
             except asyncio.TimeoutError:
                 logger.info("Receive timeout, continuing...")
@@ -211,20 +235,22 @@ async def websocket_endpoint(
             except json.JSONDecodeError:
                 logger.error("Invalid JSON received")
                 if websocket.client_state == WebSocketState.CONNECTED:
-                    await websocket.send_json({"type": "error", "content": "Invalid JSON format"})
+                    await sender.send({"type": "error", "content": "Invalid JSON format"})
             except Exception as e:
                 logger.error(f"Error while processing message: {str(e)}", exc_info=True)
                 if websocket.client_state == WebSocketState.CONNECTED:
-                    await websocket.send_json({
+                    await sender.send({
                         "message_id": str(uuid.uuid4()),
                         "content": f"An unexpected error occurred: {str(e)}",
                         "type": "error",
                         "timestamp": datetime.utcnow().isoformat(),
                     })
-                    await websocket.send_json({"type": "end"})
+                    await sender.send({"type": "end"})
 
     except Exception as e:
         logger.error(f"Error in WebSocket connection: {str(e)}", exc_info=True)
+        if sender is not None:
+            await sender.aclose()
         if websocket.client_state == WebSocketState.CONNECTED:
             await websocket.send_json({
                 "message_id": str(uuid.uuid4()),
@@ -235,6 +261,11 @@ async def websocket_endpoint(
             await websocket.close(code=status.WS_1011_INTERNAL_ERROR)
     finally:
         logger.info("Closing WebSocket connection")
+        if chat_session is not None:
+            session_registry.unregister(chat_session)
+        evaluation_worker.unsubscribe(session_id)
+        if sender is not None:
+            await sender.aclose()
         await close_websocket(websocket)
 
         if is_langfuse_available():
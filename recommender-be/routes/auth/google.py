@@ -8,6 +8,8 @@ from jose import jwt, JWTError
 from datetime import datetime, timedelta
 from config.settings import settings
 from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
 from db.database import get_db
 from models.models import User, Session as UserSession
 import uuid
@@ -146,6 +148,40 @@ def verify_token(token: str, db: Session):
     except Exception as e:
         logger.error(f"Unexpected error during token verification: {str(e)}")
         return {"valid": False}
+
+async def verify_token_async(token: str, db: AsyncSession):
+    """Async counterpart of verify_token for callers holding an AsyncSession."""
+    logger.info(f"Verifying token: {token[:10]}...")
+    try:
+        payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
+        logger.info(f"Token decoded successfully. Payload: {payload}")
+
+        user_id = payload.get("sub")
+        if not user_id:
+            logger.warning("Token payload does not contain 'sub' field")
+            return {"valid": False}
+
+        stmt = select(UserSession).filter(UserSession.user_id == uuid.UUID(user_id)).limit(1)
+        session = (await db.execute(stmt)).scalars().first()
+        if not session:
+            logger.warning(f"No session found for user_id: {user_id}")
+            return {"valid": False}
+
+        if session.expires_at < datetime.now(UTC):
+            logger.warning(f"Session expired for user_id: {user_id}")
+            return {"valid": False}
+
+        logger.info(f"Token verified successfully for user_id: {user_id}")
+        return {"valid": True, "user": payload}
+    except jwt.ExpiredSignatureError:
+        logger.warning("Token has expired")
+        return {"valid": False}
+    except jwt.InvalidTokenError as e:
+        logger.warning(f"Invalid token: {str(e)}")
+        return {"valid": False}
+    except Exception as e:
+        logger.error(f"Unexpected error during token verification: {str(e)}")
+        return {"valid": False}
    
 
 @router.get("/protected")
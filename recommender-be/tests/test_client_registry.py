@@ -0,0 +1,125 @@
+"""
+ClientRegistry and the SDK-backed models, against a mocked provider HTTP API.
+
+The real openai and anthropic SDKs run; only the shared httpx client is swapped for
+one with a MockTransport, so every request the SDKs make is answered (and recorded)
+here instead of going to the network.
+"""
+
+import asyncio
+import json
+
+import httpx
+from langchain.schema import HumanMessage
+
+import core.model_interface as model_interface
+from core.client_registry import ClientRegistry
+from core.model_interface import ModelFactory
+
+OPENAI_COMPLETION = {
+    "id": "chatcmpl-test",
+    "object": "chat.completion",
+    "created": 0,
+    "model": "gpt-4o-mini",
+    "choices": [{"index": 0, "message": {"role": "assistant", "content": "Try Heat (1995)."}, "finish_reason": "stop"}],
+    "usage": {"prompt_tokens": 12, "completion_tokens": 5, "total_tokens": 17},
+}
+
+ANTHROPIC_MESSAGE = {
+    "id": "msg_test",
+    "type": "message",
+    "role": "assistant",
+    "model": "claude-3-haiku-20240307",
+    "content": [{"type": "text", "text": "Try Alien (1979)."}],
+    "stop_reason": "end_turn",
+    "stop_sequence": None,
+    "usage": {"input_tokens": 12, "output_tokens": 6},
+}
+
+ANTHROPIC_STREAM = [
+    ("message_start", {"type": "message_start", "message": {**ANTHROPIC_MESSAGE, "content": []}}),
+    ("content_block_start", {"type": "content_block_start", "index": 0, "content_block": {"type": "text", "text": ""}}),
+    ("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "Try "}}),
+    ("content_block_delta", {"type": "content_block_delta", "index": 0, "delta": {"type": "text_delta", "text": "Alien."}}),
+    ("content_block_stop", {"type": "content_block_stop", "index": 0}),
+    ("message_delta", {"type": "message_delta", "delta": {"stop_reason": "end_turn", "stop_sequence": None}, "usage": {"output_tokens": 2}}),
+    ("message_stop", {"type": "message_stop"}),
+]
+
+
+def make_registry(requests, **options) -> ClientRegistry:
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        body = json.loads(request.content)
+        if request.url.path.endswith("/chat/completions"):
+            return httpx.Response(200, json=OPENAI_COMPLETION)
+        if request.url.path.endswith("/messages") and body.get("stream"):
+            events = "".join(f"event: {name}\ndata: {json.dumps(data)}\n\n" for name, data in ANTHROPIC_STREAM)
+            return httpx.Response(200, content=events.encode(), headers={"content-type": "text/event-stream"})
+        if request.url.path.endswith("/messages"):
+            return httpx.Response(200, json=ANTHROPIC_MESSAGE)
+        return httpx.Response(404, json={"error": {"message": f"unexpected {request.url.path}"}})
+
+    registry = ClientRegistry(**options)
+    registry._http_client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return registry
+
+
+def test_clients_are_cached_per_key_and_evicted_lru():
+    registry = make_registry([], max_clients=2)
+    first = registry.get("openai", "key-1")
+    assert registry.get("OpenAI", "key-1") is first
+    registry.get("openai", "key-2")
+    registry.get("anthropic", "key-1")
+    # key-1/openai was the least recently used of the three
+    assert registry.get("openai", "key-1") is not first
+    assert (registry.hits, registry.misses) == (1, 4)
+    assert all("key-1" not in part for key in registry._clients for part in key if part)
+    asyncio.run(registry.aclose())
+
+
+def test_models_share_the_registry_http_pool(monkeypatch):
+    requests = []
+    registry = make_registry(requests)
+    monkeypatch.setattr(model_interface, "client_registry", registry)
+    messages = [HumanMessage(content="A crime movie?")]
+
+    async def run():
+        openai_model = ModelFactory.create_model("openai", "gpt-4o-mini", "sk-test")
+        anthropic_model = ModelFactory.create_model("anthropic", "claude-3-haiku-20240307", "sk-ant-test")
+        answers = [await openai_model.generate(messages), await anthropic_model.generate(messages)]
+        stream = await anthropic_model.generate_stream(messages)
+        answers.append("".join([token async for token in stream]))
+        # A second model for the same key reuses the cached SDK client
+        assert ModelFactory.create_model("openai", "gpt-4o", "sk-test").client is openai_model.client
+        await registry.aclose()
+        return answers
+
+    assert asyncio.run(run()) == ["Try Heat (1995).", "Try Alien (1979).", "Try Alien."]
+    assert [request.url.path for request in requests] == ["/v1/chat/completions", "/v1/messages", "/v1/messages"]
+    assert requests[0].headers["authorization"] == "Bearer sk-test"
+    assert requests[1].headers["x-api-key"] == "sk-ant-test"
+
+
+def test_abandoned_stream_is_closed_and_frees_its_slot(monkeypatch):
+    registry = make_registry([], max_concurrency=1)
+    monkeypatch.setattr(model_interface, "client_registry", registry)
+    messages = [HumanMessage(content="A crime movie?")]
+
+    async def run():
+        model = ModelFactory.create_model("anthropic", "claude-3-haiku-20240307", "sk-ant-test")
+        stream = await model.generate_stream(messages)
+        first = await stream.__anext__()
+        # The consumer stops reading here (socket closed): the slot is already free
+        assert not model.limiter.locked()
+        opened = list(model._streams)
+        await model.close_streams()
+        # The only slot serves the next request
+        answer = await asyncio.wait_for(model.generate(messages), timeout=5)
+        await registry.aclose()
+        return first, [stream.ag_frame for stream in opened], answer
+
+    first, frames, answer = asyncio.run(run())
+    assert first == "Try "
+    assert frames == [None]
+    assert answer == "Try Alien (1979)."
@@ -0,0 +1,44 @@
+"""
+The hot catalog and chat queries keep using indexes (benchmarks/query_plans.py).
+
+Runs the benchmark's check on a catalog large enough that the planner prefers the
+indexes, in the scratch schema of the test database. The full-size run is
+`python -m benchmarks.query_plans`.
+"""
+
+import pytest
+from sqlalchemy import create_engine, text
+
+from benchmarks.query_plans import SCHEMA, build_dataset, check_plans, dataset_params, drop_dataset, scratch_engine
+from db.movie_search import MOVIE_SEARCH_VIEW, refresh_movie_search
+
+MOVIES = 50_000
+MIN_ROWS = 10_000
+
+
+@pytest.fixture
+def plan_connection(test_database):
+    # The real view the scratch catalog must leave alone
+    with test_database.begin() as conn:
+        refresh_movie_search(conn, concurrently=False)
+    admin_engine = create_engine(test_database.url)
+    engine = scratch_engine(test_database.url)
+    try:
+        build_dataset(admin_engine, engine, dataset_params(movies=MOVIES, users=5_000))
+        with engine.connect() as conn:
+            yield conn
+    finally:
+        engine.dispose()
+        drop_dataset(admin_engine)
+        admin_engine.dispose()
+
+
+def test_hot_queries_use_indexes(plan_connection):
+    results = check_plans(plan_connection, MIN_ROWS)
+
+    assert [(r["name"], r["outside"]) for r in results if r["outside"]] == []
+    assert [(r["name"], r["scans"]) for r in results if r["scans"]] == []
+    assert [r["name"] for r in results if not r["indexes"]] == []
+    # The scratch catalog got its own movie_search; public's was neither dropped nor refreshed into it
+    assert plan_connection.execute(text(f"SELECT count(*) FROM {SCHEMA}.{MOVIE_SEARCH_VIEW}")).scalar() == MOVIES
+    assert plan_connection.execute(text(f"SELECT to_regclass('public.{MOVIE_SEARCH_VIEW}')")).scalar()
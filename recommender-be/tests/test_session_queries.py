@@ -0,0 +1,102 @@
+"""
+Database round trips per chat message with a cached ChatSession.
+
+The socket's ChatSession keeps the user, model config, model and agent, so a message
+only queries the conversation, the catalog and the evaluation queue. The offline
+"fake" provider answers, so no LLM is involved.
+"""
+
+import asyncio
+import uuid
+
+import pytest
+from sqlalchemy import event, text
+
+from benchmarks.query_plans import GENRES, SYNTHETIC_DATA
+from config.settings import settings
+from core.askLLM import askLLM
+from core.session import ChatSession
+from core.utils.helpers import get_model_config
+from db.catalog import get_catalog_version
+from db.database import async_engine, async_session_scope, count_queries
+from db.movie_search import refresh_movie_search
+from models.models import User
+
+QUESTIONS = ["what are the most popular comedy movies?", "which movies have the best rating?"]
+
+
+@pytest.fixture
+def chat_user(test_database, monkeypatch):
+    for name, value in {
+        "FAKE_PROVIDER_ENABLED": True,
+        "PIPELINE_MODE": "two_pass",
+        # Artifact-backed retrieval and the caches would make the count depend on local files and state
+        "SEMANTIC_SEARCH_ENABLED": False,
+        "CONTENT_SIMILARITY_ENABLED": False,
+        "CF_ENABLED": False,
+        "RESPONSE_CACHE_ENABLED": False,
+        "SEMANTIC_CACHE_ENABLED": False,
+        "SEMANTIC_CACHE_ANSWERS": False,
+        "QUERY_CACHE_ENABLED": False,
+        "EVALUATION_ENABLED": True,
+        "EVALUATION_SAMPLE_RATE": 1.0,
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+
+    user_id = uuid.uuid4()
+    params = {
+        "genres": GENRES, "movies": 500, "actors": 250, "directors": 50,
+        "users": 2, "conversations": 1, "messages": 2, "views": 3,
+    }
+    with test_database.begin() as conn:
+        for statement in SYNTHETIC_DATA:
+            conn.execute(text(statement), params)
+        conn.execute(text("""
+            INSERT INTO users (id, google_id, email, name) VALUES (:id, 'google-chat', 'chat@example.com', 'Chat User')
+        """), {"id": user_id})
+        conn.execute(text("""
+            INSERT INTO model_configs (id, user_id, provider, model, api_key, created_at)
+            VALUES (gen_random_uuid(), :id, 'fake', 'fake-model', '', now())
+        """), {"id": user_id})
+        refresh_movie_search(conn, concurrently=False)
+    return str(user_id)
+
+
+def test_cached_session_message_query_count(chat_user):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async def run():
+        async with async_session_scope() as db:
+            user = await db.get(User, uuid.UUID(chat_user))
+            config = await get_model_config(db, chat_user)
+        session = ChatSession("test-session", user, config)
+        # Re-read at most every CATALOG_VERSION_TTL seconds; not part of a typical message
+        await get_catalog_version()
+
+        counts = []
+        for question in QUESTIONS:
+            statements.clear()
+            with count_queries() as queries:
+                async with async_session_scope() as db:
+                    events = [event async for event in askLLM({"content": question}, db, session)]
+            assert "error" not in {event["type"] for event in events}, events
+            counts.append((queries.count, list(statements)))
+        await async_engine.dispose()
+        return counts
+
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        (first, first_statements), (second, second_statements) = asyncio.run(run())
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+    # The cached session never goes back to the user or model config tables
+    assert not [sql for sql in first_statements + second_statements if "model_configs" in sql or "FROM users" in sql]
+    # First message: open conversation lookup + insert + refresh, user message insert + refresh,
+    # catalog query, assistant message insert + refresh, evaluation job insert
+    assert first == 9, first_statements
+    # Later messages reuse the open conversation id held by the session
+    assert second == 6, second_statements